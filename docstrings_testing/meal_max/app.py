@@ -1,10 +1,18 @@
+import atexit
+
 from dotenv import load_dotenv
 from flask import Flask, jsonify, make_response, Response, request
 # from flask_cors import CORS
 
 from meal_max.models import kitchen_model
+from meal_max.models import odds_model
 from meal_max.models.battle_model import BattleModel
-from meal_max.utils.sql_utils import check_database_connection, check_table_exists
+from meal_max.models.tournament_model import TournamentModel
+from meal_max.utils.compaction_utils import COMPACTION_INTERVAL, CompactionScheduler
+from meal_max.utils.import_utils import get_import_format, iter_records
+from meal_max.utils.random_utils import get_random_source_stats
+from meal_max.utils.sql_utils import check_database_connection, check_table_exists, close_pool, get_pool_stats
+from meal_max.utils.state_utils import STATE_SERVER_ADDRESS, connect_state_server
 
 
 # Load environment variables from .env file
@@ -16,8 +24,36 @@ app = Flask(__name__)
 # uncomment this
 # CORS(app)
 
-# Initialize the BattleModel
-battle_model = BattleModel()
+# Pretty-print JSON under every server, not only the debug server, so responses are identical
+app.json.compact = False
+
+# Bring the database schema up to date without dropping the meals already in it
+kitchen_model.migrate_meals()
+
+# Initialize the BattleModel, and archive and purge meals deleted past the retention period in the background
+# unless COMPACTION_INTERVAL is 0. Under gunicorn the workers share the ones held by the state server (see gunicorn.conf.py)
+compaction_scheduler = None
+if STATE_SERVER_ADDRESS:
+    state_server = connect_state_server(STATE_SERVER_ADDRESS, ["battle_model", "compaction_scheduler"])
+    battle_model = state_server.battle_model()
+    if COMPACTION_INTERVAL > 0:
+        compaction_scheduler = state_server.compaction_scheduler()
+else:
+    battle_model = BattleModel()
+    if COMPACTION_INTERVAL > 0:
+        compaction_scheduler = CompactionScheduler(kitchen_model.compact_meals)
+
+
+def close_resources() -> None:
+    """
+    Stops the compaction job of this process and closes the pooled connections. Runs at exit
+    and when a gunicorn worker exits.
+    """
+    if compaction_scheduler is not None and not STATE_SERVER_ADDRESS:
+        compaction_scheduler.close()
+    close_pool()
+
+atexit.register(close_resources)
 
 ####################################################
 #
@@ -58,6 +94,69 @@ def db_check() -> Response:
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 404)
 
+@app.route('/api/db-pool-stats', methods=['GET'])
+def db_pool_stats() -> Response:
+    """
+    Route to report the database connection pool counters.
+
+    Returns:
+        JSON response with the pool hits, waits, opens and recycles.
+    """
+    try:
+        app.logger.info("Retrieving database connection pool stats")
+        return make_response(jsonify({'status': 'success', 'pool': get_pool_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving pool stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats() -> Response:
+    """
+    Route to report the meal lookup cache counters.
+
+    Returns:
+        JSON response with the cache hits, misses, evictions and size.
+    """
+    try:
+        app.logger.info("Retrieving cache stats")
+        return make_response(jsonify({'status': 'success', 'cache': kitchen_model.meal_cache.get_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving cache stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/random-source-stats', methods=['GET'])
+def random_source_stats() -> Response:
+    """
+    Route to report the counters of the random source, including the random.org
+    buffer depth, refill latency and fallback count when buffering is enabled.
+
+    Returns:
+        JSON response with the random source counters.
+    """
+    try:
+        app.logger.info("Retrieving random source stats")
+        return make_response(jsonify({'status': 'success', 'random_source': get_random_source_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving random source stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/compaction-stats', methods=['GET'])
+def compaction_stats() -> Response:
+    """
+    Route to report the background compaction of deleted meals, including the report of
+    its last run.
+
+    Returns:
+        JSON response with the compaction counters, or null if background compaction is disabled.
+    """
+    try:
+        app.logger.info("Retrieving compaction stats")
+        stats = compaction_scheduler.get_stats() if compaction_scheduler is not None else None
+        return make_response(jsonify({'status': 'success', 'compaction': stats}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving compaction stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
 
 ##########################################################
 #
@@ -115,17 +214,61 @@ def add_meal() -> Response:
         app.logger.error("Failed to add combatant: %s", str(e))
         return make_response(jsonify({'error': str(e)}), 500)
 
+@app.route('/api/import-meals', methods=['POST'])
+def import_meals() -> Response:
+    """
+    Route to add meals in bulk from a JSON Lines or CSV request body.
+
+    The body is streamed rather than loaded into memory and the meals are inserted in chunked
+    transactions. Invalid rows and meals whose name already exists are skipped and reported.
+
+    Expected Input:
+        - One JSON object per line, or CSV with a header row, with the fields meal, cuisine,
+          price and difficulty.
+
+    Query Parameters:
+        - format (str, optional): 'jsonl' or 'csv'. Defaults to the format of the Content-Type
+          (application/x-ndjson or text/csv).
+        - chunk_size (int, optional): The number of meals inserted per transaction.
+
+    Returns:
+        JSON response with the number of meals created, duplicates and invalid rows, and the errors by row.
+    Raises:
+        400 error if the format or chunk size is invalid.
+        500 error if there is a database error. Chunks committed before the error are kept.
+    """
+    try:
+        import_format = get_import_format(request.args.get('format'), request.content_type)
+        chunk_size = request.args.get('chunk_size', type=int)
+
+        app.logger.info("Importing meals from %s", import_format)
+        report = kitchen_model.create_meals(iter_records(request.stream, import_format), chunk_size=chunk_size)
+        app.logger.info("Imported %d meals", report['created'])
+
+        return make_response(jsonify({'status': 'success', **report}), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid meal import: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error(f"Error importing meals: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
 @app.route('/api/clear-meals', methods=['DELETE'])
 def clear_catalog() -> Response:
     """
-    Route to clear all meals (recreates the table).
+    Route to clear all meals.
+
+    Query Parameters:
+        - swap (bool, optional): Replace the database with an empty one instead of deleting
+          the meals. Defaults to false.
 
     Returns:
         JSON response indicating success of the operation or error message.
     """
     try:
+        swap = request.args.get('swap', 'false').lower() == 'true'
         app.logger.info("Clearing the meals")
-        kitchen_model.clear_meals()
+        kitchen_model.clear_meals(swap=swap)
         return make_response(jsonify({'status': 'success'}), 200)
     except Exception as e:
         app.logger.error(f"Error clearing catalog: {e}")
@@ -292,6 +435,114 @@ def prep_combatant() -> Response:
         return make_response(jsonify({'error': str(e)}), 500)
 
 
+@app.route('/api/tournament', methods=['POST'])
+def tournament() -> Response:
+    """
+    Route to run a whole tournament between meals and record every result at once.
+
+    Expected JSON Input:
+        - meal_ids (list[int]): The meals taking part, in seed order.
+        - format (str): 'single_elimination', 'round_robin' or 'swiss'. Default is 'single_elimination'.
+        - rounds (int, optional): The number of Swiss rounds. Default is log2 of the number of meals.
+
+    Returns:
+        JSON response with every round of the bracket, the final standings and the champion.
+    Raises:
+        400 error if the input is invalid or a meal is missing or deleted.
+        500 error if there is an issue running the tournament.
+    """
+    try:
+        data = request.get_json()
+        meal_ids = data.get('meal_ids')
+        tournament_format = data.get('format', 'single_elimination')
+        rounds = data.get('rounds')
+
+        if not isinstance(meal_ids, list) or not all(isinstance(meal_id, int) for meal_id in meal_ids):
+            return make_response(jsonify({'error': 'meal_ids must be a list of meal ids'}), 400)
+        if rounds is not None and not isinstance(rounds, int):
+            return make_response(jsonify({'error': 'rounds must be an integer'}), 400)
+
+        app.logger.info("Running %s tournament with %d meals", tournament_format, len(meal_ids))
+        result = TournamentModel(battle_model).run(meal_ids, tournament_format, rounds=rounds)
+
+        return make_response(jsonify({'status': 'success', 'tournament': result}), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid tournament: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error(f"Tournament error: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/battle-odds', methods=['GET'])
+def battle_odds() -> Response:
+    """
+    Route to get the win probabilities of a battle between two meals without fighting it.
+
+    Query Parameters:
+        - meal_1_id (int): The meal prepped as the first combatant.
+        - meal_2_id (int): The meal prepped as the second combatant.
+        - trials (int, optional): The number of simulated battles. Default is 1,000,000.
+        - seed (int, optional): Seed for a repeatable simulation.
+
+    Returns:
+        JSON response with the exact and simulated win probabilities of both meals.
+    Raises:
+        400 error if the parameters are invalid or a meal is missing or deleted.
+        500 error if there is an issue computing the odds.
+    """
+    try:
+        meal_1_id = request.args.get('meal_1_id', type=int)
+        meal_2_id = request.args.get('meal_2_id', type=int)
+        trials = request.args.get('trials', odds_model.ODDS_DEFAULT_TRIALS, type=int)
+        seed = request.args.get('seed', type=int)
+
+        if meal_1_id is None or meal_2_id is None:
+            return make_response(jsonify({'error': 'meal_1_id and meal_2_id are required'}), 400)
+
+        app.logger.info("Computing battle odds for meals %s and %s over %s trials", meal_1_id, meal_2_id, trials)
+        odds = odds_model.get_battle_odds(meal_1_id, meal_2_id, trials=trials, seed=seed)
+
+        return make_response(jsonify({'status': 'success', 'odds': odds}), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid battle odds request: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error(f"Error computing battle odds: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/battle-odds-matrix', methods=['GET'])
+def battle_odds_matrix() -> Response:
+    """
+    Route to get the pairwise win probabilities of every meal in the catalog.
+
+    Query Parameters:
+        - trials (int, optional): The number of simulated battles per pair. Default is 10,000.
+        - seed (int, optional): Seed for a repeatable simulation.
+
+    Returns:
+        JSON response with the meals and the exact and simulated probability matrices, where
+        entry [i][j] is the chance that meal i wins as the first combatant against meal j.
+    Raises:
+        400 error if the parameters are invalid.
+        500 error if there is an issue computing the odds.
+    """
+    try:
+        trials = request.args.get('trials', odds_model.ODDS_MATRIX_DEFAULT_TRIALS, type=int)
+        seed = request.args.get('seed', type=int)
+
+        app.logger.info("Computing battle odds matrix over %s trials per pair", trials)
+        matrix = odds_model.get_battle_odds_matrix(trials=trials, seed=seed)
+
+        return make_response(jsonify({'status': 'success', 'odds': matrix}), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid battle odds matrix request: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error(f"Error computing battle odds matrix: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
 ############################################################
 #
 # Leaderboard
@@ -302,23 +553,33 @@ def prep_combatant() -> Response:
 @app.route('/api/leaderboard', methods=['GET'])
 def get_leaderboard() -> Response:
     """
-    Route to get the leaderboard of meals sorted by wins, battles, or win percentage.
+    Route to get a page of the leaderboard of meals sorted by wins or win percentage.
 
     Query Parameters:
-        - sort (str): The field to sort by ('wins', 'battles', or 'win_pct'). Default is 'wins'.
+        - sort (str): The field to sort by ('wins' or 'win_pct'). Default is 'wins'.
+        - limit (int): The number of meals on the page, at most 100. Default is 10.
+        - after_id (int): The next_after_id from the previous page, to get the next page.
 
     Returns:
-        JSON response with a sorted leaderboard of meals.
+        JSON response with a sorted page of the leaderboard and the after_id of the next page,
+        which is null on the last page.
     Raises:
+        400 error if the query parameters are invalid.
         500 error if there is an issue generating the leaderboard.
     """
     try:
         sort_by = request.args.get('sort', 'wins')  # Default sort by wins
-        app.logger.info("Generating leaderboard sorted by %s", sort_by)
+        limit = request.args.get('limit', kitchen_model.LEADERBOARD_DEFAULT_LIMIT, type=int)
+        after_id = request.args.get('after_id', type=int)
+        app.logger.info("Generating leaderboard sorted by %s, limit=%s, after_id=%s", sort_by, limit, after_id)
 
-        leaderboard_data = kitchen_model.get_leaderboard(sort_by)
+        leaderboard_data = kitchen_model.get_leaderboard(sort_by, limit=limit, after_id=after_id)
+        next_after_id = leaderboard_data[-1]['id'] if len(leaderboard_data) == limit else None
 
-        return make_response(jsonify({'status': 'success', 'leaderboard': leaderboard_data}), 200)
+        return make_response(jsonify({'status': 'success', 'leaderboard': leaderboard_data, 'next_after_id': next_after_id}), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid leaderboard request: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
         app.logger.error(f"Error generating leaderboard: {e}")
         return make_response(jsonify({'error': str(e)}), 500)
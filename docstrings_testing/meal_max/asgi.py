@@ -0,0 +1,23 @@
+"""
+ASGI entry point, serving the routes of app.py on an ASGI server:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+The views are still blocking WSGI code, not non-blocking I/O. The event loop accepts and
+holds the connections, but each request runs its Flask view in a pool of ASGI_THREADS
+threads, so at most ASGI_THREADS requests are handled at once per process and the rest
+wait for a free thread. A view waiting on SQLite or random.org ties up its thread, not the
+whole server, and threads beyond DB_POOL_SIZE wait for a pooled connection. The routes and
+their responses are those of app.py.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app
+
+
+# number of requests handled at once, further requests wait for a free thread
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "32"))
+
+application = WSGIMiddleware(app, workers=ASGI_THREADS)
@@ -0,0 +1,107 @@
+"""
+Benchmark of bulk meal imports into a fresh database.
+
+Writes --rows meals as JSON Lines or CSV to a temporary file, then streams the file
+through iter_records and kitchen_model.create_meals once per chunk size, each time into
+a new database. For comparison, --baseline-rows meals are also added one at a time with
+create_meal. Each import is checked against the throughput target.
+
+Run from the meal_max directory:
+
+    python -m benchmarks.bench_import_meals [--rows 1000000] [--chunk-sizes 1000 10000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from meal_max.models import kitchen_model
+from meal_max.utils import sql_utils
+from meal_max.utils.import_utils import IMPORT_FORMATS, iter_records
+
+
+# meals per second a 1M meal import is expected to sustain with the default chunk size
+IMPORT_THROUGHPUT_TARGET = 50000
+
+CUISINES = ("Italian", "Japanese", "Mexican", "Indian", "French", "Thai")
+DIFFICULTIES = ("LOW", "MED", "HIGH")
+
+
+def write_meals(path: str, rows: int, import_format: str) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        if import_format == "csv":
+            fh.write("meal,cuisine,price,difficulty\n")
+        for index in range(rows):
+            meal = f"Meal {index}"
+            cuisine = CUISINES[index % len(CUISINES)]
+            price = round(5 + index % 2000 / 100, 2)
+            difficulty = DIFFICULTIES[index % len(DIFFICULTIES)]
+            if import_format == "csv":
+                fh.write(f"{meal},{cuisine},{price},{difficulty}\n")
+            else:
+                fh.write(f'{{"meal": "{meal}", "cuisine": "{cuisine}", "price": {price}, "difficulty": "{difficulty}"}}\n')
+
+def fresh_database(directory: str, name: str) -> None:
+    # Point the connection pool at a new database file and create the meals table in it
+    sql_utils.close_pool()
+    sql_utils.DB_PATH = os.path.join(directory, f"{name}.db")
+    kitchen_model.migrate_meals()
+
+def time_bulk_import(path: str, import_format: str, chunk_size: int) -> tuple:
+    with open(path, "rb") as fh:
+        start = time.perf_counter()
+        report = kitchen_model.create_meals(iter_records(fh, import_format), chunk_size=chunk_size)
+        return report, time.perf_counter() - start
+
+def time_single_inserts(rows: int) -> float:
+    start = time.perf_counter()
+    for index in range(rows):
+        kitchen_model.create_meal(f"Meal {index}", CUISINES[index % len(CUISINES)], 10.0, DIFFICULTIES[index % len(DIFFICULTIES)])
+    return time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[kitchen_model.IMPORT_CHUNK_SIZE, 10000])
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default="jsonl")
+    parser.add_argument("--profile", choices=sorted(sql_utils.PRAGMA_PROFILES), default=sql_utils.DB_PRAGMA_PROFILE,
+                        help="pragma profile of the benchmark databases")
+    parser.add_argument("--baseline-rows", type=int, default=2000, help="meals added one at a time with create_meal")
+    parser.add_argument("--target", type=float, default=IMPORT_THROUGHPUT_TARGET, help="meals per second")
+    args = parser.parse_args()
+
+    # The models log every meal, which would drown out the database costs
+    logging.disable(logging.CRITICAL)
+    sql_utils.DB_PRAGMA_PROFILE = args.profile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"meals.{args.format}")
+        write_meals(path, args.rows, args.format)
+        print(f"{args.rows} meals, {os.path.getsize(path) / 1e6:.1f} MB of {args.format}, pragma profile {args.profile}")
+        print(f"{'method':>22} {'meals':>9} {'seconds':>9} {'meals/s':>10} {'target':>7}")
+
+        if args.baseline_rows:
+            fresh_database(directory, "baseline")
+            elapsed = time_single_inserts(args.baseline_rows)
+            print(f"{'create_meal':>22} {args.baseline_rows:>9} {elapsed:>9.2f} {args.baseline_rows / elapsed:>10.0f} {'':>7}")
+
+        failed = False
+        for chunk_size in args.chunk_sizes:
+            fresh_database(directory, f"chunk_{chunk_size}")
+            report, elapsed = time_bulk_import(path, args.format, chunk_size)
+            if report["created"] != args.rows:
+                raise RuntimeError(f"Expected {args.rows} meals to be created, got {report}")
+            throughput = args.rows / elapsed
+            failed |= throughput < args.target
+            result = "ok" if throughput >= args.target else "MISSED"
+            print(f"{'create_meals/' + str(chunk_size):>22} {args.rows:>9} {elapsed:>9.2f} {throughput:>10.0f} {result:>7}")
+
+        sql_utils.close_pool()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compacts the meals table: moves meals deleted more than --retention-days ago to the
+meals_archive table, then returns the space they used to the filesystem with an
+incremental VACUUM. Every transaction holds the write lock for about --lock-budget-ms,
+so it is safe to run while the app is serving requests.
+
+Databases created before incremental auto-vacuum was enabled have to be rebuilt once
+with --full-vacuum, which holds the write lock for the whole rebuild.
+
+Run from the meal_max directory:
+
+    python compact.py [--retention-days 30] [--lock-budget-ms 50] [--full-vacuum]
+"""
+import argparse
+import json
+
+from dotenv import load_dotenv
+
+# The database path and compaction settings are read when the modules are imported
+load_dotenv()
+
+from meal_max.models import kitchen_model
+from meal_max.utils.compaction_utils import COMPACTION_LOCK_BUDGET_MS, COMPACTION_RETENTION_DAYS, full_vacuum
+from meal_max.utils.sql_utils import close_pool, get_db_connection
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retention-days", type=float, default=COMPACTION_RETENTION_DAYS)
+    parser.add_argument("--lock-budget-ms", type=float, default=COMPACTION_LOCK_BUDGET_MS)
+    parser.add_argument("--full-vacuum", action="store_true", help="rebuild the database after compacting it")
+    args = parser.parse_args()
+
+    kitchen_model.migrate_meals()
+    report = kitchen_model.compact_meals(args.retention_days, args.lock_budget_ms)
+    if args.full_vacuum:
+        with get_db_connection() as conn:
+            full_vacuum(conn)
+    close_pool()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
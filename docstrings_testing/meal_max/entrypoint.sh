@@ -13,5 +13,14 @@ else
     echo "Skipping database creation."
 fi
 
-# Start the Python application
-exec python app.py
+# Start the Python application with the server selected by APP_SERVER
+if [ "$APP_SERVER" = "gunicorn" ]; then
+    echo "Starting the WSGI server with $GUNICORN_WORKERS workers."
+    exec gunicorn -c gunicorn.conf.py app:app
+elif [ "$APP_SERVER" = "uvicorn" ]; then
+    # The views still block, at most ASGI_THREADS requests are handled at once (see asgi.py)
+    echo "Starting the ASGI server with $ASGI_THREADS threads."
+    exec uvicorn asgi:application --host 0.0.0.0 --port 5000
+else
+    exec python app.py
+fi
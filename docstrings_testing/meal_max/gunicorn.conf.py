@@ -0,0 +1,86 @@
+"""
+Gunicorn settings for serving the app with preforked worker processes. Run from the meal_max
+directory:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Each worker serves GUNICORN_THREADS requests at a time and has its own database connection
+pool. The combatants prepped for the next battle cannot live in the workers, so the master
+starts a state server process before forking them: it holds the one battle model every worker
+preps and runs, and runs the background compaction once for the whole deployment. Calls to the
+battle model, including recording the result of a battle, run one at a time across all of the
+workers.
+
+The meal cache would be per process. The state server runs the compaction, so even with a single
+worker a meal archived there, or deleted through another worker, would be served stale until
+CACHE_TTL. It is turned off whenever the state server is used, whatever .env says.
+
+kill -HUP <master pid> reloads gracefully: new workers are started with the new code and the
+old ones finish their requests within GUNICORN_GRACEFUL_TIMEOUT. The state server is not
+reloaded, so the combatants are kept; code changes to the models it serves need a restart.
+"""
+import os
+import sys
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The workers find the state server through this variable, so it has to be set before the app modules read it
+os.environ.setdefault("STATE_SERVER_ADDRESS", os.path.join(tempfile.gettempdir(), "meal-max-state.sock"))
+
+# A per-process cache cannot be kept consistent between the workers and the state server. Like the
+# address, this has to be set before the app modules read it, here and in the processes forked later
+os.environ["CACHE_MAX_SIZE"] = "0"
+
+from meal_max.utils.compaction_utils import COMPACTION_INTERVAL
+from meal_max.utils.state_utils import on_state_server_exit, start_state_server
+
+
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+accesslog = "-"
+
+# Each worker imports the app after the fork, because importing it opens database connections
+# and starts background threads that must not be shared between processes
+preload_app = False
+
+
+def create_battle_model():
+    from meal_max.models.battle_model import BattleModel
+    return BattleModel()
+
+def create_compaction_scheduler():
+    from meal_max.models import kitchen_model
+    from meal_max.utils.compaction_utils import CompactionScheduler
+    return CompactionScheduler(kitchen_model.compact_meals)
+
+def init_state_server():
+    """
+    Runs in the state server process. The shared battle model records the battle results
+    from there, so the pool is closed when the server shuts down.
+    """
+    from meal_max.utils.sql_utils import close_pool
+    on_state_server_exit(close_pool)
+
+
+def on_starting(server):
+    models = {"battle_model": create_battle_model}
+    if COMPACTION_INTERVAL > 0:
+        models["compaction_scheduler"] = create_compaction_scheduler
+    # Kept on the arbiter rather than in this module, which is executed again on every reload
+    server.state_server = start_state_server(os.environ["STATE_SERVER_ADDRESS"], models, initializer=init_state_server)
+
+def worker_exit(server, worker):
+    # Stop the jobs of the exiting worker and close its connections
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.close_resources()
+
+def on_exit(server):
+    server.state_server.shutdown()
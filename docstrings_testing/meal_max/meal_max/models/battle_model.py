@@ -1,7 +1,7 @@
 import logging
 from typing import List
 
-from meal_max.models.kitchen_model import Meal, update_meal_stats
+from meal_max.models.kitchen_model import Meal, get_battle_score, record_battle
 from meal_max.utils.logger import configure_logger
 from meal_max.utils.random_utils import get_random
 
@@ -10,6 +10,12 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
+def combatant_1_wins(score_1: float, score_2: float, random_number: float) -> bool:
+    """The battle rule: the first combatant wins when the normalized score delta beats the random draw."""
+    delta = abs(score_1 - score_2) / 100
+    return delta > random_number
+
+
 class BattleModel:
 
     def __init__(self):
@@ -42,14 +48,14 @@ class BattleModel:
         # Log the delta and normalized delta
         logger.info("Delta between scores: %.3f", delta)
 
-        # Get random number from random.org
+        # Get random number from the configured random source
         random_number = get_random()
 
         # Log the random number
-        logger.info("Random number from random.org: %.3f", random_number)
+        logger.info("Random number: %.3f", random_number)
 
         # Determine the winner based on the normalized delta
-        if delta > random_number:
+        if combatant_1_wins(score_1, score_2, random_number):
             winner = combatant_1
             loser = combatant_2
         else:
@@ -59,9 +65,8 @@ class BattleModel:
         # Log the winner
         logger.info("The winner is: %s", winner.meal)
 
-        # Update stats for both combatants
-        update_meal_stats(winner.id, 'win')
-        update_meal_stats(loser.id, 'loss')
+        # Update stats for both combatants in one transaction
+        record_battle(winner.id, loser.id)
 
         # Remove the losing combatant from combatants
         self.combatants.remove(loser)
@@ -73,19 +78,8 @@ class BattleModel:
         self.combatants.clear()
 
     def get_battle_score(self, combatant: Meal) -> float:
-        difficulty_modifier = {"HIGH": 1, "MED": 2, "LOW": 3}
-
-        # Log the calculation process
-        logger.info("Calculating battle score for %s: price=%.3f, cuisine=%s, difficulty=%s",
-                    combatant.meal, combatant.price, combatant.cuisine, combatant.difficulty)
-
-        # Calculate score
-        score = (combatant.price * len(combatant.cuisine)) - difficulty_modifier[combatant.difficulty]
-
-        # Log the calculated score
-        logger.info("Battle score for %s: %.3f", combatant.meal, score)
-
-        return score
+        # Scores only change when a meal is created, so they are computed once and cached
+        return get_battle_score(combatant)
 
     def get_combatants(self) -> List[Meal]:
         logger.info("Retrieving current list of combatants.")
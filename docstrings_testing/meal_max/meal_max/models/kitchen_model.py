@@ -1,19 +1,95 @@
+from collections import Counter
 from dataclasses import dataclass
 import logging
+import math
 import os
 import sqlite3
-from typing import Any
-
+import threading
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from meal_max.utils.cache_utils import ReadThroughCache
+from meal_max.utils.compaction_utils import (
+    COMPACTION_LOCK_BUDGET_MS,
+    COMPACTION_RETENTION_DAYS,
+    archive_deleted_rows,
+    get_retention_cutoff,
+    incremental_vacuum,
+)
 from meal_max.utils.sql_utils import get_db_connection
 from meal_max.utils.logger import configure_logger
+from meal_max.utils.migration_utils import Migration, add_column_if_missing, apply_migrations
 
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
+# page sizes and orderings for the meal leaderboard
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_SORT_COLUMNS = ("wins", "win_pct")
+
+# most ids bound into a single IN (...) query, below the SQLITE_MAX_VARIABLE_NUMBER of older sqlite builds
+MAX_SQL_VARIABLES = 900
+
+# rows inserted per transaction by create_meals, and the most row errors it reports in detail
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_ERRORS = 1000
+
+# meals looked up by id or name, including missing and deleted ones
+meal_cache = ReadThroughCache("meals")
+
+# subtracted from a meal's battle score, harder meals are penalised less
+DIFFICULTY_MODIFIERS = {"HIGH": 1, "MED": 2, "LOW": 3}
+
+# schema changes applied in order by migrate_meals, new ones are appended and never edited
+MEAL_MIGRATIONS = (
+    Migration(1, "create the meals table", """
+        CREATE TABLE IF NOT EXISTS meals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            meal TEXT NOT NULL UNIQUE,
+            cuisine TEXT NOT NULL,
+            price REAL NOT NULL,
+            difficulty TEXT CHECK(difficulty IN ('HIGH', 'MED', 'LOW')),
+            battles INTEGER DEFAULT 0,
+            wins INTEGER DEFAULT 0,
+            deleted BOOLEAN DEFAULT FALSE
+        )
+    """),
+    # Tables created by the schema script since the leaderboard was indexed already have it
+    Migration(2, "add the win_pct column", lambda cursor: add_column_if_missing(
+        cursor, "meals", "win_pct", "REAL GENERATED ALWAYS AS (CASE WHEN battles > 0 THEN wins * 1.0 / battles END) VIRTUAL")),
+    Migration(3, "index the leaderboard by wins",
+              "CREATE INDEX IF NOT EXISTS idx_meals_leaderboard_wins ON meals (wins DESC, id) WHERE deleted = FALSE AND battles > 0"),
+    Migration(4, "index the leaderboard by win_pct",
+              "CREATE INDEX IF NOT EXISTS idx_meals_leaderboard_win_pct ON meals (win_pct DESC, id) WHERE deleted = FALSE AND battles > 0"),
+    Migration(5, "record when meals are deleted", lambda cursor: _add_deleted_at(cursor)),
+    Migration(6, "create the meals archive", """
+        CREATE TABLE IF NOT EXISTS meals_archive (
+            id INTEGER PRIMARY KEY,
+            meal TEXT NOT NULL,
+            cuisine TEXT NOT NULL,
+            price REAL NOT NULL,
+            difficulty TEXT,
+            battles INTEGER,
+            wins INTEGER,
+            deleted_at INTEGER,
+            archived_at INTEGER NOT NULL
+        )
+    """),
+    Migration(7, "index deleted meals by deletion time",
+              "CREATE INDEX IF NOT EXISTS idx_meals_deleted_at ON meals (deleted_at) WHERE deleted = TRUE"),
+)
+
+# columns copied to meals_archive when compact_meals purges a deleted meal
+MEAL_ARCHIVE_COLUMNS = ("id", "meal", "cuisine", "price", "difficulty", "battles", "wins", "deleted_at")
+
+
 @dataclass
 class Meal:
+    # No per-instance __dict__, so meals loaded for odds matrices and tournaments stay small
+    __slots__ = ("id", "meal", "cuisine", "price", "difficulty")
+
     id: int
     meal: str
     cuisine: str
@@ -27,12 +103,53 @@ class Meal:
             raise ValueError("Difficulty must be 'LOW', 'MED', or 'HIGH'.")
 
 
-def create_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
-    if not isinstance(price, (int, float)) or price <= 0:
+# meal id -> (price, cuisine, difficulty, battle score)
+_battle_scores: Dict[int, Tuple[float, str, str, float]] = {}
+
+
+def compute_battle_score(price: float, cuisine: str, difficulty: str) -> float:
+    return (price * len(cuisine)) - DIFFICULTY_MODIFIERS[difficulty]
+
+def get_battle_score(meal: Meal) -> float:
+    """
+    Returns the battle score of a meal, computed once per meal and cached by id. The cached
+    entry keeps the attributes it was computed from and is only used while they still match.
+    """
+    entry = _battle_scores.get(meal.id)
+    if entry is not None and entry[:3] == (meal.price, meal.cuisine, meal.difficulty):
+        return entry[3]
+    score = compute_battle_score(meal.price, meal.cuisine, meal.difficulty)
+    _battle_scores[meal.id] = (meal.price, meal.cuisine, meal.difficulty, score)
+    logger.debug("Cached battle score for %s: %.3f", meal.meal, score)
+    return score
+
+def invalidate_battle_scores(meal_id: Optional[int] = None) -> None:
+    """Drops the cached battle score of one meal, or of every meal if meal_id is None."""
+    if meal_id is None:
+        _battle_scores.clear()
+    else:
+        _battle_scores.pop(meal_id, None)
+
+
+def validate_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
+    """
+    Checks a meal against the rules shared by create_meal and create_meals: a non-empty meal
+    name and cuisine, a finite positive price with at most two decimal places, and a
+    difficulty of 'LOW', 'MED' or 'HIGH'. Raises ValueError describing the first rule broken.
+    """
+    for field, value in (("meal", meal), ("cuisine", cuisine)):
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"Invalid {field}: {value!r}. Must be a non-empty string.")
+    if not isinstance(price, (int, float)) or isinstance(price, bool) or not math.isfinite(price) or price <= 0:
         raise ValueError(f"Invalid price: {price}. Price must be a positive number.")
+    if round(price, 2) != price:
+        raise ValueError(f"Invalid price: {price}. Price must have at most two decimal places.")
     if difficulty not in ['LOW', 'MED', 'HIGH']:
         raise ValueError(f"Invalid difficulty level: {difficulty}. Must be 'LOW', 'MED', or 'HIGH'.")
 
+def create_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
+    validate_meal(meal, cuisine, price, difficulty)
+
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -42,6 +159,11 @@ def create_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
             """, (meal, cuisine, price, difficulty))
             conn.commit()
 
+            # The id may have belonged to a meal from before the last clear
+            invalidate_battle_scores(cursor.lastrowid)
+            meal_cache.invalidate(("id", cursor.lastrowid))
+            meal_cache.invalidate(("name", meal))
+
             logger.info("Meal successfully added to the database: %s", meal)
 
     except sqlite3.IntegrityError:
@@ -52,20 +174,209 @@ def create_meal(meal: str, cuisine: str, price: float, difficulty: str) -> None:
         logger.error("Database error: %s", str(e))
         raise e
 
-def clear_meals() -> None:
+def create_meals(rows: Iterable[Union[Mapping, Exception]], chunk_size: Optional[int] = None) -> dict:
+    """
+    Creates meals in bulk from any iterable of rows with meal, cuisine, price and difficulty,
+    committing one transaction per chunk_size rows (IMPORT_CHUNK_SIZE by default).
+
+    Rows are validated with validate_meal, like create_meal, and prices given as strings, as
+    they are in CSV, are accepted. Invalid rows, malformed lines passed in as exceptions and meals
+    whose name already exists are skipped and reported by 1-based row number, up to
+    IMPORT_MAX_ERRORS of them, without aborting the rest of the import.
+    """
+    chunk_size = IMPORT_CHUNK_SIZE if chunk_size is None else chunk_size
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        raise ValueError(f"Invalid import chunk size: {chunk_size}. Must be a positive integer.")
+
+    report = {"created": 0, "duplicates": 0, "invalid": 0, "errors": []}
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            logger.info("Starting bulk import of meals in chunks of %d", chunk_size)
+
+            chunk = {}  # meal name -> (row number, values)
+            for row_number, row in enumerate(rows, start=1):
+                try:
+                    values = _validate_meal_row(row)
+                except ValueError as e:
+                    _report_import_error(report, row_number, "invalid", str(e))
+                    continue
+
+                if values[0] in chunk:
+                    _report_import_error(report, row_number, "duplicate", f"Meal with name '{values[0]}' already exists")
+                    continue
+                chunk[values[0]] = (row_number, values)
+
+                if len(chunk) >= chunk_size:
+                    _insert_meal_chunk(conn, cursor, chunk, report)
+                    chunk = {}
+
+            if chunk:
+                _insert_meal_chunk(conn, cursor, chunk, report)
+
+            report["errors"].sort(key=lambda error: error["row"])
+            logger.info("Bulk import finished: %d meals created, %d duplicates, %d invalid rows",
+                        report["created"], report["duplicates"], report["invalid"])
+            return report
+
+    except sqlite3.Error as e:
+        logger.error("Database error while importing meals after %d were created: %s", report["created"], str(e))
+        raise e
+    finally:
+        # The ids of the new meals are not known individually, so drop anything cached under them
+        if report["created"]:
+            invalidate_battle_scores()
+            meal_cache.clear()
+
+def _validate_meal_row(row: Union[Mapping, Exception]) -> Tuple[str, str, float, str]:
+    if isinstance(row, Exception):
+        raise ValueError(str(row))
+    if not isinstance(row, (dict, Mapping)):
+        raise ValueError(f"Invalid row: {row!r}. Must be an object with meal, cuisine, price and difficulty.")
+
+    # Prices arrive as strings from CSV
+    price = row.get("price")
+    if isinstance(price, str):
+        try:
+            price = float(price)
+        except ValueError:
+            pass
+
+    validate_meal(row.get("meal"), row.get("cuisine"), price, row.get("difficulty"))
+    return row["meal"], row["cuisine"], float(price), row["difficulty"]
+
+def _report_import_error(report: dict, row_number: int, reason: str, message: str) -> None:
+    report["duplicates" if reason == "duplicate" else "invalid"] += 1
+    if len(report["errors"]) < IMPORT_MAX_ERRORS:
+        report["errors"].append({"row": row_number, "reason": reason, "error": message})
+
+def _insert_meal_chunk(conn, cursor, chunk: Dict[str, tuple], report: dict) -> None:
+    # Skip the meals already in the table, looking their names up through the unique index
+    names = list(chunk)
+    existing = set()
+    for start in range(0, len(names), MAX_SQL_VARIABLES):
+        part = names[start:start + MAX_SQL_VARIABLES]
+        placeholders = ", ".join("?" * len(part))
+        cursor.execute(f"SELECT meal FROM meals WHERE meal IN ({placeholders})", part)
+        existing.update(row[0] for row in cursor.fetchall())
+
+    new_rows = []
+    for name, (row_number, values) in chunk.items():
+        if name in existing:
+            _report_import_error(report, row_number, "duplicate", f"Meal with name '{name}' already exists")
+        else:
+            new_rows.append((row_number, values))
+
+    insert_query = "INSERT INTO meals (meal, cuisine, price, difficulty) VALUES (?, ?, ?, ?)"
+    try:
+        cursor.executemany(insert_query, [values for _, values in new_rows])
+        conn.commit()
+        report["created"] += len(new_rows)
+    except sqlite3.IntegrityError:
+        # A meal with one of the names was created since the lookup, so find it row by row
+        conn.rollback()
+        for row_number, values in new_rows:
+            try:
+                cursor.execute(insert_query, values)
+            except sqlite3.IntegrityError:
+                _report_import_error(report, row_number, "duplicate", f"Meal with name '{values[0]}' already exists")
+            else:
+                report["created"] += 1
+        conn.commit()
+
+    logger.debug("Imported a chunk of %d meals, %d created so far", len(chunk), report["created"])
+
+def migrate_meals() -> List[int]:
+    """
+    Applies the schema migrations the database is missing, keeping the meals already in it.
+
+    Raises:
+        sqlite3.Error: If any database error occurs.
+    """
+    try:
+        with get_db_connection() as conn:
+            return apply_migrations(conn, MEAL_MIGRATIONS)
+
+    except sqlite3.Error as e:
+        logger.error("Database error while migrating meals: %s", str(e))
+        raise e
+
+def _add_deleted_at(cursor: sqlite3.Cursor) -> None:
+    # Meals deleted before the column existed start their retention period now
+    if add_column_if_missing(cursor, "meals", "deleted_at", "INTEGER"):
+        cursor.execute("UPDATE meals SET deleted_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE deleted = TRUE")
+
+def compact_meals(retention_days: float = COMPACTION_RETENTION_DAYS, lock_budget_ms: float = COMPACTION_LOCK_BUDGET_MS,
+                  stop_event: Optional[threading.Event] = None) -> dict:
     """
-    Recreates the meals table, effectively deleting all meals.
+    Moves meals deleted more than retention_days ago to meals_archive and vacuums the freed pages,
+    holding the write lock for about lock_budget_ms per transaction.
 
     Raises:
+        ValueError: If the retention is negative or the lock budget is not positive.
         sqlite3.Error: If any database error occurs.
     """
+    cutoff = get_retention_cutoff(retention_days)
+    if lock_budget_ms <= 0:
+        raise ValueError(f"Invalid lock budget: {lock_budget_ms}ms (must be greater than 0).")
+    lock_budget = lock_budget_ms / 1000
+
+    def invalidate(meal_ids: List[int]) -> None:
+        for meal_id in meal_ids:
+            invalidate_battle_scores(meal_id)
+            meal_cache.invalidate_id(meal_id)
+
     try:
-        with open(os.getenv("SQL_CREATE_TABLE_PATH", "/app/sql/create_meal_table.sql"), "r") as fh:
-            create_table_script = fh.read()
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.executescript(create_table_script)
-            conn.commit()
+            logger.info("Compacting meals deleted more than %s days ago", retention_days)
+            report = archive_deleted_rows(conn, "meals", "meals_archive", MEAL_ARCHIVE_COLUMNS, cutoff, lock_budget,
+                                          on_purged=invalidate, stop_event=stop_event)
+            report["vacuumed_pages"] = incremental_vacuum(conn, lock_budget, stop_event)
+            return report
+
+    except sqlite3.Error as e:
+        logger.error("Database error while compacting meals: %s", str(e))
+        raise e
+
+# schema script of an empty meals database, read once for clear_meals(swap=True)
+SQL_CREATE_TABLE_PATH = os.getenv("SQL_CREATE_TABLE_PATH", "/app/sql/create_meal_table.sql")
+
+def _read_create_table_script() -> Optional[str]:
+    try:
+        with open(SQL_CREATE_TABLE_PATH, "r") as fh:
+            return fh.read()
+    except OSError as e:
+        logger.warning("Could not read the schema script %s, clearing by swap is unavailable: %s", SQL_CREATE_TABLE_PATH, str(e))
+        return None
+
+_create_table_script = _read_create_table_script()
+
+
+def clear_meals(swap: bool = False) -> None:
+    """
+    Deletes every meal, including archived meals, and restarts meal IDs at 1.
+
+    With swap, an empty database built from the schema script is copied over the current
+    one instead of deleting the meals. Readers already in a query keep seeing the old meals
+    until it ends.
+
+    Raises:
+        ValueError: If swap is requested and the schema script could not be read.
+        sqlite3.Error: If any database error occurs.
+    """
+    try:
+        with get_db_connection() as conn:
+            if swap:
+                _swap_in_empty_database(conn)
+            else:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM meals;")
+                cursor.execute("DELETE FROM meals_archive;")
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'meals';")
+                conn.commit()
+
+            invalidate_battle_scores()
+            meal_cache.clear()
 
             logger.info("Meals cleared successfully.")
 
@@ -73,6 +384,21 @@ def clear_meals() -> None:
         logger.error("Database error while clearing meals: %s", str(e))
         raise e
 
+def _swap_in_empty_database(conn: sqlite3.Connection) -> None:
+    if _create_table_script is None:
+        raise ValueError(f"Cannot clear the meals by swap, the schema script {SQL_CREATE_TABLE_PATH} could not be read")
+    empty = sqlite3.connect(":memory:")
+    try:
+        # The backup API cannot change the page size of a database in WAL mode
+        page_size = conn.execute("PRAGMA page_size;").fetchone()[0]
+        empty.execute(f"PRAGMA page_size = {int(page_size)};")
+        empty.executescript(_create_table_script)
+        # Copied over the open database in a single write transaction, where renaming a new
+        # file into place would leave the pooled connections and WAL files on the old one
+        empty.backup(conn)
+    finally:
+        empty.close()
+
 def delete_meal(meal_id: int) -> None:
     try:
         with get_db_connection() as conn:
@@ -87,33 +413,55 @@ def delete_meal(meal_id: int) -> None:
                 logger.info("Meal with ID %s not found", meal_id)
                 raise ValueError(f"Meal with ID {meal_id} not found")
 
-            cursor.execute("UPDATE meals SET deleted = TRUE WHERE id = ?", (meal_id,))
+            cursor.execute("UPDATE meals SET deleted = TRUE, deleted_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = ?", (meal_id,))
             conn.commit()
 
+            invalidate_battle_scores(meal_id)
+            meal_cache.invalidate_id(meal_id)
+
             logger.info("Meal with ID %s marked as deleted.", meal_id)
 
     except sqlite3.Error as e:
         logger.error("Database error: %s", str(e))
         raise e
 
-def get_leaderboard(sort_by: str="wins") -> dict[str, Any]:
-    query = """
-        SELECT id, meal, cuisine, price, difficulty, battles, wins, (wins * 1.0 / battles) AS win_pct
-        FROM meals WHERE deleted = false AND battles > 0
+def get_leaderboard(sort_by: str="wins", limit: int = LEADERBOARD_DEFAULT_LIMIT, after_id: Optional[int] = None) -> list[dict[str, Any]]:
     """
+    Returns a page of the meals that have battled, ordered by wins or win_pct with ties broken by id.
 
-    if sort_by == "win_pct":
-        query += " ORDER BY win_pct DESC"
-    elif sort_by == "wins":
-        query += " ORDER BY wins DESC"
-    else:
+    Both orderings are served by partial indexes (win_pct is a generated column), so a page is
+    read in index order in O(limit) and reflects every battle committed before the call. Pass the
+    id of the last meal of a page as after_id to get the next one.
+    """
+    if sort_by not in LEADERBOARD_SORT_COLUMNS:
         logger.error("Invalid sort_by parameter: %s", sort_by)
         raise ValueError("Invalid sort_by parameter: %s" % sort_by)
+    if not 1 <= limit <= LEADERBOARD_MAX_LIMIT:
+        logger.error("Invalid leaderboard limit: %s", limit)
+        raise ValueError(f"Invalid leaderboard limit: {limit} (must be between 1 and {LEADERBOARD_MAX_LIMIT}).")
+
+    query = """
+        SELECT id, meal, cuisine, price, difficulty, battles, wins, win_pct
+        FROM meals WHERE deleted = FALSE AND battles > 0
+    """
 
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query)
+            params = []
+            if after_id is not None:
+                # Continue from the sort key of the cursor meal, seeking into the index
+                cursor.execute(f"SELECT {sort_by} FROM meals WHERE id = ?", (after_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    logger.info("Meal with ID %s not found", after_id)
+                    raise ValueError(f"Meal with ID {after_id} not found")
+                query += f" AND {sort_by} <= ? AND ({sort_by} < ? OR id > ?)"
+                params.extend([row[0], row[0], after_id])
+            query += f" ORDER BY {sort_by} DESC, id LIMIT ?"
+            params.append(limit)
+
+            cursor.execute(query, params)
             rows = cursor.fetchall()
 
         leaderboard = []
@@ -138,6 +486,9 @@ def get_leaderboard(sort_by: str="wins") -> dict[str, Any]:
         raise e
 
 def get_meal_by_id(meal_id: int) -> Meal:
+    return meal_cache.get_or_load(("id", meal_id), lambda: _load_meal_by_id(meal_id), entity_id=meal_id)
+
+def _load_meal_by_id(meal_id: int) -> Meal:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -158,7 +509,58 @@ def get_meal_by_id(meal_id: int) -> Meal:
         raise e
 
 
+def get_all_meals() -> List[Meal]:
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, meal, cuisine, price, difficulty FROM meals WHERE deleted = FALSE ORDER BY id")
+            rows = cursor.fetchall()
+
+        logger.info("Retrieved %d meals", len(rows))
+        return [Meal(id=row[0], meal=row[1], cuisine=row[2], price=row[3], difficulty=row[4]) for row in rows]
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+
+def get_meals_by_ids(meal_ids: List[int]) -> List[Meal]:
+    """
+    Fetches several meals with one query per 900 ids and returns them in the order of meal_ids.
+    Raises ValueError if any of them is missing or deleted.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            rows_by_id = {}
+            unique_ids = list(dict.fromkeys(meal_ids))
+            for start in range(0, len(unique_ids), MAX_SQL_VARIABLES):
+                chunk = unique_ids[start:start + MAX_SQL_VARIABLES]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT id, meal, cuisine, price, difficulty, deleted FROM meals WHERE id IN ({placeholders})", chunk)
+                rows_by_id.update((row[0], row) for row in cursor.fetchall())
+
+        meals = []
+        for meal_id in meal_ids:
+            row = rows_by_id.get(meal_id)
+            if row is None:
+                logger.info("Meal with ID %s not found", meal_id)
+                raise ValueError(f"Meal with ID {meal_id} not found")
+            if row[5]:
+                logger.info("Meal with ID %s has been deleted", meal_id)
+                raise ValueError(f"Meal with ID {meal_id} has been deleted")
+            meals.append(Meal(id=row[0], meal=row[1], cuisine=row[2], price=row[3], difficulty=row[4]))
+        return meals
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+
 def get_meal_by_name(meal_name: str) -> Meal:
+    return meal_cache.get_or_load(("name", meal_name), lambda: _load_meal_by_name(meal_name))
+
+def _load_meal_by_name(meal_name: str) -> Meal:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -205,3 +607,91 @@ def update_meal_stats(meal_id: int, result: str) -> None:
     except sqlite3.Error as e:
         logger.error("Database error: %s", str(e))
         raise e
+
+def record_battle(winner_id: int, loser_id: int) -> None:
+    """
+    Records a battle for both meals with a single UPDATE in one transaction, so the winner's
+    win and both battle counts are committed together or not at all.
+    """
+    if winner_id == loser_id:
+        logger.error("Meal with ID %s cannot battle itself", winner_id)
+        raise ValueError(f"Meal with ID {winner_id} cannot battle itself")
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE meals
+                SET battles = battles + 1,
+                    wins = wins + CASE WHEN id = ? THEN 1 ELSE 0 END
+                WHERE id IN (?, ?) AND deleted = FALSE
+            """, (winner_id, winner_id, loser_id))
+
+            if cursor.rowcount != 2:
+                # One of the meals is missing or deleted, undo the other row and report which
+                conn.rollback()
+                cursor.execute("SELECT id, deleted FROM meals WHERE id IN (?, ?)", (winner_id, loser_id))
+                deleted_by_id = dict(cursor.fetchall())
+                for meal_id in (winner_id, loser_id):
+                    if meal_id not in deleted_by_id:
+                        logger.info("Meal with ID %s not found", meal_id)
+                        raise ValueError(f"Meal with ID {meal_id} not found")
+                    if deleted_by_id[meal_id]:
+                        logger.info("Meal with ID %s has been deleted", meal_id)
+                        raise ValueError(f"Meal with ID {meal_id} has been deleted")
+
+            conn.commit()
+
+            logger.info("Recorded battle: meal %s beat meal %s", winner_id, loser_id)
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
+
+def record_battles(results: Iterable[Tuple[int, int]]) -> None:
+    """
+    Records many battles, given as (winner_id, loser_id) pairs, in a single transaction.
+    Every meal is checked before anything is written, so either all results are recorded or none.
+    """
+    battles = Counter()
+    wins = Counter()
+    for winner_id, loser_id in results:
+        if winner_id == loser_id:
+            logger.error("Meal with ID %s cannot battle itself", winner_id)
+            raise ValueError(f"Meal with ID {winner_id} cannot battle itself")
+        battles[winner_id] += 1
+        battles[loser_id] += 1
+        wins[winner_id] += 1
+    if not battles:
+        return
+
+    meal_ids = list(battles)
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            deleted_by_id = {}
+            for start in range(0, len(meal_ids), MAX_SQL_VARIABLES):
+                chunk = meal_ids[start:start + MAX_SQL_VARIABLES]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT id, deleted FROM meals WHERE id IN ({placeholders})", chunk)
+                deleted_by_id.update(cursor.fetchall())
+
+            for meal_id in meal_ids:
+                if meal_id not in deleted_by_id:
+                    logger.info("Meal with ID %s not found", meal_id)
+                    raise ValueError(f"Meal with ID {meal_id} not found")
+                if deleted_by_id[meal_id]:
+                    logger.info("Meal with ID %s has been deleted", meal_id)
+                    raise ValueError(f"Meal with ID {meal_id} has been deleted")
+
+            cursor.executemany(
+                "UPDATE meals SET battles = battles + ?, wins = wins + ? WHERE id = ?",
+                [(battles[meal_id], wins[meal_id], meal_id) for meal_id in meal_ids]
+            )
+            conn.commit()
+
+            logger.info("Recorded %d battles for %d meals", sum(wins.values()), len(meal_ids))
+
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", str(e))
+        raise e
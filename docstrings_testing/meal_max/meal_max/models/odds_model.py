@@ -0,0 +1,122 @@
+import logging
+import math
+from typing import List, Optional
+
+import numpy as np
+
+from meal_max.models.kitchen_model import Meal, get_all_meals, get_battle_score, get_meals_by_ids
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# trial counts for the battle odds simulator
+ODDS_DEFAULT_TRIALS = 1000000
+ODDS_MAX_TRIALS = 100000000
+ODDS_MATRIX_DEFAULT_TRIALS = 10000
+ODDS_MATRIX_MAX_MEALS = 1000
+
+# random numbers drawn per vectorised batch, about 8 MB of floats
+SIMULATION_CHUNK_SIZE = 1000000
+
+
+def battle_scores(meals: List[Meal]) -> np.ndarray:
+    """Returns the cached battle scores of the meals as an array."""
+    return np.fromiter((get_battle_score(meal) for meal in meals), dtype=np.float64, count=len(meals))
+
+def exact_win_probabilities(scores: np.ndarray) -> np.ndarray:
+    """
+    Returns the probability that meal i wins when it is the first combatant against meal j.
+
+    BattleModel.battle() lets the first combatant win when the score delta, divided by 100,
+    is greater than a uniform draw from [0, 1), which happens with probability clamp(delta, 0, 1).
+    """
+    delta = np.abs(scores[:, np.newaxis] - scores[np.newaxis, :]) / 100
+    return np.clip(delta, 0.0, 1.0)
+
+def simulate_first_combatant_wins(delta: float, trials: int, rng: np.random.Generator) -> int:
+    """Replays the battle decision rule trials times and counts the first combatant's wins."""
+    wins = 0
+    remaining = trials
+    while remaining:
+        batch = min(remaining, SIMULATION_CHUNK_SIZE)
+        wins += int(np.count_nonzero(delta > rng.random(batch)))
+        remaining -= batch
+    return wins
+
+
+def _validate_trials(trials: int, max_trials: int) -> None:
+    if not 1 <= trials <= max_trials:
+        logger.error("Invalid number of trials: %s", trials)
+        raise ValueError(f"Invalid number of trials: {trials} (must be between 1 and {max_trials}).")
+
+def _entry(meal: Meal, score: float) -> dict:
+    return {"id": meal.id, "meal": meal.meal, "score": score}
+
+
+def get_battle_odds(meal_1_id: int, meal_2_id: int, trials: int = ODDS_DEFAULT_TRIALS, seed: Optional[int] = None) -> dict:
+    """
+    Returns the exact and simulated win probabilities of a battle between two meals, with
+    meal_1 prepped as the first combatant. Nothing is written to the database.
+
+    The simulation draws from its own NumPy generator rather than the configured random
+    source, so a million trials take milliseconds; pass seed to make it repeatable.
+    """
+    _validate_trials(trials, ODDS_MAX_TRIALS)
+    if meal_1_id == meal_2_id:
+        logger.error("Meal with ID %s cannot battle itself", meal_1_id)
+        raise ValueError(f"Meal with ID {meal_1_id} cannot battle itself")
+
+    meals = get_meals_by_ids([meal_1_id, meal_2_id])
+    scores = battle_scores(meals)
+    exact = float(exact_win_probabilities(scores)[0, 1])
+
+    rng = np.random.default_rng(seed)
+    simulated = simulate_first_combatant_wins(exact, trials, rng) / trials
+    logger.info("Battle odds for %s vs %s: exact %.4f, simulated %.4f over %d trials",
+                meals[0].meal, meals[1].meal, exact, simulated, trials)
+
+    return {
+        "meal_1": _entry(meals[0], float(scores[0])),
+        "meal_2": _entry(meals[1], float(scores[1])),
+        "trials": trials,
+        "exact": {"meal_1": exact, "meal_2": 1 - exact},
+        "simulated": {"meal_1": simulated, "meal_2": 1 - simulated},
+        "standard_error": math.sqrt(exact * (1 - exact) / trials),
+    }
+
+def get_battle_odds_matrix(trials: int = ODDS_MATRIX_DEFAULT_TRIALS, seed: Optional[int] = None) -> dict:
+    """
+    Returns the pairwise win probabilities of every meal in the catalog. Entry [i][j] is the
+    probability that meal i wins when it is the first combatant against meal j, and the
+    diagonal is null. Nothing is written to the database.
+
+    Each pair's wins over the trials are drawn from the binomial distribution of the decision
+    rule, so the whole matrix is one vectorised draw whatever the number of trials.
+    """
+    _validate_trials(trials, ODDS_MAX_TRIALS)
+    meals = get_all_meals()
+    if len(meals) > ODDS_MATRIX_MAX_MEALS:
+        logger.error("Too many meals for a battle odds matrix: %d", len(meals))
+        raise ValueError(f"The battle odds matrix supports at most {ODDS_MATRIX_MAX_MEALS} meals.")
+
+    scores = battle_scores(meals)
+    exact = exact_win_probabilities(scores)
+    rng = np.random.default_rng(seed)
+    simulated = rng.binomial(trials, exact) / trials
+
+    exact_rows = exact.tolist()
+    simulated_rows = simulated.tolist()
+    for index in range(len(meals)):
+        exact_rows[index][index] = None
+        simulated_rows[index][index] = None
+
+    logger.info("Computed battle odds matrix for %d meals over %d trials per pair", len(meals), trials)
+    return {
+        "meals": [_entry(meal, float(score)) for meal, score in zip(meals, scores)],
+        "trials": trials,
+        "exact": exact_rows,
+        "simulated": simulated_rows,
+    }
@@ -0,0 +1,235 @@
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+from meal_max.models.battle_model import BattleModel, combatant_1_wins
+from meal_max.models.kitchen_model import Meal, get_meals_by_ids, record_battles
+from meal_max.utils.logger import configure_logger
+from meal_max.utils.random_utils import get_randoms
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+TOURNAMENT_FORMATS = ("single_elimination", "round_robin", "swiss")
+
+# largest field accepted, a round robin of this size is 32,640 battles
+MAX_TOURNAMENT_SIZE = 256
+
+# pairings tried per Swiss round before giving up on avoiding rematches
+SWISS_PAIRING_MAX_STEPS = 100000
+
+
+class TournamentModel:
+    """
+    Runs a whole tournament between meals in one request.
+
+    Every combatant is scored once with BattleModel.get_battle_score, the random numbers for
+    every battle are drawn in one batch before the first battle, and all of the results are
+    committed in a single transaction once the tournament is over. Battles follow the same
+    rule as BattleModel.battle(). Meals are seeded in the order their ids are given.
+
+    Swiss rounds pair meals by standings, searching for pairings in which no two meals meet
+    twice. With an odd number of meals, one meal per round sits out with a bye, credited as a
+    win in the standings but not recorded as a battle; no meal gets a second bye, as there are
+    fewer rounds than meals. Late in a long Swiss tournament a pairing without rematches may
+    not exist (six meals whose unplayed pairs form two triangles, for example), or may not be
+    found within SWISS_PAIRING_MAX_STEPS. The round then pairs each meal with the next one in
+    the standings it has not met yet, or with the next one if it has met them all, and logs
+    a warning for every rematch.
+
+    A model holds the state of the tournament it is running, so use one per run.
+    """
+
+    def __init__(self, battle_model: Optional[BattleModel] = None):
+        self.battle_model = battle_model or BattleModel()
+
+    def run(self, meal_ids: List[int], tournament_format: str = "single_elimination", rounds: Optional[int] = None) -> dict:
+        if tournament_format not in TOURNAMENT_FORMATS:
+            logger.error("Invalid tournament format: %s", tournament_format)
+            raise ValueError(f"Invalid tournament format: {tournament_format}. Must be one of {', '.join(TOURNAMENT_FORMATS)}.")
+        if len(meal_ids) < 2:
+            logger.error("Not enough meals for a tournament: %d", len(meal_ids))
+            raise ValueError("A tournament needs at least two meals.")
+        if len(meal_ids) > MAX_TOURNAMENT_SIZE:
+            logger.error("Too many meals for a tournament: %d", len(meal_ids))
+            raise ValueError(f"A tournament can have at most {MAX_TOURNAMENT_SIZE} meals.")
+        if len(set(meal_ids)) != len(meal_ids):
+            logger.error("Duplicate meals in tournament: %s", meal_ids)
+            raise ValueError("Each meal can only enter a tournament once.")
+        if tournament_format == "swiss":
+            rounds = rounds or math.ceil(math.log2(len(meal_ids)))
+            if not 1 <= rounds <= len(meal_ids) - 1:
+                raise ValueError(f"Invalid number of Swiss rounds: {rounds} (must be between 1 and {len(meal_ids) - 1}).")
+
+        meals = get_meals_by_ids(meal_ids)
+        logger.info("Starting %s tournament with %d meals", tournament_format, len(meals))
+
+        self._meals: Dict[int, Meal] = {meal.id: meal for meal in meals}
+        self._scores = {meal.id: self.battle_model.get_battle_score(meal) for meal in meals}
+        self._seeds = {meal.id: seed for seed, meal in enumerate(meals, start=1)}
+        self._wins = {meal.id: 0 for meal in meals}
+        self._losses = {meal.id: 0 for meal in meals}
+        self._results = []
+
+        if tournament_format == "single_elimination":
+            num_battles = len(meals) - 1
+        elif tournament_format == "round_robin":
+            num_battles = len(meals) * (len(meals) - 1) // 2
+        else:
+            num_battles = rounds * (len(meals) // 2)
+        self._random_numbers = iter(get_randoms(num_battles))
+
+        if tournament_format == "single_elimination":
+            bracket = self._single_elimination(list(self._meals))
+            champion = bracket[-1][0]["winner"]
+        elif tournament_format == "round_robin":
+            bracket = self._round_robin(list(self._meals))
+            champion = None
+        else:
+            bracket = self._swiss(list(self._meals), rounds)
+            champion = None
+
+        standings = self._standings()
+        if champion is None:
+            champion = standings[0]["id"]
+
+        record_battles(self._results)
+        logger.info("Tournament finished after %d battles, champion: %s", len(self._results), self._meals[champion].meal)
+
+        return {
+            "format": tournament_format,
+            "rounds": bracket,
+            "standings": standings,
+            "champion": self._entry(champion),
+            "battles": len(self._results),
+        }
+
+    def _battle(self, meal_1_id: int, meal_2_id: int) -> dict:
+        random_number = next(self._random_numbers)
+        if combatant_1_wins(self._scores[meal_1_id], self._scores[meal_2_id], random_number):
+            winner_id, loser_id = meal_1_id, meal_2_id
+        else:
+            winner_id, loser_id = meal_2_id, meal_1_id
+        self._wins[winner_id] += 1
+        self._losses[loser_id] += 1
+        self._results.append((winner_id, loser_id))
+        return {
+            "meal_1": self._entry(meal_1_id),
+            "meal_2": self._entry(meal_2_id),
+            "random_number": random_number,
+            "winner": winner_id,
+        }
+
+    def _bye(self, meal_id: int) -> dict:
+        return {"meal_1": self._entry(meal_id), "meal_2": None, "random_number": None, "winner": meal_id}
+
+    def _entry(self, meal_id: int) -> dict:
+        meal = self._meals[meal_id]
+        return {"id": meal.id, "meal": meal.meal, "seed": self._seeds[meal_id], "score": self._scores[meal_id]}
+
+    def _single_elimination(self, meal_ids: List[int]) -> List[List[dict]]:
+        # Standard bracket order, so the top seeds get the byes and only meet in the late rounds
+        size = 1
+        order = [1]
+        while size < len(meal_ids):
+            size *= 2
+            order = [seed for pair in ((seed, size + 1 - seed) for seed in order) for seed in pair]
+        slots = [meal_ids[seed - 1] if seed <= len(meal_ids) else None for seed in order]
+
+        bracket = []
+        while len(slots) > 1:
+            matches = []
+            for meal_1_id, meal_2_id in zip(slots[::2], slots[1::2]):
+                if meal_2_id is None:
+                    matches.append(self._bye(meal_1_id))
+                elif meal_1_id is None:
+                    matches.append(self._bye(meal_2_id))
+                else:
+                    matches.append(self._battle(meal_1_id, meal_2_id))
+            bracket.append(matches)
+            slots = [match["winner"] for match in matches]
+        return bracket
+
+    def _round_robin(self, meal_ids: List[int]) -> List[List[dict]]:
+        # Circle method: keep the first meal fixed and rotate the rest one place per round
+        circle = meal_ids + [None] if len(meal_ids) % 2 else list(meal_ids)
+        bracket = []
+        for _ in range(len(circle) - 1):
+            matches = []
+            for index in range(len(circle) // 2):
+                meal_1_id, meal_2_id = circle[index], circle[-1 - index]
+                if meal_1_id is None or meal_2_id is None:
+                    matches.append(self._bye(meal_1_id if meal_2_id is None else meal_2_id))
+                else:
+                    matches.append(self._battle(meal_1_id, meal_2_id))
+            bracket.append(matches)
+            circle = [circle[0], circle[-1]] + circle[1:-1]
+        return bracket
+
+    def _swiss(self, meal_ids: List[int], rounds: int) -> List[List[dict]]:
+        played = set()
+        had_bye = set()
+        bracket = []
+        for _ in range(rounds):
+            ranked = sorted(meal_ids, key=lambda meal_id: (-self._wins[meal_id], self._seeds[meal_id]))
+            bye_id, pairs = self._swiss_pairings(ranked, played, had_bye)
+
+            matches = []
+            for meal_1_id, meal_2_id in pairs:
+                if frozenset((meal_1_id, meal_2_id)) in played:
+                    logger.warning("Swiss rematch between meals %d and %d", meal_1_id, meal_2_id)
+                played.add(frozenset((meal_1_id, meal_2_id)))
+                matches.append(self._battle(meal_1_id, meal_2_id))
+            if bye_id is not None:
+                had_bye.add(bye_id)
+                self._wins[bye_id] += 1
+                matches.append(self._bye(bye_id))
+            bracket.append(matches)
+        return bracket
+
+    def _swiss_pairings(self, ranked: List[int], played: set, had_bye: set) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+        # The bye goes to the lowest ranked meal without one that leaves a pairing without rematches
+        if len(ranked) % 2:
+            bye_candidates = [meal_id for meal_id in reversed(ranked) if meal_id not in had_bye]
+        else:
+            bye_candidates = [None]
+        steps = [SWISS_PAIRING_MAX_STEPS]
+        for bye_id in bye_candidates:
+            pairs = self._pair_without_rematches([meal_id for meal_id in ranked if meal_id != bye_id], played, steps)
+            if pairs is not None:
+                return bye_id, pairs
+
+        bye_id = bye_candidates[0]
+        unpaired = [meal_id for meal_id in ranked if meal_id != bye_id]
+        pairs = []
+        while unpaired:
+            meal_1_id = unpaired.pop(0)
+            opponent = next((meal_id for meal_id in unpaired if frozenset((meal_1_id, meal_id)) not in played), unpaired[0])
+            unpaired.remove(opponent)
+            pairs.append((meal_1_id, opponent))
+        return bye_id, pairs
+
+    def _pair_without_rematches(self, unpaired: List[int], played: set, steps: List[int]) -> Optional[List[Tuple[int, int]]]:
+        # Pair the best ranked meal with the next one it has not met, backtracking on dead ends
+        if not unpaired:
+            return []
+        meal_1_id, rest = unpaired[0], unpaired[1:]
+        for index, opponent in enumerate(rest):
+            if frozenset((meal_1_id, opponent)) in played:
+                continue
+            steps[0] -= 1
+            if steps[0] < 0:
+                return None
+            pairs = self._pair_without_rematches(rest[:index] + rest[index + 1:], played, steps)
+            if pairs is not None:
+                return [(meal_1_id, opponent)] + pairs
+        return None
+
+    def _standings(self) -> List[dict]:
+        order = sorted(self._meals, key=lambda meal_id: (-self._wins[meal_id], self._losses[meal_id], self._seeds[meal_id]))
+        return [
+            {**self._entry(meal_id), "wins": self._wins[meal_id], "losses": self._losses[meal_id]}
+            for meal_id in order
+        ]
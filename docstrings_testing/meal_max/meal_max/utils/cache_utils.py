@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# read-through cache settings, a size of 0 disables caching
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+
+
+class ReadThroughCache:
+    """
+    A thread-safe LRU cache with a time to live, filled by the loader passed to each lookup.
+
+    A loader that raises ValueError (a missing or deleted row) is cached as a negative entry
+    and the same error is raised on later hits. Entries can be tagged with the ID of the row
+    they came from, so every key that resolved to a row is dropped when the row changes.
+
+    Attributes:
+        name (str): The name used in logs and stats.
+        max_size (int): The maximum number of entries, the least recently used are evicted.
+        ttl (float): The number of seconds an entry stays valid.
+        stats (dict): Counters for hits, negative hits, misses, evictions, expirations and invalidations.
+    """
+
+    def __init__(self, name: str, max_size: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL):
+        if max_size < 0:
+            raise ValueError(f"Cache size must not be negative, got {max_size}")
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, error, expires_at, entity_id)
+        self._keys_by_id: Dict[Any, Set[Hashable]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], entity_id: Optional[Any] = None) -> Any:
+        """
+        Returns the cached value for key, calling loader and caching its result on a miss.
+
+        Args:
+            key (Hashable): The cache key.
+            loader (Callable): Loads the value, raising ValueError if it does not exist.
+            entity_id (Any, optional): The row ID the key refers to, used to tag negative entries.
+                Positive entries are tagged with the id attribute of the loaded value.
+
+        Returns:
+            Any: The cached or loaded value.
+
+        Raises:
+            ValueError: If the loader raised ValueError, now or when the entry was cached.
+        """
+        if not self.max_size:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    if entry[1] is not None:
+                        self.stats["negative_hits"] += 1
+                else:
+                    self._remove(key)
+                    self.stats["expirations"] += 1
+                    entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                version = self._version
+
+        if entry is not None:
+            if entry[1] is not None:
+                raise ValueError(entry[1])
+            return entry[0]
+
+        try:
+            value = loader()
+        except ValueError as e:
+            self._store(key, None, str(e), entity_id, version)
+            raise
+        self._store(key, value, None, getattr(value, "id", entity_id), version)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drops the entry for key, if any.
+        """
+        with self._lock:
+            self._version += 1
+            if self._remove(key):
+                self.stats["invalidations"] += 1
+
+    def invalidate_id(self, entity_id: Any) -> None:
+        """
+        Drops every entry tagged with the given row ID.
+        """
+        with self._lock:
+            self._version += 1
+            for key in list(self._keys_by_id.get(entity_id, ())):
+                self._remove(key)
+                self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        """
+        Drops every entry.
+        """
+        with self._lock:
+            self._version += 1
+            self.stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._keys_by_id.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Returns the counters along with the current and maximum size.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._entries)
+        stats["name"] = self.name
+        stats["max_size"] = self.max_size
+        stats["ttl"] = self.ttl
+        return stats
+
+    def _store(self, key: Hashable, value: Any, error: Optional[str], entity_id: Optional[Any], version: int) -> None:
+        with self._lock:
+            # An invalidation ran while the value was loading, so it may already be stale
+            if version != self._version:
+                return
+            self._remove(key)
+            self._entries[key] = (value, error, time.monotonic() + self.ttl, entity_id)
+            if entity_id is not None:
+                self._keys_by_id.setdefault(entity_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entity_id = entry[3]
+        if entity_id is not None:
+            keys = self._keys_by_id.get(entity_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_id[entity_id]
+        return True
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import logging
+from typing import IO, Iterator, Union
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+IMPORT_FORMATS = ("jsonl", "csv")
+
+# content types accepted in place of an explicit format
+IMPORT_CONTENT_TYPES = {
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/x-jsonlines": "jsonl",
+    "application/json-lines": "jsonl",
+    "text/csv": "csv",
+}
+
+
+def get_import_format(import_format: str = None, content_type: str = None) -> str:
+    """
+    Returns the import format named explicitly or implied by the content type.
+
+    Args:
+        import_format (str, optional): Either 'jsonl' or 'csv'.
+        content_type (str, optional): The content type of the request body, used when no format is given.
+
+    Returns:
+        str: The import format.
+
+    Raises:
+        ValueError: If the format is unknown or cannot be worked out from the content type.
+    """
+    if not import_format and content_type:
+        import_format = IMPORT_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    if import_format not in IMPORT_FORMATS:
+        logger.error("Invalid import format: %s (content type %s)", import_format, content_type)
+        raise ValueError(f"Invalid import format: {import_format}. Must be one of {', '.join(IMPORT_FORMATS)}.")
+    return import_format
+
+def iter_json_lines(stream: IO[str]) -> Iterator[Union[dict, ValueError]]:
+    """
+    Yields one record per non-blank line of a JSON Lines stream, without reading the whole stream.
+
+    A line that is not a JSON object is yielded as a ValueError describing it, so the caller
+    can report the row and carry on with the rest of the stream.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON on line {line_number}: {e.msg}")
+            continue
+        if not isinstance(record, dict):
+            yield ValueError(f"Line {line_number} is not a JSON object")
+            continue
+        yield record
+
+def iter_csv_rows(stream: IO[str]) -> Iterator[Union[dict, ValueError]]:
+    """
+    Yields one record per row of a CSV stream with a header row, without reading the whole stream.
+
+    A row with more or fewer fields than the header is yielded as a ValueError describing it.
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        if None in row or None in row.values():
+            yield ValueError(f"Line {reader.line_num} has {len(reader.fieldnames or ())} header fields but a different number of values")
+            continue
+        yield row
+
+class ReadOnlyStream(io.RawIOBase):
+    """
+    Adapts a stream that only has read(), such as the WSGI input of gunicorn, so it can be
+    buffered and decoded by the io module.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def iter_records(stream: Union[IO[str], IO[bytes]], import_format: str) -> Iterator[Union[dict, ValueError]]:
+    """
+    Yields the records of a JSON Lines or CSV stream. Binary streams are decoded as UTF-8.
+
+    Args:
+        stream (IO): The text or binary stream to read.
+        import_format (str): Either 'jsonl' or 'csv'.
+
+    Returns:
+        Iterator[dict | ValueError]: The records, with malformed rows as ValueErrors.
+    """
+    import_format = get_import_format(import_format)
+    if not isinstance(stream, io.IOBase):
+        stream = io.BufferedReader(ReadOnlyStream(stream))
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        return iter_csv_rows(stream)
+    return iter_json_lines(stream)
@@ -1,4 +1,13 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from decimal import Decimal, InvalidOperation
 import logging
+import os
+import random
+import secrets
+import threading
+import time
+
 import requests
 
 from meal_max.utils.logger import configure_logger
@@ -7,32 +16,310 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-def get_random() -> float:
-    url = "https://www.random.org/decimal-fractions/?num=1&dec=2&col=1&format=plain&rnd=new"
+# load the random source settings from the environment with default values
+RANDOM_SOURCE = os.getenv("RANDOM_SOURCE", "system")
+RANDOM_SEED = os.getenv("RANDOM_SEED", "0")
+
+# prefetch settings for the buffered random.org source
+RANDOM_ORG_BATCH_SIZE = int(os.getenv("RANDOM_ORG_BATCH_SIZE", "1000"))
+RANDOM_ORG_LOW_WATER = int(os.getenv("RANDOM_ORG_LOW_WATER", "250"))
+RANDOM_ORG_DECIMALS = int(os.getenv("RANDOM_ORG_DECIMALS", "10"))
+RANDOM_ORG_WAIT_TIMEOUT = float(os.getenv("RANDOM_ORG_WAIT_TIMEOUT", "5"))
+
+# random.org limits for the decimal-fractions endpoint
+RANDOM_ORG_MAX_BATCH = 10000
+RANDOM_ORG_MAX_DECIMALS = 20
+
+
+class RandomSource(ABC):
+    """Base class for the sources get_random() draws from. random() returns a float in [0, 1)."""
+
+    name = "base"
+
+    @abstractmethod
+    def random(self) -> float:
+        """Returns a random float in [0, 1)."""
+
+    def randoms(self, count: int) -> list:
+        return [self.random() for _ in range(count)]
+
+    def get_stats(self) -> dict:
+        return {"source": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class SystemRandomSource(RandomSource):
+    """Draws from the operating system CSPRNG, never touches the network."""
+
+    name = "system"
+
+    def __init__(self):
+        self._random = secrets.SystemRandom()
 
-    try:
-        # Log the request to random.org
-        logger.info("Fetching random number from %s", url)
+    def random(self) -> float:
+        return self._random.random()
 
-        response = requests.get(url, timeout=5)
 
-        # Check if the request was successful
-        response.raise_for_status()
+class SeededRandomSource(RandomSource):
+    """Draws from a seeded Mersenne Twister so that battles can be replayed."""
 
-        random_number_str = response.text.strip()
+    name = "seeded"
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def random(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+
+class RandomOrgSource(RandomSource):
+    """Fetches every random number from random.org with a blocking HTTPS request."""
+
+    name = "random_org"
+
+    def random(self) -> float:
+        url = "https://www.random.org/decimal-fractions/?num=1&dec=2&col=1&format=plain&rnd=new"
 
         try:
-            random_number = float(random_number_str)
+            # Log the request to random.org
+            logger.info("Fetching random number from %s", url)
+
+            response = requests.get(url, timeout=5)
+
+            # Check if the request was successful
+            response.raise_for_status()
+
+            random_number_str = response.text.strip()
+
+            try:
+                random_number = float(random_number_str)
+            except ValueError:
+                raise ValueError("Invalid response from random.org: %s" % random_number_str)
+
+            logger.info("Received random number: %.3f", random_number)
+            return random_number
+
+        except requests.exceptions.Timeout:
+            logger.error("Request to random.org timed out.")
+            raise RuntimeError("Request to random.org timed out.")
+
+        except requests.exceptions.RequestException as e:
+            logger.error("Request to random.org failed: %s", e)
+            raise RuntimeError("Request to random.org failed: %s" % e)
+
+    def randoms(self, count: int) -> list:
+        # One request per batch of up to 10,000 fractions instead of one per number
+        numbers = []
+        while len(numbers) < count:
+            num = min(count - len(numbers), RANDOM_ORG_MAX_BATCH)
+            url = f"https://www.random.org/decimal-fractions/?num={num}&dec=2&col=1&format=plain&rnd=new"
+            logger.info("Fetching %d random numbers from random.org", num)
+
+            try:
+                response = requests.get(url, timeout=5)
+                response.raise_for_status()
+            except requests.exceptions.Timeout:
+                logger.error("Request to random.org timed out.")
+                raise RuntimeError("Request to random.org timed out.")
+            except requests.exceptions.RequestException as e:
+                logger.error("Request to random.org failed: %s", e)
+                raise RuntimeError("Request to random.org failed: %s" % e)
+
+            lines = response.text.split()[:num]
+            if not lines:
+                raise ValueError("Invalid response from random.org: empty response")
+            for line in lines:
+                try:
+                    numbers.append(float(line))
+                except ValueError:
+                    raise ValueError("Invalid response from random.org: %s" % line)
+        return numbers
+
+
+class BufferedRandomOrgSource(RandomSource):
+    """
+    Serves random numbers from a ring buffer of random.org decimal fractions.
+
+    A background thread fetches fractions in batches of up to 10,000 and tops the buffer
+    up whenever it drops below the low-water mark. If the buffer stays empty for longer
+    than wait_timeout the draw falls back to the system CSPRNG and is counted.
+
+    Attributes:
+        batch_size (int): The number of fractions fetched per request.
+        low_water (int): The buffer depth that triggers a refill.
+        capacity (int): The maximum number of buffered fractions.
+        decimals (int): The number of decimal places requested from random.org.
+        wait_timeout (float): The number of seconds a draw waits for a refill.
+    """
+
+    name = "random_org_buffered"
+
+    def __init__(self, batch_size: int = RANDOM_ORG_BATCH_SIZE, low_water: int = RANDOM_ORG_LOW_WATER,
+                 decimals: int = RANDOM_ORG_DECIMALS, wait_timeout: float = RANDOM_ORG_WAIT_TIMEOUT,
+                 fallback: RandomSource = None):
+        if not 1 <= batch_size <= RANDOM_ORG_MAX_BATCH:
+            raise ValueError(f"Invalid batch size: {batch_size} (must be between 1 and {RANDOM_ORG_MAX_BATCH}).")
+        if not 1 <= decimals <= RANDOM_ORG_MAX_DECIMALS:
+            raise ValueError(f"Invalid decimals: {decimals} (must be between 1 and {RANDOM_ORG_MAX_DECIMALS}).")
+        self.batch_size = batch_size
+        self.low_water = min(low_water, batch_size)
+        self.capacity = batch_size + self.low_water
+        self.decimals = decimals
+        self.wait_timeout = wait_timeout
+        self._space = 10 ** decimals
+        self._fallback = fallback or SystemRandomSource()
+        self._buffer = deque(maxlen=self.capacity)
+        self._lock = threading.Lock()
+        self._refilled = threading.Condition(self._lock)
+        self._refill_needed = threading.Event()
+        self._stopped = threading.Event()
+        self.stats = {
+            "refills": 0,
+            "refill_failures": 0,
+            "last_refill_latency": None,
+            "fallbacks": 0,
+        }
+        self._refill_needed.set()
+        self._thread = threading.Thread(target=self._refill_loop, name="random-org-refill", daemon=True)
+        self._thread.start()
+
+    def random(self) -> float:
+        return self._take() / self._space
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["depth"] = len(self._buffer)
+        stats["source"] = self.name
+        stats["capacity"] = self.capacity
+        return stats
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._refill_needed.set()
+        self._thread.join(timeout=self.wait_timeout)
+
+    def fetch_fractions(self, num: int) -> list:
+        url = f"https://www.random.org/decimal-fractions/?num={num}&dec={self.decimals}&col=1&format=plain&rnd=new"
+        logger.info("Fetching %d random fractions from random.org", num)
+
+        try:
+            response = requests.get(url, timeout=5)
+            response.raise_for_status()
+        except requests.exceptions.Timeout:
+            logger.error("Request to random.org timed out.")
+            raise RuntimeError("Request to random.org timed out.")
+        except requests.exceptions.RequestException as e:
+            logger.error("Request to random.org failed: %s", e)
+            raise RuntimeError("Request to random.org failed: %s" % e)
+
+        numerators = []
+        for line in response.text.split()[:num]:
+            try:
+                numerator = int(Decimal(line).scaleb(self.decimals))
+            except InvalidOperation:
+                raise ValueError("Invalid response from random.org: %s" % line)
+            if not 0 <= numerator < self._space:
+                raise ValueError("Invalid response from random.org: %s" % line)
+            numerators.append(numerator)
+        return numerators
+
+    def _take(self) -> int:
+        with self._lock:
+            if not self._buffer:
+                self._refill_needed.set()
+                self._refilled.wait_for(lambda: self._buffer or self._stopped.is_set(), timeout=self.wait_timeout)
+            if self._buffer:
+                numerator = self._buffer.popleft()
+                if len(self._buffer) < self.low_water:
+                    self._refill_needed.set()
+                return numerator
+            self.stats["fallbacks"] += 1
+
+        logger.warning("random.org buffer is empty, falling back to the %s source", self._fallback.name)
+        return int(self._fallback.random() * self._space)
+
+    def _refill_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._refill_needed.wait()
+            if self._stopped.is_set():
+                break
+            self._refill_needed.clear()
+
+            with self._lock:
+                depth = len(self._buffer)
+            # A draw may have asked for a refill that an earlier batch already covered
+            if depth >= self.low_water:
+                continue
+            num = min(self.batch_size, self.capacity - depth)
+
+            start = time.monotonic()
+            try:
+                numerators = self.fetch_fractions(num)
+            except (RuntimeError, ValueError) as e:
+                logger.error("Failed to refill random.org buffer: %s", e)
+                with self._lock:
+                    self.stats["refill_failures"] += 1
+                # Back off before retrying so an outage does not turn into a request storm
+                self._stopped.wait(self.wait_timeout)
+                self._refill_needed.set()
+                continue
+            latency = time.monotonic() - start
+
+            with self._lock:
+                self._buffer.extend(numerators)
+                self.stats["refills"] += 1
+                self.stats["last_refill_latency"] = latency
+                depth = len(self._buffer)
+                self._refilled.notify_all()
+            logger.info("Refilled random.org buffer with %d fractions in %.3fs (depth %d)", len(numerators), latency, depth)
+
+
+def create_random_source(name: str = None) -> RandomSource:
+    name = name or RANDOM_SOURCE
+    if name == SystemRandomSource.name:
+        return SystemRandomSource()
+    if name == SeededRandomSource.name:
+        try:
+            seed = int(RANDOM_SEED)
         except ValueError:
-            raise ValueError("Invalid response from random.org: %s" % random_number_str)
+            raise ValueError(f"Invalid random seed: {RANDOM_SEED} (must be an integer).")
+        return SeededRandomSource(seed)
+    if name == RandomOrgSource.name:
+        return RandomOrgSource()
+    if name == BufferedRandomOrgSource.name:
+        return BufferedRandomOrgSource()
+    raise ValueError(f"Invalid random source: {name}. Must be 'system', 'seeded', 'random_org' or 'random_org_buffered'.")
+
+
+_random_source = None
+
 
-        logger.info("Received random number: %.3f", random_number)
-        return random_number
+def get_random_source() -> RandomSource:
+    global _random_source
+    if _random_source is None:
+        _random_source = create_random_source()
+        logger.info("Using random source: %s", _random_source.name)
+    return _random_source
 
-    except requests.exceptions.Timeout:
-        logger.error("Request to random.org timed out.")
-        raise RuntimeError("Request to random.org timed out.")
+def set_random_source(source: RandomSource) -> None:
+    global _random_source
+    previous, _random_source = _random_source, source
+    if previous is not None and previous is not source:
+        previous.close()
+    if source is not None:
+        logger.info("Using random source: %s", source.name)
+
+def get_random_source_stats() -> dict:
+    return get_random_source().get_stats()
+
+def get_random() -> float:
+    return get_random_source().random()
 
-    except requests.exceptions.RequestException as e:
-        logger.error("Request to random.org failed: %s", e)
-        raise RuntimeError("Request to random.org failed: %s" % e)
+def get_randoms(count: int) -> list:
+    return get_random_source().randoms(count)
@@ -2,6 +2,8 @@ from contextlib import contextmanager
 import logging
 import os
 import sqlite3
+import threading
+import time
 
 from meal_max.utils.logger import configure_logger
 
@@ -13,6 +15,67 @@ configure_logger(logger)
 # load the db path from the environment with a default value
 DB_PATH = os.getenv("DB_PATH", "/app/sql/meal_max.db")
 
+# connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_AGE = float(os.getenv("DB_POOL_MAX_AGE", "300"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# pragma profile applied to every pooled connection, individual settings can be overridden
+DB_PRAGMA_PROFILE = os.getenv("DB_PRAGMA_PROFILE", "balanced")
+
+PRAGMA_PROFILES = {
+    # sqlite defaults: rollback journal and a full fsync on every commit
+    "default": {},
+    # WAL lets readers run alongside a writer, NORMAL only fsyncs at checkpoints.
+    # auto_vacuum only applies to new databases and has to be set before journal_mode
+    "balanced": {
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 134217728,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # WAL with an fsync on every commit
+    "durable": {
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # no fsyncs at all, for throwaway databases such as benchmarks and imports
+    "fast": {
+        "auto_vacuum": "INCREMENTAL",
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+# environment variable overrides for the individual pragmas
+PRAGMA_ENV_VARS = {
+    "auto_vacuum": "DB_AUTO_VACUUM",
+    "journal_mode": "DB_JOURNAL_MODE",
+    "synchronous": "DB_SYNCHRONOUS",
+    "cache_size": "DB_CACHE_SIZE",
+    "mmap_size": "DB_MMAP_SIZE",
+    "temp_store": "DB_TEMP_STORE",
+    "busy_timeout": "DB_BUSY_TIMEOUT",
+}
+
+PRAGMA_CHOICES = {
+    "auto_vacuum": {"NONE", "FULL", "INCREMENTAL"},
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+
 
 def check_database_connection():
     try:
@@ -37,6 +100,217 @@ def check_table_exists(tablename: str):
         logger.error(error_message)
         raise Exception(error_message) from e
 
+def get_pragma_settings(profile: str = None) -> dict:
+    profile = profile or DB_PRAGMA_PROFILE
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Invalid pragma profile: {profile}. Must be one of {sorted(PRAGMA_PROFILES)}.")
+
+    settings = dict(PRAGMA_PROFILES[profile])
+    for pragma, env_var in PRAGMA_ENV_VARS.items():
+        value = os.getenv(env_var)
+        if value:
+            settings[pragma] = value
+
+    # pragma values cannot be bound as parameters, so only known values are let through
+    for pragma, value in settings.items():
+        if pragma in PRAGMA_CHOICES:
+            value = str(value).upper()
+            if value not in PRAGMA_CHOICES[pragma]:
+                raise ValueError(f"Invalid value for {pragma}: {value}")
+        else:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"Invalid value for {pragma}: {value} (must be an integer)")
+        settings[pragma] = value
+
+    return settings
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: dict) -> None:
+    for pragma, value in pragmas.items():
+        conn.execute(f"PRAGMA {pragma} = {value};")
+
+class ConnectionPool:
+    """
+    A bounded pool of SQLite connections.
+
+    Each thread holds at most one connection at a time: nested checkouts on the same
+    thread reuse the connection that thread already holds. Idle connections are health
+    checked when they are checked out and recycled once they are older than max_age.
+
+    Attributes:
+        db_path (str): The path of the SQLite database file.
+        max_size (int): The maximum number of open connections.
+        max_age (float): The number of seconds after which a connection is recycled.
+        timeout (float): The number of seconds to wait for a free connection.
+        pragmas (dict): The pragma settings applied to every new connection.
+        stats (dict): Counters for hits, waits, opens, recycles and health check failures.
+    """
+
+    def __init__(self, db_path: str, max_size: int = DB_POOL_SIZE, max_age: float = DB_POOL_MAX_AGE,
+                 timeout: float = DB_POOL_TIMEOUT, pragmas: dict = None):
+        if max_size < 1:
+            raise ValueError(f"Pool size must be at least 1, got {max_size}")
+        self.db_path = db_path
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.pragmas = get_pragma_settings() if pragmas is None else pragmas
+        self.stats = {"hits": 0, "waits": 0, "opens": 0, "recycles": 0, "health_check_failures": 0}
+        self._idle = []  # (connection, created_at) pairs, most recently returned last
+        self._open_count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def acquire(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "conn", None) is not None:
+            local.depth += 1
+            return local.conn
+
+        conn, created_at = self._checkout()
+        local.conn, local.created_at, local.depth = conn, created_at, 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        local = self._local
+        if getattr(local, "conn", None) is not conn:
+            raise ValueError("Connection was not checked out by this thread")
+        local.depth -= 1
+        if local.depth > 0:
+            return
+        created_at = local.created_at
+        local.conn = None
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning("Discarding connection that failed to roll back: %s", str(e))
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._open_count -= 1
+                conn.close()
+            else:
+                self._idle.append((conn, created_at))
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open_count -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+        logger.info("Connection pool for %s closed.", self.db_path)
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["open"] = self._open_count
+            stats["idle"] = len(self._idle)
+        return stats
+
+    def _checkout(self) -> tuple:
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.OperationalError("Connection pool is closed")
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    self.stats["hits"] += 1
+                    break
+                if self._open_count < self.max_size:
+                    # Reserve the slot now and open the connection outside the lock
+                    self._open_count += 1
+                    conn = None
+                    break
+                if not waited:
+                    self.stats["waits"] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error("Timed out waiting for a database connection")
+                    raise sqlite3.OperationalError("Timed out waiting for a database connection")
+                self._cond.wait(remaining)
+
+        if conn is None:
+            return self._open()
+
+        if time.monotonic() - created_at > self.max_age:
+            with self._cond:
+                self.stats["recycles"] += 1
+            conn.close()
+            return self._open()
+
+        try:
+            conn.execute("SELECT 1;")
+        except sqlite3.Error as e:
+            logger.warning("Pooled connection failed health check: %s", str(e))
+            with self._cond:
+                self.stats["health_check_failures"] += 1
+            conn.close()
+            return self._open()
+
+        return conn, created_at
+
+    def _open(self) -> tuple:
+        # The caller has already reserved a slot in _open_count
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            apply_pragmas(conn, self.pragmas)
+        except sqlite3.Error:
+            if conn is not None:
+                conn.close()
+            with self._cond:
+                self._open_count -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats["opens"] += 1
+        logger.info("Opened new database connection to %s", self.db_path)
+        return conn, time.monotonic()
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open_count -= 1
+            self._cond.notify()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+def get_pool_stats() -> dict:
+    return get_pool().get_stats()
+
 ###################################################
 #
 # This one yields rather than returns.
@@ -45,14 +319,14 @@ def check_table_exists(tablename: str):
 ###################################################
 @contextmanager
 def get_db_connection():
+    pool = get_pool()
     conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = pool.acquire()
         yield conn
     except sqlite3.Error as e:
         logger.error("Database connection error: %s", str(e))
         raise e
     finally:
         if conn:
-            conn.close()
-            logger.info("Database connection closed.")
+            pool.release(conn)
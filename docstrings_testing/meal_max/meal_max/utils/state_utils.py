@@ -0,0 +1,209 @@
+import functools
+import logging
+from multiprocessing.managers import BaseManager
+import os
+import signal
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from meal_max.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# the address of the state server shared by the worker processes, empty to keep the state in each process
+STATE_SERVER_ADDRESS = os.getenv("STATE_SERVER_ADDRESS", "")
+
+# callbacks registered with on_state_server_exit, only set in the state server process
+_exit_callbacks: List[Callable[[], None]] = []
+
+
+class StateManager(BaseManager):
+    """
+    Serves the models that hold in-memory state, such as the combatants, to every worker process
+    of a preforked server, so they all see the same state.
+
+    Each model is created once in the server process and workers call its public methods through
+    a proxy. Arguments, return values and exceptions are pickled, so a ValueError raised by the
+    model is raised again in the worker.
+
+    Calls to the same model are serialized across every worker (see SynchronizedModel), including
+    any database work the model does inside a call, so a slow call holds up the requests of every
+    worker that uses the model. Requests that do not use a served model run in parallel.
+    """
+
+
+class StateServer:
+    """
+    The state server process started by start_state_server.
+
+    Attributes:
+        address (str): The path of the Unix socket the server listens on.
+        pid (int): The process ID of the server, None once it has been shut down.
+    """
+
+    def __init__(self, address: str, pid: int):
+        self.address = address
+        self.pid = pid
+
+    def shutdown(self) -> None:
+        """Stops the server, which closes its models, and waits for it to exit."""
+        if self.pid is None:
+            return
+        os.kill(self.pid, signal.SIGTERM)
+        os.waitpid(self.pid, 0)
+        self.pid = None
+        logger.info("State server on %s shut down", self.address)
+
+
+class SynchronizedModel:
+    """
+    Wraps a model so that only one call to its methods runs at a time. The lock is held for
+    the whole call, as the models are not thread-safe and a call such as battle must not
+    interleave with another call changing the same state.
+
+    Attributes:
+        model (Any): The wrapped model.
+    """
+
+    def __init__(self, model: Any):
+        self.model = model
+        self._lock = threading.RLock()
+
+    def __dir__(self) -> List[str]:
+        # The manager exposes the public methods it finds with dir()
+        return dir(self.model)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.model, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return locked
+
+
+def start_state_server(address: str, models: Dict[str, Callable[[], Any]],
+                       initializer: Optional[Callable[[], None]] = None) -> StateServer:
+    """
+    Starts the state server in a forked child process. Call it before the workers are forked.
+
+    The models are created when the server process starts, so nothing they open (database
+    connections, threads) is shared with the parent, and they live until the server shuts
+    down, whichever workers come and go. Models with a close() method are closed on shutdown.
+    The authentication key is the one of the current process, which forked workers inherit.
+
+    The server is forked with os.fork rather than started as a multiprocessing child, so the
+    workers forked after it do not inherit it as a child of their own to join when they exit.
+
+    Args:
+        address (str): The path of the Unix socket to listen on. A stale socket file is removed.
+        models (Dict[str, Callable]): The factories of the models to serve, keyed by the name
+            workers look them up with.
+        initializer (Callable, optional): Called in the server process before the models are
+            created. Use on_state_server_exit to clean up after it.
+
+    Returns:
+        StateServer: The started server, stop it with shutdown().
+
+    Raises:
+        RuntimeError: If the server process exits before it is listening.
+    """
+    if os.path.exists(address):
+        logger.warning("Removing stale state server socket %s", address)
+        os.unlink(address)
+
+    manager_class = type("StateServerManager", (StateManager,), {})
+    instances: Dict[str, SynchronizedModel] = {}
+    for name in models:
+        manager_class.register(name, callable=functools.partial(instances.__getitem__, name))
+
+    ready_fd, ready_write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(ready_fd)
+        status = 1
+        try:
+            _serve(manager_class(address=address), instances, models, initializer, ready_write_fd)
+        except SystemExit:
+            status = 0
+        except BaseException:
+            logger.exception("State server on %s failed", address)
+        finally:
+            os._exit(status)
+
+    os.close(ready_write_fd)
+    with os.fdopen(ready_fd, "rb") as ready:
+        started = ready.read(1)
+    if not started:
+        os.waitpid(pid, 0)
+        logger.error("State server on %s exited before it was listening", address)
+        raise RuntimeError(f"State server on {address} exited before it was listening")
+    logger.info("State server serving %s on %s", ", ".join(models), address)
+    return StateServer(address, pid)
+
+def _serve(manager: StateManager, instances: Dict[str, SynchronizedModel], models: Dict[str, Callable[[], Any]],
+           initializer: Optional[Callable[[], None]], ready_fd: int) -> None:
+    # Runs in the state server process. The parent stops it with SIGTERM, not Ctrl+C on the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if initializer is not None:
+            initializer()
+        for name, factory in models.items():
+            model = factory()
+            if hasattr(model, "close"):
+                on_state_server_exit(model.close)
+            instances[name] = SynchronizedModel(model)
+
+        server = manager.get_server()
+        os.write(ready_fd, b"1")
+        os.close(ready_fd)
+        server.serve_forever()
+    finally:
+        for callback in reversed(_exit_callbacks):
+            try:
+                callback()
+            except Exception:
+                logger.exception("State server exit callback failed")
+        if os.path.exists(manager.address):
+            os.unlink(manager.address)
+
+def on_state_server_exit(callback: Callable[[], None]) -> None:
+    """
+    Registers a callback to run when the state server process shuts down. Callbacks run in
+    the reverse order they were registered in. Call it from the state server initializer.
+    """
+    _exit_callbacks.append(callback)
+
+def connect_state_server(address: str, names: List[str]) -> StateManager:
+    """
+    Connects to the state server started by start_state_server.
+
+    Args:
+        address (str): The path of the Unix socket the state server listens on.
+        names (List[str]): The names of the models to look up.
+
+    Returns:
+        StateManager: The connected manager, call manager.<name>() to get a proxy for a model.
+
+    Raises:
+        ConnectionError: If the state server is not running.
+    """
+    manager_class = type("StateClient", (StateManager,), {})
+    for name in names:
+        manager_class.register(name)
+    manager = manager_class(address=address)
+    try:
+        manager.connect()
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        logger.error("State server is not running on %s: %s", address, e)
+        raise ConnectionError(f"State server is not running on {address}") from e
+    logger.info("Connected to state server on %s", address)
+    return manager
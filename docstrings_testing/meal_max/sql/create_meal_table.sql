@@ -1,4 +1,8 @@
+-- Lets compaction return freed pages to the filesystem, only takes effect on a new database
+PRAGMA auto_vacuum = INCREMENTAL;
+
 DROP TABLE IF EXISTS meals;
+DROP TABLE IF EXISTS meals_archive;
 CREATE TABLE meals (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     meal TEXT NOT NULL UNIQUE,
@@ -7,5 +11,29 @@ CREATE TABLE meals (
     difficulty TEXT CHECK(difficulty IN ('HIGH', 'MED', 'LOW')),
     battles INTEGER DEFAULT 0,
     wins INTEGER DEFAULT 0,
-    deleted BOOLEAN DEFAULT FALSE
-);
\ No newline at end of file
+    deleted BOOLEAN DEFAULT FALSE,
+    win_pct REAL GENERATED ALWAYS AS (CASE WHEN battles > 0 THEN wins * 1.0 / battles END) VIRTUAL,
+    deleted_at INTEGER
+);
+
+-- Keep both leaderboard orderings in index order so pages are read without sorting the table
+CREATE INDEX IF NOT EXISTS idx_meals_leaderboard_wins ON meals (wins DESC, id) WHERE deleted = FALSE AND battles > 0;
+CREATE INDEX IF NOT EXISTS idx_meals_leaderboard_win_pct ON meals (win_pct DESC, id) WHERE deleted = FALSE AND battles > 0;
+
+-- Deleted meals waiting to be moved to the archive by compact_meals
+CREATE INDEX IF NOT EXISTS idx_meals_deleted_at ON meals (deleted_at) WHERE deleted = TRUE;
+
+CREATE TABLE meals_archive (
+    id INTEGER PRIMARY KEY,
+    meal TEXT NOT NULL,
+    cuisine TEXT NOT NULL,
+    price REAL NOT NULL,
+    difficulty TEXT,
+    battles INTEGER,
+    wins INTEGER,
+    deleted_at INTEGER,
+    archived_at INTEGER NOT NULL
+);
+
+-- Matches the last of MEAL_MIGRATIONS in kitchen_model, so a new database needs no migrations
+PRAGMA user_version = 7;
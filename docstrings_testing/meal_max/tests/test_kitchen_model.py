@@ -0,0 +1,328 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from meal_max.models.kitchen_model import (
+    MEAL_MIGRATIONS,
+    Meal,
+    clear_meals,
+    compact_meals,
+    create_meal,
+    create_meals,
+    delete_meal,
+    get_leaderboard,
+    get_meal_by_id,
+    get_meals_by_ids,
+    meal_cache,
+    migrate_meals,
+    record_battle,
+    record_battles,
+)
+from meal_max.utils.migration_utils import get_schema_version
+from meal_max.utils.sql_utils import close_pool
+
+
+CREATE_MEAL_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "create_meal_table.sql")
+
+# The meals table as it was created before schema versions were recorded
+UNVERSIONED_MEALS_TABLE = """
+    CREATE TABLE meals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        meal TEXT NOT NULL UNIQUE,
+        cuisine TEXT NOT NULL,
+        price REAL NOT NULL,
+        difficulty TEXT CHECK(difficulty IN ('HIGH', 'MED', 'LOW')),
+        battles INTEGER DEFAULT 0,
+        wins INTEGER DEFAULT 0,
+        deleted BOOLEAN DEFAULT FALSE
+    )
+"""
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def meals_db(tmp_path, mocker):
+    """Fixture pointing the connection pool at a new migrated database."""
+    path = str(tmp_path / "meals.db")
+    close_pool()
+    meal_cache.clear()
+    mocker.patch("meal_max.utils.sql_utils.DB_PATH", path)
+    with open(CREATE_MEAL_TABLE_PATH, "r") as fh:
+        mocker.patch("meal_max.models.kitchen_model._create_table_script", fh.read())
+    migrate_meals()
+    yield path
+    close_pool()
+    meal_cache.clear()
+
+def query(path, sql, params=()):
+    """Runs a query on a separate connection, to see what was committed."""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+def add_meals(count, price=10.0):
+    """Creates meals named Meal 1 to Meal count, with ids 1 to count."""
+    for index in range(1, count + 1):
+        create_meal(f"Meal {index}", "Italian", price, "MED")
+
+def meal_row(meal, cuisine="Italian", price="10.5", difficulty="MED"):
+    return {"meal": meal, "cuisine": cuisine, "price": price, "difficulty": difficulty}
+
+######################################################
+#
+#    Create and delete
+#
+######################################################
+
+def test_create_meal(meals_db):
+    """Test that a meal is created and can be looked up."""
+    create_meal("Pizza", "Italian", 12.5, "LOW")
+
+    assert get_meal_by_id(1) == Meal(1, "Pizza", "Italian", 12.5, "LOW")
+
+def test_create_meal_duplicate(meals_db):
+    """Test that a meal with a name already in use is rejected."""
+    create_meal("Pizza", "Italian", 12.5, "LOW")
+
+    with pytest.raises(ValueError, match="Meal with name 'Pizza' already exists"):
+        create_meal("Pizza", "Italian", 9.0, "HIGH")
+
+@pytest.mark.parametrize("meal, cuisine, price, difficulty, message", [
+    ("", "Italian", 10.0, "LOW", "Invalid meal"),
+    ("Pizza", "", 10.0, "LOW", "Invalid cuisine"),
+    ("Pizza", "Italian", -1.0, "LOW", "Invalid price"),
+    ("Pizza", "Italian", True, "LOW", "Invalid price"),
+    ("Pizza", "Italian", float("nan"), "LOW", "Invalid price"),
+    ("Pizza", "Italian", 2.505, "LOW", "at most two decimal places"),
+    ("Pizza", "Italian", 10.0, "EASY", "Invalid difficulty level"),
+])
+def test_create_meal_and_create_meals_reject_the_same_input(meals_db, meal, cuisine, price, difficulty, message):
+    """Test that a meal rejected by create_meal is reported as invalid by create_meals, for the same reason."""
+    with pytest.raises(ValueError, match=message):
+        create_meal(meal, cuisine, price, difficulty)
+
+    report = create_meals([meal_row(meal, cuisine, price, difficulty)])
+
+    assert report["invalid"] == 1
+    assert message in report["errors"][0]["error"]
+    assert query(meals_db, "SELECT COUNT(*) FROM meals") == [(0,)]
+
+def test_create_meals(meals_db):
+    """Test that valid rows are created and invalid rows and repeated names are skipped and reported."""
+    create_meal("Pizza", "Italian", 12.5, "LOW")
+    rows = [
+        meal_row("Sushi", cuisine="Japanese"),
+        meal_row("Pizza"),
+        meal_row("Tacos", price="cheap"),
+        ValueError("Invalid JSON on line 4"),
+        meal_row("Sushi"),
+        meal_row("Ramen", price=12, difficulty="HIGH"),
+    ]
+
+    report = create_meals(rows, chunk_size=2)
+
+    assert report["created"] == 2
+    assert report["duplicates"] == 2
+    assert report["invalid"] == 2
+    assert [(error["row"], error["reason"]) for error in report["errors"]] == [
+        (2, "duplicate"), (3, "invalid"), (4, "invalid"), (5, "duplicate")
+    ]
+    assert report["errors"][2]["error"] == "Invalid JSON on line 4"
+    assert query(meals_db, "SELECT meal, price FROM meals ORDER BY id") == [("Pizza", 12.5), ("Sushi", 10.5), ("Ramen", 12.0)]
+
+def test_create_meals_invalid_chunk_size(meals_db):
+    """Test that a chunk size below 1 is rejected before anything is read."""
+    with pytest.raises(ValueError, match="Invalid import chunk size"):
+        create_meals([meal_row("Pizza")], chunk_size=0)
+
+def test_delete_meal(meals_db):
+    """Test that a deleted meal is no longer returned and records when it was deleted."""
+    add_meals(1)
+    get_meal_by_id(1)
+
+    delete_meal(1)
+
+    with pytest.raises(ValueError, match="Meal with ID 1 has been deleted"):
+        get_meal_by_id(1)
+    with pytest.raises(ValueError, match="Meal with ID 1 has been deleted"):
+        delete_meal(1)
+    assert query(meals_db, "SELECT deleted_at IS NOT NULL FROM meals") == [(1,)]
+
+def test_get_meals_by_ids(meals_db):
+    """Test that meals are returned in the order of the ids, and a missing one is an error."""
+    add_meals(3)
+
+    assert [meal.id for meal in get_meals_by_ids([3, 1, 2])] == [3, 1, 2]
+    with pytest.raises(ValueError, match="Meal with ID 4 not found"):
+        get_meals_by_ids([1, 4])
+
+######################################################
+#
+#    Battles and leaderboard
+#
+######################################################
+
+def test_record_battle(meals_db):
+    """Test that one battle adds a battle to both meals and a win to the winner."""
+    add_meals(2)
+
+    record_battle(2, 1)
+
+    assert query(meals_db, "SELECT id, battles, wins FROM meals ORDER BY id") == [(1, 1, 0), (2, 1, 1)]
+
+def test_record_battle_deleted_meal(meals_db):
+    """Test that a battle against a deleted meal is rejected and nothing is written."""
+    add_meals(2)
+    delete_meal(2)
+
+    with pytest.raises(ValueError, match="Meal with ID 2 has been deleted"):
+        record_battle(1, 2)
+
+    assert query(meals_db, "SELECT SUM(battles) FROM meals") == [(0,)]
+
+def test_record_battles(meals_db):
+    """Test that many battles are summed per meal and recorded together."""
+    add_meals(3)
+
+    record_battles([(1, 2), (1, 3), (2, 3)])
+
+    assert query(meals_db, "SELECT id, battles, wins FROM meals ORDER BY id") == [(1, 2, 2), (2, 2, 1), (3, 2, 0)]
+
+def test_record_battles_all_or_nothing(meals_db):
+    """Test that one missing meal leaves every other result unrecorded."""
+    add_meals(2)
+
+    with pytest.raises(ValueError, match="Meal with ID 9 not found"):
+        record_battles([(1, 2), (2, 9)])
+
+    assert query(meals_db, "SELECT SUM(battles) FROM meals") == [(0,)]
+
+def test_record_battles_self(meals_db):
+    """Test that a meal battling itself is rejected."""
+    with pytest.raises(ValueError, match="cannot battle itself"):
+        record_battles([(1, 1)])
+
+def test_get_leaderboard(meals_db):
+    """Test that the leaderboard only lists meals that battled, by wins or by win percentage."""
+    add_meals(4)
+    record_battles([(1, 2), (1, 3), (2, 3), (2, 1), (2, 3)])
+
+    by_wins = get_leaderboard()
+    by_win_pct = get_leaderboard(sort_by="win_pct")
+
+    assert [(meal["id"], meal["wins"]) for meal in by_wins] == [(2, 3), (1, 2), (3, 0)]
+    assert [(meal["id"], meal["win_pct"]) for meal in by_win_pct] == [(2, 75.0), (1, 66.7), (3, 0.0)]
+
+def test_get_leaderboard_after_id(meals_db):
+    """Test that paging with after_id visits every meal once, including meals tied on wins."""
+    add_meals(6)
+    record_battles([(1, 6), (2, 6), (3, 6), (3, 5), (4, 5)])
+
+    pages = []
+    after_id = None
+    while True:
+        page = get_leaderboard(limit=2, after_id=after_id)
+        if not page:
+            break
+        pages.append([meal["id"] for meal in page])
+        after_id = page[-1]["id"]
+
+    assert pages == [[3, 1], [2, 4], [5, 6]]
+
+def test_get_leaderboard_invalid(meals_db):
+    """Test that an unknown ordering, an out of range limit or an unknown cursor is rejected."""
+    with pytest.raises(ValueError, match="Invalid sort_by parameter"):
+        get_leaderboard(sort_by="price")
+    with pytest.raises(ValueError, match="Invalid leaderboard limit"):
+        get_leaderboard(limit=0)
+    with pytest.raises(ValueError, match="Meal with ID 42 not found"):
+        get_leaderboard(after_id=42)
+
+######################################################
+#
+#    Schema, compaction and clearing
+#
+######################################################
+
+def test_migrate_meals_from_unversioned_database(tmp_path, mocker):
+    """Test that a database created before schema versions keeps its meals and gets every migration."""
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(UNVERSIONED_MEALS_TABLE)
+    conn.execute("INSERT INTO meals (meal, cuisine, price, difficulty, battles, wins) VALUES ('Pizza', 'Italian', 10.0, 'LOW', 4, 3)")
+    conn.execute("INSERT INTO meals (meal, cuisine, price, difficulty, deleted) VALUES ('Sushi', 'Japanese', 10.0, 'LOW', TRUE)")
+    conn.commit()
+    conn.close()
+    close_pool()
+    mocker.patch("meal_max.utils.sql_utils.DB_PATH", path)
+
+    try:
+        assert migrate_meals() == list(range(1, len(MEAL_MIGRATIONS) + 1))
+        assert migrate_meals() == []
+    finally:
+        close_pool()
+
+    conn = sqlite3.connect(path)
+    assert get_schema_version(conn) == len(MEAL_MIGRATIONS)
+    assert conn.execute("SELECT meal, win_pct, deleted_at IS NOT NULL FROM meals ORDER BY id").fetchall() == [
+        ("Pizza", 0.75, 0), ("Sushi", None, 1)
+    ]
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    assert indexes == {"idx_meals_leaderboard_wins", "idx_meals_leaderboard_win_pct", "idx_meals_deleted_at"}
+    assert conn.execute("SELECT COUNT(*) FROM meals_archive").fetchone() == (0,)
+    conn.close()
+
+def test_schema_script_matches_migrations(tmp_path):
+    """Test that the schema script stamps the version of the last migration."""
+    conn = sqlite3.connect(str(tmp_path / "script.db"))
+    with open(CREATE_MEAL_TABLE_PATH, "r") as fh:
+        conn.executescript(fh.read())
+
+    assert get_schema_version(conn) == len(MEAL_MIGRATIONS)
+    conn.close()
+
+def test_compact_meals(meals_db):
+    """Test that only meals deleted before the retention period are moved to the archive."""
+    add_meals(3)
+    delete_meal(1)
+    delete_meal(2)
+    old = int(time.time()) - 40 * 86400
+    conn = sqlite3.connect(meals_db)
+    conn.execute("UPDATE meals SET deleted_at = ? WHERE id = 1", (old,))
+    conn.commit()
+    conn.close()
+
+    report = compact_meals(retention_days=30)
+
+    assert report["archived"] == 1
+    assert query(meals_db, "SELECT id FROM meals ORDER BY id") == [(2,), (3,)]
+    assert query(meals_db, "SELECT id, meal, deleted_at FROM meals_archive") == [(1, "Meal 1", old)]
+
+@pytest.mark.parametrize("swap", [False, True])
+def test_clear_meals(meals_db, swap):
+    """Test that clearing removes every meal, archived ones included, and restarts the ids."""
+    add_meals(2)
+    delete_meal(1)
+    compact_meals(retention_days=0)
+
+    clear_meals(swap=swap)
+
+    assert query(meals_db, "SELECT COUNT(*) FROM meals") == [(0,)]
+    assert query(meals_db, "SELECT COUNT(*) FROM meals_archive") == [(0,)]
+    create_meal("Pizza", "Italian", 12.5, "LOW")
+    assert get_meal_by_id(1).meal == "Pizza"
+
+def test_clear_meals_swap_without_script(meals_db, mocker):
+    """Test that clearing by swap is refused when the schema script could not be read."""
+    mocker.patch("meal_max.models.kitchen_model._create_table_script", None)
+
+    with pytest.raises(ValueError, match="could not be read"):
+        clear_meals(swap=True)
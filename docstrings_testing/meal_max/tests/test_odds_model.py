@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+import pytest
+
+from meal_max.models.kitchen_model import Meal
+from meal_max.models.odds_model import exact_win_probabilities, get_battle_odds, get_battle_odds_matrix, simulate_first_combatant_wins
+
+
+MEALS = [
+    Meal(1, "Pizza", "Italian", 20.0, "LOW"),
+    Meal(2, "Tacos", "Mexican", 8.0, "MED"),
+    Meal(3, "Ramen", "Japanese", 14.0, "HIGH"),
+]
+
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def meals(mocker):
+    """Fixture serving the meals and their battle scores without a database."""
+    catalog = {meal.id: meal for meal in MEALS}
+    mocker.patch("meal_max.models.odds_model.get_meals_by_ids", side_effect=lambda meal_ids: [catalog[meal_id] for meal_id in meal_ids])
+    mocker.patch("meal_max.models.odds_model.get_all_meals", return_value=list(MEALS))
+    mocker.patch("meal_max.models.odds_model.get_battle_score", side_effect=lambda meal: {1: 90.0, 2: 30.0, 3: 250.0}[meal.id])
+    return catalog
+
+
+######################################################
+#
+#    Probabilities
+#
+######################################################
+
+def test_exact_win_probabilities():
+    """Test that the first combatant's win probability is the score delta over 100, clamped to [0, 1]."""
+    probabilities = exact_win_probabilities(np.array([90.0, 30.0, 250.0]))
+
+    np.testing.assert_allclose(probabilities, [[0.0, 0.6, 1.0], [0.6, 0.0, 1.0], [1.0, 1.0, 0.0]])
+
+def test_simulate_first_combatant_wins_in_chunks(mocker):
+    """Test that a simulation larger than one chunk is drawn in several batches."""
+    mocker.patch("meal_max.models.odds_model.SIMULATION_CHUNK_SIZE", 300)
+
+    wins = simulate_first_combatant_wins(0.5, 1000, np.random.default_rng(1))
+    all_wins = simulate_first_combatant_wins(1.0, 1000, np.random.default_rng(1))
+
+    assert 400 < wins < 600
+    assert all_wins == 1000
+
+def test_get_battle_odds(meals):
+    """Test that the odds report the exact probability, a simulation close to it and its standard error."""
+    odds = get_battle_odds(1, 2, trials=100000, seed=3)
+
+    assert odds["exact"] == {"meal_1": pytest.approx(0.6), "meal_2": pytest.approx(0.4)}
+    assert odds["standard_error"] == pytest.approx(math.sqrt(0.6 * 0.4 / 100000))
+    assert abs(odds["simulated"]["meal_1"] - 0.6) < 5 * odds["standard_error"]
+    assert odds["simulated"]["meal_2"] == pytest.approx(1 - odds["simulated"]["meal_1"])
+    assert odds["meal_1"] == {"id": 1, "meal": "Pizza", "score": 90.0}
+
+def test_get_battle_odds_seed(meals):
+    """Test that the same seed gives the same simulation."""
+    assert get_battle_odds(1, 2, trials=1000, seed=5) == get_battle_odds(1, 2, trials=1000, seed=5)
+
+@pytest.mark.parametrize("meal_2_id, trials, message", [
+    (1, 1000, "cannot battle itself"),
+    (2, 0, "Invalid number of trials"),
+])
+def test_get_battle_odds_invalid(meals, meal_2_id, trials, message):
+    """Test that a meal against itself or a number of trials out of range is rejected."""
+    with pytest.raises(ValueError, match=message):
+        get_battle_odds(1, meal_2_id, trials=trials)
+
+def test_get_battle_odds_matrix(meals):
+    """Test that the matrix has a null diagonal and simulated odds that match the exact ones for certain outcomes."""
+    matrix = get_battle_odds_matrix(trials=1000, seed=2)
+
+    assert [meal["id"] for meal in matrix["meals"]] == [1, 2, 3]
+    assert [matrix["exact"][index][index] for index in range(3)] == [None, None, None]
+    assert [matrix["simulated"][index][index] for index in range(3)] == [None, None, None]
+    assert matrix["exact"][0][1] == pytest.approx(0.6)
+    assert matrix["simulated"][2][0] == 1.0
+    assert get_battle_odds_matrix(trials=1000, seed=2) == matrix
+
+def test_get_battle_odds_matrix_too_many_meals(meals, mocker):
+    """Test that a catalog larger than the matrix limit is rejected."""
+    mocker.patch("meal_max.models.odds_model.ODDS_MATRIX_MAX_MEALS", 2)
+
+    with pytest.raises(ValueError, match="at most 2 meals"):
+        get_battle_odds_matrix()
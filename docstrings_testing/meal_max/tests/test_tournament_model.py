@@ -0,0 +1,216 @@
+import itertools
+
+import pytest
+
+from meal_max.models.kitchen_model import Meal
+from meal_max.models.tournament_model import TournamentModel
+from meal_max.utils.random_utils import SeededRandomSource
+
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def meals(mocker):
+    """Fixture serving meals 1 to 9 without a database, most expensive first."""
+    catalog = {
+        meal_id: Meal(meal_id, f"Meal {meal_id}", "Italian" if meal_id % 2 else "Mexican", 50.0 - 4 * meal_id, "MED")
+        for meal_id in range(1, 10)
+    }
+    mocker.patch("meal_max.models.tournament_model.get_meals_by_ids",
+                 side_effect=lambda meal_ids: [catalog[meal_id] for meal_id in meal_ids])
+    return catalog
+
+@pytest.fixture
+def mock_record_battles(mocker):
+    """Fixture capturing the results the tournament commits."""
+    return mocker.patch("meal_max.models.tournament_model.record_battles")
+
+@pytest.fixture
+def seeded(mocker):
+    """Fixture drawing the tournament's random numbers from a seeded source."""
+    source = SeededRandomSource(42)
+    return mocker.patch("meal_max.models.tournament_model.get_randoms", side_effect=source.randoms)
+
+def battles_in(result):
+    return [match for matches in result["rounds"] for match in matches if match["meal_2"] is not None]
+
+def pair_of(match):
+    return frozenset((match["meal_1"]["id"], match["meal_2"]["id"]))
+
+def result_of(match):
+    loser = match["meal_2"]["id"] if match["winner"] == match["meal_1"]["id"] else match["meal_1"]["id"]
+    return match["winner"], loser
+
+
+######################################################
+#
+#    Formats
+#
+######################################################
+
+@pytest.mark.parametrize("num_meals", [2, 5, 8])
+def test_single_elimination(meals, mock_record_battles, seeded, num_meals):
+    """Test that a knockout runs one battle per eliminated meal and its winner is the champion."""
+    result = TournamentModel().run(list(range(1, num_meals + 1)))
+
+    assert result["battles"] == num_meals - 1
+    assert len(battles_in(result)) == num_meals - 1
+    assert result["champion"]["id"] == result["rounds"][-1][0]["winner"]
+    assert result["standings"][0]["losses"] == 0
+    assert sum(entry["losses"] for entry in result["standings"]) == num_meals - 1
+
+@pytest.mark.parametrize("num_meals", [4, 5])
+def test_round_robin(meals, mock_record_battles, seeded, num_meals):
+    """Test that every meal battles every other meal exactly once."""
+    meal_ids = list(range(1, num_meals + 1))
+
+    result = TournamentModel().run(meal_ids, tournament_format="round_robin")
+
+    assert result["battles"] == num_meals * (num_meals - 1) // 2
+    pairs = [pair_of(match) for match in battles_in(result)]
+    assert len(pairs) == len(set(pairs))
+    assert set(pairs) == {frozenset(pair) for pair in itertools.combinations(meal_ids, 2)}
+    for entry in result["standings"]:
+        assert entry["wins"] + entry["losses"] == num_meals - 1
+    assert result["champion"]["id"] == result["standings"][0]["id"]
+
+def test_swiss(meals, mock_record_battles, seeded):
+    """Test that a Swiss tournament with an odd field has no rematches and never gives a meal two byes."""
+    meal_ids = list(range(1, 8))
+
+    result = TournamentModel().run(meal_ids, tournament_format="swiss", rounds=6)
+
+    pairs = [pair_of(match) for match in battles_in(result)]
+    byes = [match["meal_1"]["id"] for matches in result["rounds"] for match in matches if match["meal_2"] is None]
+    assert result["battles"] == 6 * 3
+    assert len(set(pairs)) == len(pairs)
+    assert len(byes) == len(set(byes)) == 6
+    for entry in result["standings"]:
+        assert entry["wins"] + entry["losses"] == 6
+
+def test_swiss_default_rounds(meals, mock_record_battles, seeded):
+    """Test that a Swiss tournament defaults to log2 of the field size in rounds."""
+    result = TournamentModel().run(list(range(1, 9)), tournament_format="swiss")
+
+    assert len(result["rounds"]) == 3
+    assert result["battles"] == 3 * 4
+
+def test_standings_order(meals, mock_record_battles, seeded):
+    """Test that standings are sorted by wins, then losses, then seed."""
+    result = TournamentModel().run([3, 1, 4, 2], tournament_format="round_robin")
+
+    keys = [(-entry["wins"], entry["losses"], entry["seed"]) for entry in result["standings"]]
+    assert keys == sorted(keys)
+    assert [entry["id"] for entry in sorted(result["standings"], key=lambda entry: entry["seed"])] == [3, 1, 4, 2]
+
+@pytest.mark.parametrize("tournament_format", ["single_elimination", "round_robin", "swiss"])
+def test_results_committed_once(meals, mock_record_battles, seeded, tournament_format):
+    """Test that the random numbers are drawn in one batch and every result is committed together."""
+    result = TournamentModel().run(list(range(1, 7)), tournament_format=tournament_format)
+
+    seeded.assert_called_once_with(result["battles"])
+    mock_record_battles.assert_called_once()
+    results = mock_record_battles.call_args.args[0]
+    assert results == [result_of(match) for match in battles_in(result)]
+
+def test_same_seed_same_tournament(meals, mock_record_battles, mocker):
+    """Test that a tournament is replayed exactly from the same seed."""
+    results = []
+    for _ in range(2):
+        mocker.patch("meal_max.models.tournament_model.get_randoms", side_effect=SeededRandomSource(7).randoms)
+        results.append(TournamentModel().run(list(range(1, 9)), tournament_format="swiss"))
+
+    assert results[0] == results[1]
+
+def test_battle_error_records_nothing(meals, mock_record_battles, mocker):
+    """Test that nothing is committed when a tournament fails part way."""
+    mocker.patch("meal_max.models.tournament_model.get_randoms", side_effect=ConnectionError("random.org is down"))
+
+    with pytest.raises(ConnectionError):
+        TournamentModel().run([1, 2, 3])
+
+    mock_record_battles.assert_not_called()
+
+
+######################################################
+#
+#    Swiss pairings
+#
+######################################################
+
+def test_swiss_pairings_bye_to_lowest_without_one():
+    """Test that the bye goes to the lowest ranked meal that has not had one yet."""
+    bye_id, pairs = TournamentModel()._swiss_pairings([1, 2, 3, 4, 5], set(), {5})
+
+    assert bye_id == 4
+    assert pairs == [(1, 2), (3, 5)]
+
+def test_swiss_pairings_backtracks():
+    """Test that pairing backtracks when pairing neighbours in the standings forces a rematch."""
+    played = {frozenset((3, 4))}
+
+    bye_id, pairs = TournamentModel()._swiss_pairings([1, 2, 3, 4], played, set())
+
+    assert bye_id is None
+    assert pairs == [(1, 3), (2, 4)]
+
+def test_swiss_pairings_rematch_fallback():
+    """Test that the round still pairs every meal, with rematches, when no pairing avoids them."""
+    unplayed = {frozenset(pair) for pair in [(1, 2), (2, 3), (1, 3), (4, 5), (5, 6), (4, 6)]}
+    played = {frozenset(pair) for pair in itertools.combinations(range(1, 7), 2)} - unplayed
+
+    bye_id, pairs = TournamentModel()._swiss_pairings([1, 2, 3, 4, 5, 6], played, set())
+
+    assert bye_id is None
+    assert pairs == [(1, 2), (3, 4), (5, 6)]
+    assert frozenset((3, 4)) in played
+
+def test_swiss_pairings_step_budget(mocker):
+    """Test that the pairing search gives up after the step budget and falls back to the greedy pairing."""
+    mocker.patch("meal_max.models.tournament_model.SWISS_PAIRING_MAX_STEPS", 1)
+    played = {frozenset((3, 4))}
+
+    bye_id, pairs = TournamentModel()._swiss_pairings([1, 2, 3, 4], played, set())
+
+    assert pairs == [(1, 2), (3, 4)]
+
+def test_swiss_rematch_logged(meals, mock_record_battles, seeded, mocker):
+    """Test that a rematch forced by the fallback is logged as a warning."""
+    mocker.patch.object(TournamentModel, "_swiss_pairings", side_effect=[(3, [(1, 2)]), (None, [(1, 2)])])
+    mock_warning = mocker.patch("meal_max.models.tournament_model.logger.warning")
+
+    result = TournamentModel().run([1, 2, 3], tournament_format="swiss", rounds=2)
+
+    mock_warning.assert_called_once_with("Swiss rematch between meals %d and %d", 1, 2)
+    assert result["battles"] == 2
+
+
+######################################################
+#
+#    Validation
+#
+######################################################
+
+@pytest.mark.parametrize("meal_ids, kwargs, message", [
+    ([1, 2], {"tournament_format": "ladder"}, "Invalid tournament format"),
+    ([1], {}, "at least two meals"),
+    ([1, 2, 1], {}, "only enter a tournament once"),
+    ([1, 2, 3], {"tournament_format": "swiss", "rounds": 3}, "Invalid number of Swiss rounds"),
+])
+def test_run_invalid(meals, mock_record_battles, meal_ids, kwargs, message):
+    """Test that an invalid tournament is rejected before any meal is looked up."""
+    with pytest.raises(ValueError, match=message):
+        TournamentModel().run(meal_ids, **kwargs)
+
+    mock_record_battles.assert_not_called()
+
+def test_run_too_many_meals(meals, mocker):
+    """Test that a field larger than the maximum tournament size is rejected."""
+    mocker.patch("meal_max.models.tournament_model.MAX_TOURNAMENT_SIZE", 4)
+
+    with pytest.raises(ValueError, match="at most 4 meals"):
+        TournamentModel().run([1, 2, 3, 4, 5])
@@ -1,9 +1,15 @@
+import atexit
+
 from dotenv import load_dotenv
 from flask import Flask, jsonify, make_response, Response, request
 
 from music_collection.models import song_model
 from music_collection.models.playlist_model import PlaylistModel
-from music_collection.utils.sql_utils import check_database_connection, check_table_exists
+from music_collection.utils.compaction_utils import COMPACTION_INTERVAL, CompactionScheduler
+from music_collection.utils.import_utils import get_import_format, iter_records
+from music_collection.utils.random_utils import get_random_source_stats
+from music_collection.utils.sql_utils import check_database_connection, check_table_exists, close_pool, get_pool_stats
+from music_collection.utils.state_utils import STATE_SERVER_ADDRESS, connect_state_server
 
 
 # Load environment variables from .env file
@@ -11,7 +17,37 @@ load_dotenv()
 
 app = Flask(__name__)
 
-playlist_model = PlaylistModel()
+# Pretty-print JSON under every server, not only the debug server, so responses are identical
+app.json.compact = False
+
+# Bring the database schema up to date without dropping the songs already in it
+song_model.migrate_catalog()
+
+# Archive and purge songs deleted past the retention period in the background, unless COMPACTION_INTERVAL is 0.
+# Under gunicorn the workers share the playlist and the compaction job held by the state server (see gunicorn.conf.py)
+compaction_scheduler = None
+if STATE_SERVER_ADDRESS:
+    state_server = connect_state_server(STATE_SERVER_ADDRESS, ["playlist_model", "compaction_scheduler"])
+    playlist_model = state_server.playlist_model()
+    if COMPACTION_INTERVAL > 0:
+        compaction_scheduler = state_server.compaction_scheduler()
+else:
+    playlist_model = PlaylistModel()
+    if COMPACTION_INTERVAL > 0:
+        compaction_scheduler = CompactionScheduler(song_model.compact_catalog)
+
+
+def close_resources() -> None:
+    """
+    Stops the compaction job of this process, writes the play counts still held by the write-behind
+    buffer and closes the pooled connections. Runs at exit and when a gunicorn worker exits.
+    """
+    if compaction_scheduler is not None and not STATE_SERVER_ADDRESS:
+        compaction_scheduler.close()
+    song_model.close_play_count_buffer()
+    close_pool()
+
+atexit.register(close_resources)
 
 
 ####################################################
@@ -54,6 +90,109 @@ def db_check() -> Response:
         return make_response(jsonify({'error': str(e)}), 404)
 
 
+@app.route('/api/db-pool-stats', methods=['GET'])
+def db_pool_stats() -> Response:
+    """
+    Route to report the database connection pool counters.
+
+    Returns:
+        JSON response with the pool hits, waits, opens and recycles.
+    """
+    try:
+        app.logger.info("Retrieving database connection pool stats")
+        return make_response(jsonify({'status': 'success', 'pool': get_pool_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving pool stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats() -> Response:
+    """
+    Route to report the song lookup cache counters.
+
+    Returns:
+        JSON response with the cache hits, misses, evictions and size.
+    """
+    try:
+        app.logger.info("Retrieving cache stats")
+        return make_response(jsonify({'status': 'success', 'cache': song_model.song_cache.get_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving cache stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/random-source-stats', methods=['GET'])
+def random_source_stats() -> Response:
+    """
+    Route to report the counters of the random source, including the random.org
+    buffer depth, refill latency and fallback count when buffering is enabled.
+
+    Returns:
+        JSON response with the random source counters.
+    """
+    try:
+        app.logger.info("Retrieving random source stats")
+        return make_response(jsonify({'status': 'success', 'random_source': get_random_source_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving random source stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/play-count-stats', methods=['GET'])
+def play_count_stats() -> Response:
+    """
+    Route to report the write-behind play count buffer, including the number of pending
+    increments and the latency of the last flush.
+
+    Returns:
+        JSON response with the play count buffer counters.
+    """
+    try:
+        app.logger.info("Retrieving play count stats")
+        return make_response(jsonify({'status': 'success', 'play_counts': song_model.get_play_count_stats()}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving play count stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/flush-play-counts', methods=['POST'])
+def flush_play_counts() -> Response:
+    """
+    Route to write the pending play count increments to the database immediately.
+
+    Returns:
+        JSON response with the number of increments flushed.
+    Raises:
+        500 error if there is an issue flushing the play counts.
+    """
+    try:
+        app.logger.info("Flushing pending play counts")
+        flushed = song_model.flush_play_counts()
+        return make_response(jsonify({'status': 'success', 'flushed': flushed}), 200)
+    except Exception as e:
+        app.logger.error(f"Error flushing play counts: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+@app.route('/api/compaction-stats', methods=['GET'])
+def compaction_stats() -> Response:
+    """
+    Route to report the background compaction of deleted songs, including the report of
+    its last run.
+
+    Returns:
+        JSON response with the compaction counters, or null if background compaction is disabled.
+    """
+    try:
+        app.logger.info("Retrieving compaction stats")
+        stats = compaction_scheduler.get_stats() if compaction_scheduler is not None else None
+        return make_response(jsonify({'status': 'success', 'compaction': stats}), 200)
+    except Exception as e:
+        app.logger.error(f"Error retrieving compaction stats: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
 ##########################################################
 #
 # Song Management
@@ -100,17 +239,61 @@ def add_song() -> Response:
         app.logger.error("Failed to add song: %s", str(e))
         return make_response(jsonify({'error': str(e)}), 500)
 
+@app.route('/api/import-songs', methods=['POST'])
+def import_songs() -> Response:
+    """
+    Route to add songs to the catalog in bulk from a JSON Lines or CSV request body.
+
+    The body is streamed rather than loaded into memory and the songs are inserted in chunked
+    transactions. Invalid and duplicate rows are skipped and reported, the rest are created.
+
+    Expected Input:
+        - One JSON object per line, or CSV with a header row, with the fields artist, title,
+          year, genre and duration.
+
+    Query Parameters:
+        - format (str, optional): 'jsonl' or 'csv'. Defaults to the format of the Content-Type
+          (application/x-ndjson or text/csv).
+        - chunk_size (int, optional): The number of songs inserted per transaction.
+
+    Returns:
+        JSON response with the number of songs created, duplicates and invalid rows, and the errors by row.
+    Raises:
+        400 error if the format or chunk size is invalid.
+        500 error if there is a database error. Chunks committed before the error are kept.
+    """
+    try:
+        import_format = get_import_format(request.args.get('format'), request.content_type)
+        chunk_size = request.args.get('chunk_size', type=int)
+
+        app.logger.info("Importing songs from %s", import_format)
+        report = song_model.create_songs(iter_records(request.stream, import_format), chunk_size=chunk_size)
+        app.logger.info("Imported %d songs", report['created'])
+
+        return make_response(jsonify({'status': 'success', **report}), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid song import: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        app.logger.error(f"Error importing songs: {e}")
+        return make_response(jsonify({'error': str(e)}), 500)
+
 @app.route('/api/clear-catalog', methods=['DELETE'])
 def clear_catalog() -> Response:
     """
-    Route to clear the entire song catalog (recreates the table).
+    Route to clear the entire song catalog.
+
+    Query Parameters:
+        - swap (bool, optional): Replace the database with an empty one instead of deleting
+          the songs, which is faster for a large catalog. Defaults to false.
 
     Returns:
         JSON response indicating success of the operation or error message.
     """
     try:
+        swap = request.args.get('swap', 'false').lower() == 'true'
         app.logger.info("Clearing the song catalog")
-        song_model.clear_catalog()
+        song_model.clear_catalog(swap=swap)
         return make_response(jsonify({'status': 'success'}), 200)
     except Exception as e:
         app.logger.error(f"Error clearing catalog: {e}")
@@ -141,24 +324,101 @@ def get_all_songs() -> Response:
     """
     Route to retrieve all songs in the catalog (non-deleted), with an option to sort by play count.
 
+    The catalog can be read one page at a time with limit and after_id, or streamed in full with
+    stream, which reads it a page at a time and writes each page as it is read so memory use does
+    not grow with the catalog.
+
     Query Parameter:
         - sort_by_play_count (bool, optional): If true, sort songs by play count.
+        - include_pending (bool, optional): If true, add play counts that have not been flushed yet.
+          When streaming, they are flushed before the first page is read.
+        - limit (int, optional): The number of songs on the page, at most 1000.
+        - after_id (int, optional): The next_after_id from the previous page.
+        - stream (str, optional): 'ndjson' for one song per line, or 'json' for the usual response
+          written incrementally. Cannot be combined with limit or after_id.
+        - columnar (bool, optional): If true, return 'columns', one list per field, instead of 'songs'.
 
     Returns:
-        JSON response with the list of songs or error message.
+        JSON response with the list of songs or error message. Pages include next_after_id,
+        which is null on the last page or when sorting by play count.
+    Raises:
+        400 error if the query parameters are invalid.
+        500 error if there is an issue retrieving the songs.
     """
     try:
-        # Extract query parameter for sorting by play count
+        # Extract query parameters for sorting by play count and merging pending play counts
         sort_by_play_count = request.args.get('sort_by_play_count', 'false').lower() == 'true'
-
-        app.logger.info("Retrieving all songs from the catalog, sort_by_play_count=%s", sort_by_play_count)
-        songs = song_model.get_all_songs(sort_by_play_count=sort_by_play_count)
-
-        return make_response(jsonify({'status': 'success', 'songs': songs}), 200)
+        include_pending = request.args.get('include_pending', 'false').lower() == 'true'
+        limit = request.args.get('limit', type=int)
+        after_id = request.args.get('after_id', type=int)
+        stream = request.args.get('stream')
+        columnar = request.args.get('columnar', 'false').lower() == 'true'
+
+        if stream is not None:
+            if stream not in ('ndjson', 'json'):
+                return make_response(jsonify({'error': 'stream must be ndjson or json'}), 400)
+            if limit is not None or after_id is not None:
+                return make_response(jsonify({'error': 'stream cannot be combined with limit or after_id'}), 400)
+            if include_pending:
+                song_model.flush_play_counts()
+
+            app.logger.info("Streaming the song catalog as %s, sort_by_play_count=%s", stream, sort_by_play_count)
+            pages = song_model.iter_song_pages(sort_by_play_count=sort_by_play_count)
+            # Read the first page now so database errors still get an error response
+            first_page = next(pages, [])
+            mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+            return Response(_stream_songs(first_page, pages, stream), mimetype=mimetype)
+
+        app.logger.info("Retrieving all songs from the catalog, sort_by_play_count=%s, include_pending=%s",
+                        sort_by_play_count, include_pending)
+        if columnar:
+            columns = song_model.get_all_songs_columnar(sort_by_play_count=sort_by_play_count, include_pending=include_pending,
+                                                        after_id=after_id, limit=limit)
+            result = {'status': 'success', 'columns': columns.to_dict()}
+            count, last_id = columns.count(), columns.id[-1] if columns.count() else None
+        else:
+            songs = song_model.get_all_songs(sort_by_play_count=sort_by_play_count, include_pending=include_pending,
+                                             after_id=after_id, limit=limit)
+            result = {'status': 'success', 'songs': songs}
+            count, last_id = len(songs), songs[-1]['id'] if songs else None
+
+        if limit is not None or after_id is not None:
+            result['next_after_id'] = last_id if count == limit and not sort_by_play_count else None
+        return make_response(jsonify(result), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid catalog request: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
         app.logger.error(f"Error retrieving songs: {e}")
         return make_response(jsonify({'error': str(e)}), 500)
 
+def _stream_songs(first_page: list, pages, stream: str):
+    """
+    Writes the pages of songs as NDJSON lines or as the parts of a JSON response. The status
+    is already sent, so an error part way through is written as a final error line or key.
+    """
+    if stream == 'json':
+        yield '{"status": "success", "songs": ['
+    separator = ''
+    try:
+        page = first_page
+        while page:
+            if stream == 'ndjson':
+                yield ''.join(app.json.dumps(song) + '\n' for song in page)
+            else:
+                yield separator + ', '.join(app.json.dumps(song) for song in page)
+                separator = ', '
+            page = next(pages, [])
+    except Exception as e:
+        app.logger.error(f"Error streaming songs: {e}")
+        if stream == 'ndjson':
+            yield app.json.dumps({'error': str(e)}) + '\n'
+        else:
+            yield '], "error": ' + app.json.dumps(str(e)) + '}'
+        return
+    if stream == 'json':
+        yield ']}'
+
 
 @app.route('/api/get-song-from-catalog-by-id/<int:song_id>', methods=['GET'])
 def get_song_by_id(song_id: int) -> Response:
@@ -709,17 +969,47 @@ def swap_songs_in_playlist() -> Response:
 @app.route('/api/song-leaderboard', methods=['GET'])
 def get_song_leaderboard() -> Response:
     """
-    Route to get a list of all sorted by play count.
+    Route to get a page of the songs sorted by play count.
+
+    Query Parameter:
+        - limit (int, optional): The number of songs on the page. Defaults to 10, at most 100.
+        - after_play_count (int, optional): The play_count of the next_cursor from the previous page.
+        - after_id (int, optional): The id of the next_cursor from the previous page.
+        - include_pending (bool, optional): If true, flush play counts that have not been written yet
+          before reading the page.
 
     Returns:
-        JSON response with a sorted leaderboard of songs.
+        JSON response with a sorted page of the leaderboard and the cursor of the next page,
+        which is null on the last page.
     Raises:
+        400 error if the query parameters are invalid.
         500 error if there is an issue generating the leaderboard.
     """
     try:
-        app.logger.info("Generating song leaderboard sorted")
-        leaderboard_data = song_model.get_all_songs(sort_by_play_count=True)
-        return make_response(jsonify({'status': 'success', 'leaderboard': leaderboard_data}), 200)
+        limit = request.args.get('limit', song_model.LEADERBOARD_DEFAULT_LIMIT, type=int)
+        after_play_count = request.args.get('after_play_count', type=int)
+        after_id = request.args.get('after_id', type=int)
+        include_pending = request.args.get('include_pending', 'false').lower() == 'true'
+
+        if (after_play_count is None) != (after_id is None):
+            return make_response(jsonify({'error': 'after_play_count and after_id must be given together'}), 400)
+        after = (after_play_count, after_id) if after_id is not None else None
+
+        if include_pending:
+            song_model.flush_play_counts()
+
+        app.logger.info("Generating song leaderboard page, limit=%s, after=%s", limit, after)
+        leaderboard_data = song_model.get_song_leaderboard(limit=limit, after=after)
+
+        next_cursor = None
+        if len(leaderboard_data) == limit:
+            last = leaderboard_data[-1]
+            next_cursor = {'play_count': last['play_count'], 'id': last['id']}
+
+        return make_response(jsonify({'status': 'success', 'leaderboard': leaderboard_data, 'next_cursor': next_cursor}), 200)
+    except ValueError as e:
+        app.logger.error(f"Invalid leaderboard request: {e}")
+        return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
         app.logger.error(f"Error generating leaderboard: {e}")
         return make_response(jsonify({'error': str(e)}), 500)
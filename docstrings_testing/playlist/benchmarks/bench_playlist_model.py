@@ -0,0 +1,147 @@
+"""
+Benchmark of PlaylistModel operations on large playlists.
+
+Compares the PlaylistModel storage engines ('list' and 'tree') with the linear-scan
+implementation they replaced, timing a fixed number of adds, lookups, swaps, moves
+and removals on playlists of 10k and 100k songs.
+
+Run from the playlist directory:
+
+    python -m benchmarks.bench_playlist_model [--sizes 10000 100000] [--ops 200]
+"""
+import argparse
+import logging
+import random
+import time
+from typing import List
+
+from music_collection.models.playlist_model import PlaylistModel
+from music_collection.models.song_model import Song
+
+
+class LinearPlaylist:
+    """The playlist operations as they were implemented before the song ID index."""
+
+    def __init__(self):
+        self.playlist: List[Song] = []
+
+    def add_song_to_playlist(self, song: Song) -> None:
+        if song.id in [song_in_playlist.id for song_in_playlist in self.playlist]:
+            raise ValueError(f"Song with ID {song.id} already exists in the playlist")
+        self.playlist.append(song)
+
+    def validate_song_id(self, song_id: int) -> int:
+        if song_id not in [song_in_playlist.id for song_in_playlist in self.playlist]:
+            raise ValueError(f"Song with id {song_id} not found in playlist")
+        return song_id
+
+    def get_song_by_song_id(self, song_id: int) -> Song:
+        song_id = self.validate_song_id(song_id)
+        return next((song for song in self.playlist if song.id == song_id), None)
+
+    def swap_songs_in_playlist(self, song1_id: int, song2_id: int) -> None:
+        song1 = self.get_song_by_song_id(song1_id)
+        song2 = self.get_song_by_song_id(song2_id)
+        index1 = self.playlist.index(song1)
+        index2 = self.playlist.index(song2)
+        self.playlist[index1], self.playlist[index2] = self.playlist[index2], self.playlist[index1]
+
+    def move_song_to_beginning(self, song_id: int) -> None:
+        song = self.get_song_by_song_id(song_id)
+        self.playlist.remove(song)
+        self.playlist.insert(0, song)
+
+    def move_song_to_track_number(self, song_id: int, track_number: int) -> None:
+        song = self.get_song_by_song_id(song_id)
+        self.playlist.remove(song)
+        self.playlist.insert(track_number - 1, song)
+
+    def remove_song_by_track_number(self, track_number: int) -> None:
+        del self.playlist[track_number - 1]
+
+    def remove_song_by_song_id(self, song_id: int) -> None:
+        song_id = self.validate_song_id(song_id)
+        self.playlist = [song_in_playlist for song_in_playlist in self.playlist if song_in_playlist.id != song_id]
+
+
+def make_song(song_id: int) -> Song:
+    return Song(song_id, f"Artist {song_id}", f"Song {song_id}", 2000, "Pop", 180)
+
+def fill(model, size: int) -> None:
+    # Build the playlist directly so the setup does not dominate the run
+    model.playlist.extend(make_song(song_id) for song_id in range(1, size + 1))
+
+def time_ops(model, size: int, ops: int, rng: random.Random) -> dict:
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    track_numbers = [rng.randint(1, size) for _ in range(ops)]
+    pairs = [(rng.randint(1, size), rng.randint(1, size)) for _ in range(ops)]
+    pairs = [(a, b) for a, b in pairs if a != b]
+    timings = {}
+
+    start = time.perf_counter()
+    for offset in range(ops):
+        model.add_song_to_playlist(make_song(size + offset + 1))
+    timings["add"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for song_id in ids:
+        model.get_song_by_song_id(song_id)
+    timings["lookup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for song1_id, song2_id in pairs:
+        model.swap_songs_in_playlist(song1_id, song2_id)
+    timings["swap"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for song_id in ids:
+        model.move_song_to_beginning(song_id)
+    timings["move_to_beginning"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for song_id, track_number in zip(ids, track_numbers):
+        model.move_song_to_track_number(song_id, track_number)
+    timings["move_to_track"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for track_number in track_numbers:
+        model.remove_song_by_track_number(track_number)
+    timings["remove_by_track"] = time.perf_counter() - start
+
+    remaining = [song.id for song in model.playlist]
+    remove_ids = rng.sample(remaining, min(ops, len(remaining)))
+    start = time.perf_counter()
+    for song_id in remove_ids:
+        model.remove_song_by_song_id(song_id)
+    timings["remove"] = time.perf_counter() - start
+
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--ops", type=int, default=200, help="operations of each kind per run")
+    args = parser.parse_args()
+
+    # The model logs every operation, which would drown out the data structure costs
+    logging.disable(logging.CRITICAL)
+
+    engines = (
+        ("linear", LinearPlaylist),
+        ("list", lambda: PlaylistModel(storage="list")),
+        ("tree", lambda: PlaylistModel(storage="tree")),
+    )
+    print(f"{'size':>8} {'operation':>18}" + "".join(f" {name + ' (ms/op)':>15}" for name, _ in engines))
+    for size in args.sizes:
+        results = {}
+        for name, factory in engines:
+            model = factory()
+            fill(model, size)
+            results[name] = time_ops(model, size, args.ops, random.Random(size))
+        for operation in results["linear"]:
+            row = "".join(f" {results[name][operation] / args.ops * 1000:>15.4f}" for name, _ in engines)
+            print(f"{size:>8} {operation:>18}{row}")
+
+
+if __name__ == "__main__":
+    main()
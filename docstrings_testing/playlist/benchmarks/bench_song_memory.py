@@ -0,0 +1,109 @@
+"""
+Benchmark of the memory used by catalog results and in-memory songs.
+
+Imports --songs songs into a fresh database, then measures with tracemalloc the memory
+retained by, and the peak while building:
+
+  - get_all_songs(), a list with one dict per song,
+  - get_all_songs_columnar(), one typed array or list per field,
+  - Song objects as they were declared before __slots__, one __dict__ per song,
+  - Song objects with __slots__.
+
+The Song objects are built from strings that are already loaded, so their rows measure
+only the per-object overhead that playlists pay.
+
+Run from the playlist directory:
+
+    python -m benchmarks.bench_song_memory [--songs 1000000]
+"""
+import argparse
+from dataclasses import dataclass
+import gc
+import logging
+import os
+import tempfile
+import tracemalloc
+
+from music_collection.models import song_model
+from music_collection.models.song_model import Song
+from music_collection.utils import sql_utils
+
+
+@dataclass
+class DictSong:
+    """Song as it was declared before __slots__."""
+    id: int
+    artist: str
+    title: str
+    year: int
+    genre: str
+    duration: int
+
+    def __post_init__(self):
+        if self.duration <= 0:
+            raise ValueError(f"Duration must be greater than 0, got {self.duration}")
+        if self.year <= 1900:
+            raise ValueError(f"Year must be greater than 1900, got {self.year}")
+
+
+GENRES = ("Pop", "Rock", "Jazz", "Hip Hop", "Classical", "Country")
+
+
+def fill_catalog(directory: str, songs: int) -> None:
+    # Point the connection pool at a new database file and import the songs into it
+    sql_utils.close_pool()
+    sql_utils.DB_PATH = os.path.join(directory, "songs.db")
+    song_model.migrate_catalog()
+    rows = (
+        {"artist": f"Artist {index % 5000}", "title": f"Song {index}", "year": 1950 + index % 70,
+         "genre": GENRES[index % len(GENRES)], "duration": 120 + index % 300}
+        for index in range(songs)
+    )
+    report = song_model.create_songs(rows, chunk_size=10000)
+    if report["created"] != songs:
+        raise RuntimeError(f"Expected {songs} songs to be created, got {report['created']}")
+
+def measure(build) -> tuple:
+    # Returns the result with the bytes it retains and the peak bytes allocated while it was built
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, default=1000000)
+    args = parser.parse_args()
+
+    # The models log every query, which is noise next to the measurements
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        fill_catalog(directory, args.songs)
+
+        print(f"{args.songs} songs")
+        print(f"{'representation':>22} {'retained MB':>12} {'bytes/song':>11} {'peak MB':>9}")
+
+        def report(name: str, retained: int, peak: int) -> None:
+            print(f"{name:>22} {retained / 1e6:>12.1f} {retained / args.songs:>11.0f} {peak / 1e6:>9.1f}")
+
+        songs, retained, peak = measure(song_model.get_all_songs)
+        report("list of dicts", retained, peak)
+        del songs
+
+        columns, retained, peak = measure(song_model.get_all_songs_columnar)
+        report("columns", retained, peak)
+
+        fields = (columns.id, columns.artist, columns.title, columns.year, columns.genre, columns.duration)
+        for name, song_class in (("Song with __dict__", DictSong), ("Song with __slots__", Song)):
+            objects, retained, peak = measure(lambda: [song_class(*values) for values in zip(*fields)])
+            report(name, retained, peak)
+            del objects
+
+        sql_utils.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Gunicorn settings for serving the app with preforked worker processes. Run from the playlist
+directory:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Each worker serves GUNICORN_THREADS requests at a time and has its own database connection
+pool. The playlist cannot live in the workers, so the master starts a state server process
+before forking them: it holds the one playlist every worker reads and changes, and runs the
+background compaction once for the whole deployment. Calls to the playlist, including the play
+count updates made while playing it, run one at a time across all of the workers.
+
+The song cache and the play count write-behind buffer would be per process. The state server
+counts the plays and runs the compaction, so even with a single worker a song archived or deleted
+there would be served stale by the worker until CACHE_TTL, and the worker could neither see,
+flush nor discard the play counts pending in the state server. Both are turned off whenever the
+state server is used, whatever .env says.
+
+kill -HUP <master pid> reloads gracefully: new workers are started with the new code and the
+old ones finish their requests within GUNICORN_GRACEFUL_TIMEOUT. The state server is not
+reloaded, so the playlist is kept; code changes to the models it serves need a restart.
+"""
+import os
+import sys
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The workers find the state server through this variable, so it has to be set before the app modules read it
+os.environ.setdefault("STATE_SERVER_ADDRESS", os.path.join(tempfile.gettempdir(), "playlist-state.sock"))
+
+# Per-process caches and buffers cannot be kept consistent between the workers and the state server. Like
+# the address, this has to be set before the app modules read it, here and in the processes forked later
+os.environ["CACHE_MAX_SIZE"] = "0"
+os.environ["PLAY_COUNT_WRITE_BEHIND"] = "false"
+
+from music_collection.utils.compaction_utils import COMPACTION_INTERVAL
+from music_collection.utils.state_utils import on_state_server_exit, start_state_server
+
+
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+accesslog = "-"
+
+# Each worker imports the app after the fork, because importing it opens database connections
+# and starts background threads that must not be shared between processes
+preload_app = False
+
+
+def create_playlist_model():
+    from music_collection.models.playlist_model import PlaylistModel
+    return PlaylistModel()
+
+def create_compaction_scheduler():
+    from music_collection.models import song_model
+    from music_collection.utils.compaction_utils import CompactionScheduler
+    return CompactionScheduler(song_model.compact_catalog)
+
+def init_state_server():
+    """
+    Runs in the state server process. Playing the shared playlist updates play counts from
+    there, so the write-behind buffer and the pool are closed when the server shuts down.
+    """
+    from music_collection.models import song_model
+    from music_collection.utils.sql_utils import close_pool
+    on_state_server_exit(close_pool)
+    on_state_server_exit(song_model.close_play_count_buffer)
+
+
+def on_starting(server):
+    models = {"playlist_model": create_playlist_model}
+    if COMPACTION_INTERVAL > 0:
+        models["compaction_scheduler"] = create_compaction_scheduler
+    # Kept on the arbiter rather than in this module, which is executed again on every reload
+    server.state_server = start_state_server(os.environ["STATE_SERVER_ADDRESS"], models, initializer=init_state_server)
+
+def worker_exit(server, worker):
+    # Flush the play counts buffered by the worker and close its connections
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.close_resources()
+
+def on_exit(server):
+    server.state_server.shutdown()
@@ -1,11 +1,17 @@
+from collections import Counter
 import logging
+import os
 from typing import List
-from music_collection.models.song_model import Song, update_play_count
+from music_collection.models.playlist_storage import PLAYLIST_STORAGES
+from music_collection.models.song_model import Song, update_play_count, update_play_counts
 from music_collection.utils.logger import configure_logger
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
+# load the default playlist storage engine from the environment
+PLAYLIST_STORAGE = os.getenv("PLAYLIST_STORAGE", "list")
+
 
 class PlaylistModel:
     """
@@ -13,16 +19,29 @@ class PlaylistModel:
 
     Attributes:
         current_track_number (int): The current track number being played.
-        playlist (List[Song]): The list of songs in the playlist.
+        playlist (IndexedSongList | TreeSongList): The songs in the playlist, indexed by song ID.
 
     """
 
-    def __init__(self):
+    def __init__(self, storage: str = None):
         """
         Initializes the PlaylistModel with an empty playlist and the current track set to 1.
+
+        Args:
+            storage (str, optional): The storage engine for the playlist. 'list' keeps the songs in an
+                indexed Python list, 'tree' keeps them in a balanced tree with O(log n) inserts and
+                removals at any position, for large playlists that are reordered often. Defaults to
+                the PLAYLIST_STORAGE environment variable, or 'list'.
+
+        Raises:
+            ValueError: If the storage engine is not recognized.
         """
+        storage = storage or PLAYLIST_STORAGE
+        if storage not in PLAYLIST_STORAGES:
+            logger.error("Invalid playlist storage: %s", storage)
+            raise ValueError(f"Invalid playlist storage: {storage}. Must be one of {', '.join(PLAYLIST_STORAGES)}.")
         self.current_track_number = 1
-        self.playlist: List[Song] = []
+        self.playlist = PLAYLIST_STORAGES[storage]()
 
     ##################################################
     # Song Management Functions
@@ -45,7 +64,7 @@ class PlaylistModel:
             raise TypeError("Song is not a valid song")
 
         song_id = self.validate_song_id(song.id, check_in_playlist=False)
-        if song_id in [song_in_playlist.id for song_in_playlist in self.playlist]:
+        if self.playlist.has_song_id(song_id):
             logger.error("Song with ID %d already exists in the playlist", song.id)
             raise ValueError(f"Song with ID {song.id} already exists in the playlist")
 
@@ -64,7 +83,7 @@ class PlaylistModel:
         logger.info("Removing song with id %d from playlist", song_id)
         self.check_if_empty()
         song_id = self.validate_song_id(song_id)
-        self.playlist = [song_in_playlist for song_in_playlist in self.playlist if song_in_playlist.id != song_id]
+        self.playlist.remove_song_id(song_id)
         logger.info("Song with id %d has been removed", song_id)
 
     def remove_song_by_track_number(self, track_number: int) -> None:
@@ -99,11 +118,11 @@ class PlaylistModel:
 
     def get_all_songs(self) -> List[Song]:
         """
-        Returns a list of all songs in the playlist.
+        Returns a list of all songs in the playlist, in track order.
         """
         self.check_if_empty()
         logger.info("Getting all songs in the playlist")
-        return self.playlist
+        return list(self.playlist)
 
     def get_song_by_song_id(self, song_id: int) -> Song:
         """
@@ -118,7 +137,7 @@ class PlaylistModel:
         self.check_if_empty()
         song_id = self.validate_song_id(song_id)
         logger.info("Getting song with id %d from playlist", song_id)
-        return next((song for song in self.playlist if song.id == song_id), None)
+        return self.playlist[self.playlist.position_of(song_id)]
 
     def get_song_by_track_number(self, track_number: int) -> Song:
         """
@@ -153,7 +172,7 @@ class PlaylistModel:
         """
         Returns the total duration of the playlist in seconds.
         """
-        return sum(song.duration for song in self.playlist)
+        return self.playlist.total_duration
 
     ##################################################
     # Playlist Movement Functions
@@ -181,9 +200,7 @@ class PlaylistModel:
         logger.info("Moving song with ID %d to the beginning of the playlist", song_id)
         self.check_if_empty()
         song_id = self.validate_song_id(song_id)
-        song = self.get_song_by_song_id(song_id)
-        self.playlist.remove(song)
-        self.playlist.insert(0, song)
+        self.playlist.move(song_id, 0)
         logger.info("Song with ID %d has been moved to the beginning", song_id)
 
     def move_song_to_end(self, song_id: int) -> None:
@@ -196,9 +213,7 @@ class PlaylistModel:
         logger.info("Moving song with ID %d to the end of the playlist", song_id)
         self.check_if_empty()
         song_id = self.validate_song_id(song_id)
-        song = self.get_song_by_song_id(song_id)
-        self.playlist.remove(song)
-        self.playlist.append(song)
+        self.playlist.move(song_id, self.get_playlist_length() - 1)
         logger.info("Song with ID %d has been moved to the end", song_id)
 
     def move_song_to_track_number(self, song_id: int, track_number: int) -> None:
@@ -214,9 +229,7 @@ class PlaylistModel:
         song_id = self.validate_song_id(song_id)
         track_number = self.validate_track_number(track_number)
         playlist_index = track_number - 1
-        song = self.get_song_by_song_id(song_id)
-        self.playlist.remove(song)
-        self.playlist.insert(playlist_index, song)
+        self.playlist.move(song_id, playlist_index)
         logger.info("Song with ID %d has been moved to track number %d", song_id, track_number)
 
     def swap_songs_in_playlist(self, song1_id: int, song2_id: int) -> None:
@@ -239,11 +252,7 @@ class PlaylistModel:
             logger.error("Cannot swap a song with itself, both song IDs are the same: %d", song1_id)
             raise ValueError(f"Cannot swap a song with itself, both song IDs are the same: {song1_id}")
 
-        song1 = self.get_song_by_song_id(song1_id)
-        song2 = self.get_song_by_song_id(song2_id)
-        index1 = self.playlist.index(song1)
-        index2 = self.playlist.index(song2)
-        self.playlist[index1], self.playlist[index2] = self.playlist[index2], self.playlist[index1]
+        self.playlist.swap(song1_id, song2_id)
         logger.info("Swapped songs with IDs %d and %d", song1_id, song2_id)
 
     ##################################################
@@ -273,15 +282,13 @@ class PlaylistModel:
 
         Side-effects:
             Resets the current track number to 1.
-            Updates the play count for each song.
+            Updates the play count for each song, in a single transaction.
         """
         self.check_if_empty()
         logger.info("Starting to play the entire playlist.")
         self.current_track_number = 1
         logger.info("Reset current track number to 1.")
-        for _ in range(self.get_playlist_length()):
-            logger.info("Playing track number: %d", self.current_track_number)
-            self.play_current_song()
+        self.play_tracks(self.get_playlist_length())
         logger.info("Finished playing the entire playlist. Current track number reset to 1.")
 
     def play_rest_of_playlist(self) -> None:
@@ -290,15 +297,41 @@ class PlaylistModel:
 
         Side-effects:
             Updates the current track number back to 1.
-            Updates the play count for each song in the rest of the playlist.
+            Updates the play count for each song in the rest of the playlist, in a single transaction.
         """
         self.check_if_empty()
         logger.info("Starting to play the rest of the playlist from track number: %d", self.current_track_number)
-        for _ in range(self.get_playlist_length() - self.current_track_number + 1):
-            logger.info("Playing track number: %d", self.current_track_number)
-            self.play_current_song()
+        self.play_tracks(self.get_playlist_length() - self.current_track_number + 1)
         logger.info("Finished playing the rest of the playlist. Current track number reset to 1.")
 
+    def play_tracks(self, num_tracks: int) -> None:
+        """
+        Plays the given number of tracks starting from the current track, wrapping around the playlist.
+
+        The play counts are written with one bulk update once every track has been played, and
+        the current track number only advances if that update succeeds.
+
+        Args:
+            num_tracks (int): The number of tracks to play.
+
+        Side-effects:
+            Updates the current track number.
+            Updates the play count for each song played.
+        """
+        self.check_if_empty()
+        playlist_length = self.get_playlist_length()
+        track_number = self.current_track_number
+        play_counts = Counter()
+        for _ in range(num_tracks):
+            song = self.get_song_by_track_number(track_number)
+            logger.info("Playing song: %s (ID: %d) at track number: %d", song.title, song.id, track_number)
+            play_counts[song.id] += 1
+            track_number = (track_number % playlist_length) + 1
+        update_play_counts(play_counts)
+        logger.info("Updated play counts for %d songs", len(play_counts))
+        logger.info("Track number updated from %d to %d", self.current_track_number, track_number)
+        self.current_track_number = track_number
+
     def rewind_playlist(self) -> None:
         """
         Rewinds the playlist to the beginning.
@@ -333,7 +366,7 @@ class PlaylistModel:
             raise ValueError(f"Invalid song id: {song_id}")
 
         if check_in_playlist:
-            if song_id not in [song_in_playlist.id for song_in_playlist in self.playlist]:
+            if not self.playlist.has_song_id(song_id):
                 logger.error("Song with id %d not found in playlist", song_id)
                 raise ValueError(f"Song with id {song_id} not found in playlist")
 
@@ -0,0 +1,449 @@
+import logging
+import random
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from music_collection.models.song_model import Song
+from music_collection.utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class IndexedSongList:
+    """
+    An ordered list of songs that keeps an index from song ID to position.
+
+    Membership checks, lookups by song ID and swaps are O(1). Inserting, removing or
+    moving a song still shifts part of the list. The index stores positions relative to
+    a shared offset, so an insert or removal only rewrites the entries on the shorter
+    side of it and a move only rewrites the entries between its two positions.
+
+    Attributes:
+        total_duration (int): The sum of the durations of the songs, in seconds.
+    """
+
+    def __init__(self, songs: Iterable[Song] = ()):
+        """
+        Initializes the list with the given songs, in order.
+        """
+        self._songs: List[Song] = []
+        self._positions: Dict[int, int] = {}  # song ID -> position + self._offset
+        self._offset = 0
+        self.total_duration = 0
+        self.extend(songs)
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def __iter__(self) -> Iterator[Song]:
+        return iter(self._songs)
+
+    def __getitem__(self, index: int) -> Song:
+        return self._songs[index]
+
+    def __delitem__(self, index: int) -> None:
+        self.pop(index)
+
+    def __repr__(self) -> str:
+        return f"IndexedSongList({self._songs!r})"
+
+    def has_song_id(self, song_id: int) -> bool:
+        """
+        Returns True if a song with the given ID is in the list.
+        """
+        return song_id in self._positions
+
+    def position_of(self, song_id: int) -> Optional[int]:
+        """
+        Returns the 0-based position of the song with the given ID, or None if it is not in the list.
+        """
+        position = self._positions.get(song_id)
+        return None if position is None else position - self._offset
+
+    def append(self, song: Song) -> None:
+        """
+        Appends a song to the end of the list.
+
+        Raises:
+            ValueError: If a song with the same ID is already in the list.
+        """
+        self._check_not_present(song)
+        self._positions[song.id] = len(self._songs) + self._offset
+        self._songs.append(song)
+        self.total_duration += song.duration
+
+    def extend(self, songs: Iterable[Song]) -> None:
+        """
+        Appends each of the songs to the end of the list.
+        """
+        for song in songs:
+            self.append(song)
+
+    def insert(self, index: int, song: Song) -> None:
+        """
+        Inserts a song before the given 0-based position.
+
+        Raises:
+            ValueError: If a song with the same ID is already in the list.
+        """
+        self._check_not_present(song)
+        index = self._clamp(index)
+        self._songs.insert(index, song)
+        self.total_duration += song.duration
+        if index < len(self._songs) // 2:
+            # Shift the songs before the insert down instead of the ones after it up
+            self._offset -= 1
+            self._reindex(0, index + 1)
+        else:
+            self._reindex(index, len(self._songs))
+
+    def pop(self, index: int = -1) -> Song:
+        """
+        Removes and returns the song at the given 0-based position.
+
+        Raises:
+            IndexError: If the position is out of range.
+        """
+        if index < 0:
+            index += len(self._songs)
+        if index < 0:
+            raise IndexError("playlist index out of range")
+        song = self._songs.pop(index)
+        del self._positions[song.id]
+        self.total_duration -= song.duration
+        if index < len(self._songs) // 2:
+            # Shift the songs before the gap up instead of the ones after it down
+            self._offset += 1
+            self._reindex(0, index)
+        else:
+            self._reindex(index, len(self._songs))
+        return song
+
+    def remove_song_id(self, song_id: int) -> Song:
+        """
+        Removes and returns the song with the given ID.
+
+        Raises:
+            KeyError: If no song with the given ID is in the list.
+        """
+        return self.pop(self._positions[song_id] - self._offset)
+
+    def move(self, song_id: int, index: int) -> None:
+        """
+        Moves the song with the given ID to the given 0-based position.
+
+        Raises:
+            KeyError: If no song with the given ID is in the list.
+        """
+        current = self._positions[song_id] - self._offset
+        index = min(self._clamp(index), len(self._songs) - 1)
+        if current == index:
+            return
+        song = self._songs.pop(current)
+        self._songs.insert(index, song)
+        self._reindex(min(current, index), max(current, index) + 1)
+
+    def swap(self, song1_id: int, song2_id: int) -> None:
+        """
+        Swaps the positions of the songs with the given IDs.
+
+        Raises:
+            KeyError: If either song is not in the list.
+        """
+        position1 = self._positions[song1_id]
+        position2 = self._positions[song2_id]
+        index1, index2 = position1 - self._offset, position2 - self._offset
+        self._songs[index1], self._songs[index2] = self._songs[index2], self._songs[index1]
+        self._positions[song1_id], self._positions[song2_id] = position2, position1
+
+    def clear(self) -> None:
+        """
+        Removes every song from the list.
+        """
+        self._songs.clear()
+        self._positions.clear()
+        self._offset = 0
+        self.total_duration = 0
+
+    def _check_not_present(self, song: Song) -> None:
+        if song.id in self._positions:
+            logger.error("Song with ID %d already exists in the playlist", song.id)
+            raise ValueError(f"Song with ID {song.id} already exists in the playlist")
+
+    def _clamp(self, index: int) -> int:
+        # Follow list.insert: negative positions count from the end, out of range ones stick to the ends
+        if index < 0:
+            index = max(index + len(self._songs), 0)
+        return min(index, len(self._songs))
+
+    def _reindex(self, start: int, stop: int) -> None:
+        songs = self._songs
+        positions = self._positions
+        offset = self._offset
+        for index in range(start, stop):
+            positions[songs[index].id] = index + offset
+
+
+class _TreeNode:
+    __slots__ = ("song", "priority", "size", "left", "right", "parent")
+
+    def __init__(self, song: Song, priority: float):
+        self.song = song
+        self.priority = priority
+        self.size = 1
+        self.left = None
+        self.right = None
+        self.parent = None
+
+
+def _size(node: Optional[_TreeNode]) -> int:
+    return node.size if node is not None else 0
+
+def _update(node: _TreeNode) -> None:
+    left, right = node.left, node.right
+    node.size = 1 + _size(left) + _size(right)
+    if left is not None:
+        left.parent = node
+    if right is not None:
+        right.parent = node
+
+def _split(node: Optional[_TreeNode], count: int) -> tuple:
+    # Splits the subtree into its first count songs and the rest, both returned as roots
+    if node is None:
+        return None, None
+    left_size = _size(node.left)
+    if count <= left_size:
+        first, rest = _split(node.left, count)
+        node.left = rest
+        _update(node)
+        if first is not None:
+            first.parent = None
+        return first, node
+    first, rest = _split(node.right, count - left_size - 1)
+    node.right = first
+    _update(node)
+    if rest is not None:
+        rest.parent = None
+    return node, rest
+
+def _merge(first: Optional[_TreeNode], rest: Optional[_TreeNode]) -> Optional[_TreeNode]:
+    # Concatenates two subtrees, keeping the higher priority node on top
+    if first is None:
+        return rest
+    if rest is None:
+        return first
+    if first.priority > rest.priority:
+        first.right = _merge(first.right, rest)
+        _update(first)
+        return first
+    rest.left = _merge(first, rest.left)
+    _update(rest)
+    return rest
+
+
+class TreeSongList:
+    """
+    An ordered list of songs stored in an implicit treap, a randomly balanced binary tree
+    ordered by position where each node knows the size of its subtree.
+
+    Inserting, removing and looking up a song by position or by song ID are O(log n)
+    expected, so reordering large playlists track by track never shifts the whole list.
+    Swaps are O(1). The interface matches IndexedSongList.
+
+    Attributes:
+        total_duration (int): The sum of the durations of the songs, in seconds.
+    """
+
+    def __init__(self, songs: Iterable[Song] = ()):
+        """
+        Initializes the list with the given songs, in order.
+        """
+        self._root: Optional[_TreeNode] = None
+        self._nodes: Dict[int, _TreeNode] = {}
+        self._priorities = random.Random()
+        self.total_duration = 0
+        self.extend(songs)
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __iter__(self) -> Iterator[Song]:
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.song
+            node = node.right
+
+    def __getitem__(self, index: int) -> Song:
+        return self._node_at(self._normalize(index)).song
+
+    def __delitem__(self, index: int) -> None:
+        self.pop(index)
+
+    def __repr__(self) -> str:
+        return f"TreeSongList({list(self)!r})"
+
+    def has_song_id(self, song_id: int) -> bool:
+        """
+        Returns True if a song with the given ID is in the list.
+        """
+        return song_id in self._nodes
+
+    def position_of(self, song_id: int) -> Optional[int]:
+        """
+        Returns the 0-based position of the song with the given ID, or None if it is not in the list.
+        """
+        node = self._nodes.get(song_id)
+        if node is None:
+            return None
+        position = _size(node.left)
+        while node.parent is not None:
+            if node is node.parent.right:
+                position += _size(node.parent.left) + 1
+            node = node.parent
+        return position
+
+    def append(self, song: Song) -> None:
+        """
+        Appends a song to the end of the list.
+
+        Raises:
+            ValueError: If a song with the same ID is already in the list.
+        """
+        self.insert(len(self), song)
+
+    def extend(self, songs: Iterable[Song]) -> None:
+        """
+        Appends each of the songs to the end of the list.
+        """
+        for song in songs:
+            self.append(song)
+
+    def insert(self, index: int, song: Song) -> None:
+        """
+        Inserts a song before the given 0-based position.
+
+        Raises:
+            ValueError: If a song with the same ID is already in the list.
+        """
+        if song.id in self._nodes:
+            logger.error("Song with ID %d already exists in the playlist", song.id)
+            raise ValueError(f"Song with ID {song.id} already exists in the playlist")
+        node = _TreeNode(song, self._priorities.random())
+        self._insert_node(self._clamp(index), node)
+        self._nodes[song.id] = node
+        self.total_duration += song.duration
+
+    def pop(self, index: int = -1) -> Song:
+        """
+        Removes and returns the song at the given 0-based position.
+
+        Raises:
+            IndexError: If the position is out of range.
+        """
+        node = self._remove_node(self._normalize(index))
+        del self._nodes[node.song.id]
+        self.total_duration -= node.song.duration
+        return node.song
+
+    def remove_song_id(self, song_id: int) -> Song:
+        """
+        Removes and returns the song with the given ID.
+
+        Raises:
+            KeyError: If no song with the given ID is in the list.
+        """
+        position = self.position_of(song_id)
+        if position is None:
+            raise KeyError(song_id)
+        return self.pop(position)
+
+    def move(self, song_id: int, index: int) -> None:
+        """
+        Moves the song with the given ID to the given 0-based position.
+
+        Raises:
+            KeyError: If no song with the given ID is in the list.
+        """
+        current = self.position_of(song_id)
+        if current is None:
+            raise KeyError(song_id)
+        index = min(self._clamp(index), len(self) - 1)
+        if current == index:
+            return
+        node = self._remove_node(current)
+        node.priority = self._priorities.random()
+        self._insert_node(index, node)
+
+    def swap(self, song1_id: int, song2_id: int) -> None:
+        """
+        Swaps the positions of the songs with the given IDs.
+
+        Raises:
+            KeyError: If either song is not in the list.
+        """
+        node1 = self._nodes[song1_id]
+        node2 = self._nodes[song2_id]
+        node1.song, node2.song = node2.song, node1.song
+        self._nodes[song1_id], self._nodes[song2_id] = node2, node1
+
+    def clear(self) -> None:
+        """
+        Removes every song from the list.
+        """
+        self._root = None
+        self._nodes.clear()
+        self.total_duration = 0
+
+    def _insert_node(self, index: int, node: _TreeNode) -> None:
+        node.left = node.right = node.parent = None
+        node.size = 1
+        first, rest = _split(self._root, index)
+        self._root = _merge(_merge(first, node), rest)
+        self._root.parent = None
+
+    def _remove_node(self, index: int) -> _TreeNode:
+        first, rest = _split(self._root, index)
+        node, rest = _split(rest, 1)
+        self._root = _merge(first, rest)
+        if self._root is not None:
+            self._root.parent = None
+        return node
+
+    def _node_at(self, index: int) -> _TreeNode:
+        node = self._root
+        while True:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node
+            else:
+                index -= left_size + 1
+                node = node.right
+
+    def _normalize(self, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("playlist index out of range")
+        return index
+
+    def _clamp(self, index: int) -> int:
+        # Follow list.insert: negative positions count from the end, out of range ones stick to the ends
+        length = len(self)
+        if index < 0:
+            index = max(index + length, 0)
+        return min(index, length)
+
+
+# storage engines PlaylistModel can be constructed with
+PLAYLIST_STORAGES = {
+    "list": IndexedSongList,
+    "tree": TreeSongList,
+}
@@ -1,9 +1,24 @@
+from array import array
+from collections import Counter
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass
 import logging
 import os
 import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
 
+from music_collection.utils.cache_utils import ReadThroughCache
+from music_collection.utils.compaction_utils import (
+    COMPACTION_LOCK_BUDGET_MS,
+    COMPACTION_RETENTION_DAYS,
+    archive_deleted_rows,
+    get_retention_cutoff,
+    incremental_vacuum,
+)
 from music_collection.utils.logger import configure_logger
+from music_collection.utils.migration_utils import Migration, add_column_if_missing, apply_migrations
 from music_collection.utils.random_utils import get_random
 from music_collection.utils.sql_utils import get_db_connection
 
@@ -12,8 +27,81 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
+# number of random id probes before get_random_song falls back to picking by position
+RANDOM_SONG_MAX_PROBES = 8
+
+# most ids bound into a single IN (...) query, below the SQLITE_MAX_VARIABLE_NUMBER of older sqlite builds
+MAX_SQL_VARIABLES = 900
+
+# load the write-behind play count settings from the environment with default values
+PLAY_COUNT_WRITE_BEHIND = os.getenv("PLAY_COUNT_WRITE_BEHIND", "false").lower() == "true"
+PLAY_COUNT_FLUSH_INTERVAL = float(os.getenv("PLAY_COUNT_FLUSH_INTERVAL", "5"))
+PLAY_COUNT_FLUSH_THRESHOLD = int(os.getenv("PLAY_COUNT_FLUSH_THRESHOLD", "500"))
+
+# Songs looked up by id or compound key, including missing and deleted ones
+song_cache = ReadThroughCache("songs")
+
+# rows inserted per transaction by create_songs, and the most row errors it reports in detail
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+IMPORT_MAX_ERRORS = 1000
+
+# page size limit for catalog listings, and the songs read per query when streaming the catalog
+CATALOG_MAX_LIMIT = 1000
+CATALOG_STREAM_PAGE_SIZE = int(os.getenv("CATALOG_STREAM_PAGE_SIZE", "500"))
+
+# rows fetched from the cursor at a time when building columnar results
+CATALOG_FETCH_SIZE = 1000
+
+# page sizes for the song leaderboard
+LEADERBOARD_DEFAULT_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+# schema changes applied in order by migrate_catalog, new ones are appended and never edited
+SONG_MIGRATIONS = (
+    Migration(1, "create the songs table", """
+        CREATE TABLE IF NOT EXISTS songs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            artist TEXT NOT NULL,
+            title TEXT NOT NULL,
+            year INTEGER NOT NULL CHECK(year >= 1900),
+            genre TEXT NOT NULL,
+            duration INTEGER NOT NULL CHECK(duration > 0),
+            play_count INTEGER DEFAULT 0,
+            deleted BOOLEAN DEFAULT FALSE,
+            UNIQUE(artist, title, year)
+        )
+    """),
+    Migration(2, "index live songs by play count",
+              "CREATE INDEX IF NOT EXISTS idx_songs_leaderboard ON songs (play_count DESC, id) WHERE deleted = FALSE"),
+    Migration(3, "cover lookups by artist, title and year",
+              "CREATE INDEX IF NOT EXISTS idx_songs_compound_key ON songs (artist, title, year, genre, duration, deleted)"),
+    Migration(4, "record when songs are deleted", lambda cursor: _add_deleted_at(cursor)),
+    Migration(5, "create the songs archive", """
+        CREATE TABLE IF NOT EXISTS songs_archive (
+            id INTEGER PRIMARY KEY,
+            artist TEXT NOT NULL,
+            title TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            genre TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            play_count INTEGER,
+            deleted_at INTEGER,
+            archived_at INTEGER NOT NULL
+        )
+    """),
+    Migration(6, "index deleted songs by deletion time",
+              "CREATE INDEX IF NOT EXISTS idx_songs_deleted_at ON songs (deleted_at) WHERE deleted = TRUE"),
+)
+
+# columns copied to songs_archive when compact_catalog purges a deleted song
+SONG_ARCHIVE_COLUMNS = ("id", "artist", "title", "year", "genre", "duration", "play_count", "deleted_at")
+
+
 @dataclass
 class Song:
+    # No per-instance __dict__, which roughly halves the size of a song held in memory
+    __slots__ = ("id", "artist", "title", "year", "genre", "duration")
+
     id: int
     artist: str
     title: str
@@ -28,6 +116,62 @@ class Song:
             raise ValueError(f"Year must be greater than 1900, got {self.year}")
 
 
+class SongColumns(NamedTuple):
+    """
+    Catalog rows stored column by column, a compact alternative to a list of song dicts.
+
+    Integer columns are typed arrays, 8 bytes per value instead of a pointer to an int object,
+    and repeated artist and genre strings are shared between rows rather than copied per row.
+    Position i of every column belongs to the same song.
+    """
+    id: array
+    artist: List[str]
+    title: List[str]
+    year: array
+    genre: List[str]
+    duration: array
+    play_count: array
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> "SongColumns":
+        """
+        Builds the columns from (id, artist, title, year, genre, duration, play_count) rows.
+        """
+        columns = cls(array("q"), [], [], array("q"), [], array("q"), array("q"))
+        strings = {}
+        for song_id, artist, title, year, genre, duration, play_count in rows:
+            columns.id.append(song_id)
+            columns.artist.append(strings.setdefault(artist, artist))
+            columns.title.append(title)
+            columns.year.append(year)
+            columns.genre.append(strings.setdefault(genre, genre))
+            columns.duration.append(duration)
+            columns.play_count.append(play_count)
+        return columns
+
+    def count(self) -> int:
+        """
+        Returns the number of songs.
+        """
+        return len(self.id)
+
+    def take(self, positions: Iterable[int]) -> "SongColumns":
+        """
+        Returns new columns with the songs at the given positions, in that order.
+        """
+        positions = list(positions)
+        return SongColumns(*(
+            array(column.typecode, (column[i] for i in positions)) if isinstance(column, array) else [column[i] for i in positions]
+            for column in self
+        ))
+
+    def to_dict(self) -> dict:
+        """
+        Returns the columns as a dictionary of lists keyed by field name, ready to serialise as JSON.
+        """
+        return {field: column.tolist() if isinstance(column, array) else column for field, column in zip(self._fields, self)}
+
+
 def create_song(artist: str, title: str, year: int, genre: str, duration: int) -> None:
     """
     Creates a new song in the songs table.
@@ -60,6 +204,10 @@ def create_song(artist: str, title: str, year: int, genre: str, duration: int) -
             """, (artist, title, year, genre, duration))
             conn.commit()
 
+            # Drop the cached misses for the new song's key and id
+            song_cache.invalidate(("compound_key", artist, title, year))
+            song_cache.invalidate(("id", cursor.lastrowid))
+
             logger.info("Song created successfully: %s - %s (%d)", artist, title, year)
 
     except sqlite3.IntegrityError as e:
@@ -69,20 +217,266 @@ def create_song(artist: str, title: str, year: int, genre: str, duration: int) -
         logger.error("Database error while creating song: %s", str(e))
         raise sqlite3.Error(f"Database error: {str(e)}")
 
-def clear_catalog() -> None:
+def create_songs(rows: Iterable[Union[Mapping, Exception]], chunk_size: int = None) -> dict:
     """
-    Recreates the songs table, effectively deleting all songs.
+    Creates songs in bulk, committing one transaction per chunk of rows.
+
+    Each row is validated with the rules of create_song and Song. Invalid rows and songs whose
+    compound key already exists, in the catalog or earlier in the same import, are skipped and
+    reported without aborting the rest of the import. Rows are read lazily, so the input can be
+    a stream of any length.
+
+    Args:
+        rows (Iterable[Mapping | Exception]): Mappings with artist, title, year, genre and duration.
+            Integer fields may be given as strings, as they are in CSV. An Exception in place of a
+            row, such as a malformed line from import_utils.iter_records, is reported as invalid.
+        chunk_size (int, optional): The number of rows inserted per transaction.
+            Defaults to IMPORT_CHUNK_SIZE.
+
+    Returns:
+        dict: The number of songs created, duplicates and invalid rows, and up to IMPORT_MAX_ERRORS
+            errors, each with the 1-based row number, the reason and the error message.
 
     Raises:
-        sqlite3.Error: If any database error occurs.
+        ValueError: If chunk_size is not a positive integer.
+        sqlite3.Error: For any database errors. Chunks committed before the error are kept.
     """
+    chunk_size = IMPORT_CHUNK_SIZE if chunk_size is None else chunk_size
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        raise ValueError(f"Invalid import chunk size: {chunk_size} (must be a positive integer).")
+
+    report = {"created": 0, "duplicates": 0, "invalid": 0, "errors": []}
     try:
-        with open(os.getenv("SQL_CREATE_TABLE_PATH", "/app/sql/create_song_table.sql"), "r") as fh:
-            create_table_script = fh.read()
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.executescript(create_table_script)
-            conn.commit()
+            logger.info("Starting bulk import of songs in chunks of %d", chunk_size)
+
+            chunk = {}  # compound key -> (row number, values)
+            for row_number, row in enumerate(rows, start=1):
+                try:
+                    values = _validate_song_row(row)
+                except ValueError as e:
+                    _report_import_error(report, row_number, "invalid", str(e))
+                    continue
+
+                if values[:3] in chunk:
+                    _report_import_error(report, row_number, "duplicate", _duplicate_song_message(*values[:3]))
+                    continue
+                chunk[values[:3]] = (row_number, values)
+
+                if len(chunk) >= chunk_size:
+                    _insert_song_chunk(conn, cursor, chunk, report)
+                    chunk = {}
+
+            if chunk:
+                _insert_song_chunk(conn, cursor, chunk, report)
+
+            report["errors"].sort(key=lambda error: error["row"])
+            logger.info("Bulk import finished: %d songs created, %d duplicates, %d invalid rows",
+                        report["created"], report["duplicates"], report["invalid"])
+            return report
+
+    except sqlite3.Error as e:
+        logger.error("Database error while importing songs after %d were created: %s", report["created"], str(e))
+        raise e
+    finally:
+        # The ids of the new songs are not known individually, so drop any cached misses for them
+        if report["created"]:
+            song_cache.clear()
+
+def _validate_song_row(row: Union[Mapping, Exception]) -> tuple:
+    # Returns (artist, title, year, genre, duration) or raises ValueError
+    if isinstance(row, Exception):
+        raise ValueError(str(row))
+    if not isinstance(row, (dict, Mapping)):
+        raise ValueError(f"Invalid row: {row!r} (must be an object with artist, title, year, genre and duration).")
+
+    for field in ("artist", "title", "genre"):
+        value = row.get(field)
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"Invalid {field} provided: {value!r} (must be a non-empty string).")
+
+    year = _parse_import_int(row.get("year"))
+    duration = _parse_import_int(row.get("duration"))
+    if not isinstance(year, int) or isinstance(year, bool) or year < 1900:
+        raise ValueError(f"Invalid year provided: {year} (must be an integer greater than or equal to 1900).")
+    if not isinstance(duration, int) or isinstance(duration, bool) or duration <= 0:
+        raise ValueError(f"Invalid song duration: {duration} (must be a positive integer).")
+
+    song = Song(id=None, artist=row["artist"], title=row["title"], year=year, genre=row["genre"], duration=duration)
+    return song.artist, song.title, song.year, song.genre, song.duration
+
+def _parse_import_int(value):
+    # CSV fields are always strings, so accept the string form of an integer as well
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return value
+    return value
+
+def _duplicate_song_message(artist: str, title: str, year: int) -> str:
+    return f"Song with artist '{artist}', title '{title}', and year {year} already exists."
+
+def _report_import_error(report: dict, row_number: int, reason: str, message: str) -> None:
+    report["duplicates" if reason == "duplicate" else "invalid"] += 1
+    if len(report["errors"]) < IMPORT_MAX_ERRORS:
+        report["errors"].append({"row": row_number, "reason": reason, "error": message})
+
+def _insert_song_chunk(conn, cursor, chunk: Dict[tuple, tuple], report: dict) -> None:
+    # Skip the songs already in the catalog, looking their keys up through the unique index
+    keys = list(chunk)
+    existing = set()
+    keys_per_query = MAX_SQL_VARIABLES // 3
+    for start in range(0, len(keys), keys_per_query):
+        part = keys[start:start + keys_per_query]
+        placeholders = ", ".join(["(?, ?, ?)"] * len(part))
+        cursor.execute(f"""
+            WITH keys (artist, title, year) AS (VALUES {placeholders})
+            SELECT songs.artist, songs.title, songs.year
+            FROM keys
+            JOIN songs ON songs.artist = keys.artist AND songs.title = keys.title AND songs.year = keys.year
+        """, [value for key in part for value in key])
+        existing.update(tuple(row) for row in cursor.fetchall())
+
+    new_rows = []
+    for key, (row_number, values) in chunk.items():
+        if key in existing:
+            _report_import_error(report, row_number, "duplicate", _duplicate_song_message(*key))
+        else:
+            new_rows.append((row_number, values))
+
+    insert_query = "INSERT INTO songs (artist, title, year, genre, duration) VALUES (?, ?, ?, ?, ?)"
+    try:
+        cursor.executemany(insert_query, [values for _, values in new_rows])
+        conn.commit()
+        report["created"] += len(new_rows)
+    except sqlite3.IntegrityError:
+        # A song with one of the keys was created since the lookup, so find it row by row
+        conn.rollback()
+        for row_number, values in new_rows:
+            try:
+                cursor.execute(insert_query, values)
+            except sqlite3.IntegrityError:
+                _report_import_error(report, row_number, "duplicate", _duplicate_song_message(*values[:3]))
+            else:
+                report["created"] += 1
+        conn.commit()
+
+    logger.debug("Imported a chunk of %d songs, %d created so far", len(chunk), report["created"])
+
+def migrate_catalog() -> List[int]:
+    """
+    Applies the schema migrations the database is missing, creating the songs table if needed.
+
+    Unlike clear_catalog, existing songs are kept.
+
+    Returns:
+        List[int]: The schema versions applied.
+
+    Raises:
+        sqlite3.Error: If any database error occurs.
+    """
+    try:
+        with get_db_connection() as conn:
+            return apply_migrations(conn, SONG_MIGRATIONS)
+
+    except sqlite3.Error as e:
+        logger.error("Database error while migrating the catalog: %s", str(e))
+        raise e
+
+def _add_deleted_at(cursor: sqlite3.Cursor) -> None:
+    # Songs deleted before the column existed start their retention period now
+    if add_column_if_missing(cursor, "songs", "deleted_at", "INTEGER"):
+        cursor.execute("UPDATE songs SET deleted_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE deleted = TRUE")
+
+def compact_catalog(retention_days: float = COMPACTION_RETENTION_DAYS, lock_budget_ms: float = COMPACTION_LOCK_BUDGET_MS,
+                    stop_event: Optional[threading.Event] = None) -> dict:
+    """
+    Moves songs deleted more than retention_days ago to the songs_archive table, then returns
+    the space they used to the filesystem with an incremental VACUUM.
+
+    The work is split into transactions that hold the write lock for about lock_budget_ms
+    each, so requests that write to the catalog meanwhile wait no longer than that.
+
+    Args:
+        retention_days (float): How long a deleted song stays in the songs table.
+        lock_budget_ms (float): The number of milliseconds a transaction should hold the write lock for at most.
+        stop_event (threading.Event, optional): Stops the compaction between transactions once set.
+
+    Returns:
+        dict: The songs archived, the batches, the longest lock held and the pages vacuumed.
+
+    Raises:
+        ValueError: If the retention is negative or the lock budget is not positive.
+        sqlite3.Error: If any database error occurs.
+    """
+    cutoff = get_retention_cutoff(retention_days)
+    if lock_budget_ms <= 0:
+        raise ValueError(f"Invalid lock budget: {lock_budget_ms}ms (must be greater than 0).")
+    lock_budget = lock_budget_ms / 1000
+
+    def invalidate(song_ids: List[int]) -> None:
+        for song_id in song_ids:
+            song_cache.invalidate_id(song_id)
+
+    try:
+        with get_db_connection() as conn:
+            logger.info("Compacting songs deleted more than %s days ago", retention_days)
+            report = archive_deleted_rows(conn, "songs", "songs_archive", SONG_ARCHIVE_COLUMNS, cutoff, lock_budget,
+                                          on_purged=invalidate, stop_event=stop_event)
+            report["vacuumed_pages"] = incremental_vacuum(conn, lock_budget, stop_event)
+            return report
+
+    except sqlite3.Error as e:
+        logger.error("Database error while compacting the catalog: %s", str(e))
+        raise e
+
+# schema script of an empty catalog, read once for clear_catalog(swap=True)
+SQL_CREATE_TABLE_PATH = os.getenv("SQL_CREATE_TABLE_PATH", "/app/sql/create_song_table.sql")
+
+def _read_create_table_script() -> Optional[str]:
+    try:
+        with open(SQL_CREATE_TABLE_PATH, "r") as fh:
+            return fh.read()
+    except OSError as e:
+        logger.warning("Could not read the schema script %s, clearing by swap is unavailable: %s", SQL_CREATE_TABLE_PATH, str(e))
+        return None
+
+_create_table_script = _read_create_table_script()
+
+
+def clear_catalog(swap: bool = False) -> None:
+    """
+    Deletes every song, including archived songs, and restarts song IDs at 1.
+
+    By default the songs are deleted in a single transaction, which keeps the tables and
+    their indexes in place. With swap, an empty database built from the schema script is
+    copied over the current one instead, which takes as long for a million songs as for
+    one. Either way, readers already in a query keep seeing the old catalog until it ends.
+
+    Args:
+        swap (bool): Whether to replace the database with an empty one rather than delete the songs.
+
+    Raises:
+        ValueError: If swap is requested and the schema script could not be read.
+        sqlite3.Error: If any database error occurs.
+    """
+    # Play counts still waiting to be written belong to songs that no longer exist. No flush may
+    # run until they are dropped, or it could write them to new songs that reuse the IDs
+    buffer = _play_count_buffer
+    try:
+        with buffer.discarding() if buffer is not None else nullcontext(), get_db_connection() as conn:
+            if swap:
+                _swap_in_empty_catalog(conn)
+            else:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM songs;")
+                cursor.execute("DELETE FROM songs_archive;")
+                cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'songs';")
+                conn.commit()
+
+            song_cache.clear()
 
             logger.info("Catalog cleared successfully.")
 
@@ -90,6 +484,21 @@ def clear_catalog() -> None:
         logger.error("Database error while clearing catalog: %s", str(e))
         raise e
 
+def _swap_in_empty_catalog(conn: sqlite3.Connection) -> None:
+    if _create_table_script is None:
+        raise ValueError(f"Cannot clear the catalog by swap, the schema script {SQL_CREATE_TABLE_PATH} could not be read")
+    empty = sqlite3.connect(":memory:")
+    try:
+        # The backup API cannot change the page size of a database in WAL mode
+        page_size = conn.execute("PRAGMA page_size;").fetchone()[0]
+        empty.execute(f"PRAGMA page_size = {int(page_size)};")
+        empty.executescript(_create_table_script)
+        # Copied over the open database in a single write transaction, where renaming a new
+        # file into place would leave the pooled connections and WAL files on the old one
+        empty.backup(conn)
+    finally:
+        empty.close()
+
 def delete_song(song_id: int) -> None:
     """
     Soft deletes a song from the catalog by marking it as deleted.
@@ -117,9 +526,11 @@ def delete_song(song_id: int) -> None:
                 raise ValueError(f"Song with ID {song_id} not found")
 
             # Perform the soft delete by setting 'deleted' to TRUE
-            cursor.execute("UPDATE songs SET deleted = TRUE WHERE id = ?", (song_id,))
+            cursor.execute("UPDATE songs SET deleted = TRUE, deleted_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = ?", (song_id,))
             conn.commit()
 
+            song_cache.invalidate_id(song_id)
+
             logger.info("Song with ID %s marked as deleted.", song_id)
 
     except sqlite3.Error as e:
@@ -128,7 +539,8 @@ def delete_song(song_id: int) -> None:
 
 def get_song_by_id(song_id: int) -> Song:
     """
-    Retrieves a song from the catalog by its song ID.
+    Retrieves a song from the catalog by its song ID. Results, including missing and deleted
+    songs, are served from the song cache.
 
     Args:
         song_id (int): The ID of the song to retrieve.
@@ -139,6 +551,9 @@ def get_song_by_id(song_id: int) -> Song:
     Raises:
         ValueError: If the song is not found or is marked as deleted.
     """
+    return song_cache.get_or_load(("id", song_id), lambda: _load_song_by_id(song_id), entity_id=song_id)
+
+def _load_song_by_id(song_id: int) -> Song:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -166,7 +581,8 @@ def get_song_by_id(song_id: int) -> Song:
 
 def get_song_by_compound_key(artist: str, title: str, year: int) -> Song:
     """
-    Retrieves a song from the catalog by its compound key (artist, title, year).
+    Retrieves a song from the catalog by its compound key (artist, title, year). Results,
+    including missing and deleted songs, are served from the song cache.
 
     Args:
         artist (str): The artist of the song.
@@ -179,13 +595,18 @@ def get_song_by_compound_key(artist: str, title: str, year: int) -> Song:
     Raises:
         ValueError: If the song is not found or is marked as deleted.
     """
+    return song_cache.get_or_load(("compound_key", artist, title, year),
+                                  lambda: _load_song_by_compound_key(artist, title, year))
+
+def _load_song_by_compound_key(artist: str, title: str, year: int) -> Song:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             logger.info("Attempting to retrieve song with artist '%s', title '%s', and year %d", artist, title, year)
+            # The planner prefers the UNIQUE constraint's index, which holds only the key
             cursor.execute("""
                 SELECT id, artist, title, year, genre, duration, deleted
-                FROM songs
+                FROM songs INDEXED BY idx_songs_compound_key
                 WHERE artist = ? AND title = ? AND year = ?
             """, (artist, title, year))
             row = cursor.fetchone()
@@ -204,52 +625,58 @@ def get_song_by_compound_key(artist: str, title: str, year: int) -> Song:
         logger.error("Database error while retrieving song by compound key (artist '%s', title '%s', year %d): %s", artist, title, year, str(e))
         raise e
 
-def get_all_songs(sort_by_play_count: bool = False) -> list[dict]:
+def get_all_songs(sort_by_play_count: bool = False, include_pending: bool = False,
+                  after_id: Optional[int] = None, limit: Optional[int] = None) -> list[dict]:
     """
-    Retrieves all songs that are not marked as deleted from the catalog.
+    Retrieves all songs that are not marked as deleted from the catalog, or one page of them.
+
+    Pages are chained with a keyset cursor on the song ID rather than an offset, so every page
+    is a seek into the primary key and costs time in the number of songs returned.
 
     Args:
         sort_by_play_count (bool): If True, sort the songs by play count in descending order.
+        include_pending (bool): If True and write-behind play counts are enabled, add the increments
+            that have not been flushed yet to each play count. If False, return the flushed counts.
+        after_id (int, optional): Only return songs with a greater ID, in ID order. Pass the ID of
+            the last song of the previous page. Cannot be combined with sort_by_play_count.
+        limit (int, optional): The maximum number of songs to return, between 1 and CATALOG_MAX_LIMIT.
+            If None, every song is returned.
 
     Returns:
         list[dict]: A list of dictionaries representing all non-deleted songs with play_count.
 
+    Raises:
+        ValueError: If the limit is out of range or after_id is combined with sort_by_play_count.
+        sqlite3.Error: If any database error occurs.
+
     Logs:
         Warning: If the catalog is empty.
     """
+    _check_catalog_page(sort_by_play_count, after_id, limit)
+
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             logger.info("Attempting to retrieve all non-deleted songs from the catalog")
 
-            # Determine the sort order based on the 'sort_by_play_count' flag
-            query = """
-                SELECT id, artist, title, year, genre, duration, play_count
-                FROM songs
-                WHERE deleted = FALSE
-            """
-            if sort_by_play_count:
-                query += " ORDER BY play_count DESC"
-
-            cursor.execute(query)
+            _execute_catalog_query(cursor, sort_by_play_count, after_id, limit)
             rows = cursor.fetchall()
 
             if not rows:
-                logger.warning("The song catalog is empty.")
+                if after_id is None:
+                    logger.warning("The song catalog is empty.")
                 return []
 
-            songs = [
-                {
-                    "id": row[0],
-                    "artist": row[1],
-                    "title": row[2],
-                    "year": row[3],
-                    "genre": row[4],
-                    "duration": row[5],
-                    "play_count": row[6],
-                }
-                for row in rows
-            ]
+            songs = _song_rows_to_dicts(rows)
+
+            if include_pending:
+                pending = get_pending_play_counts()
+                if pending:
+                    for song in songs:
+                        song["play_count"] += pending.get(song["id"], 0)
+                    if sort_by_play_count:
+                        songs.sort(key=lambda song: song["play_count"], reverse=True)
+
             logger.info("Retrieved %d songs from the catalog", len(songs))
             return songs
 
@@ -257,9 +684,205 @@ def get_all_songs(sort_by_play_count: bool = False) -> list[dict]:
         logger.error("Database error while retrieving all songs: %s", str(e))
         raise e
 
+def get_all_songs_columnar(sort_by_play_count: bool = False, include_pending: bool = False,
+                           after_id: Optional[int] = None, limit: Optional[int] = None) -> SongColumns:
+    """
+    Retrieves the same songs as get_all_songs, as columns instead of one dict per song.
+
+    The rows are read from the cursor in batches straight into the columns, so the whole
+    catalog is never held as row tuples or dicts.
+
+    Args:
+        sort_by_play_count (bool): If True, sort the songs by play count in descending order.
+        include_pending (bool): If True, add the play count increments that have not been flushed yet.
+        after_id (int, optional): Only return songs with a greater ID, in ID order.
+        limit (int, optional): The maximum number of songs to return, between 1 and CATALOG_MAX_LIMIT.
+
+    Returns:
+        SongColumns: The non-deleted songs with their play counts.
+
+    Raises:
+        ValueError: If the limit is out of range or after_id is combined with sort_by_play_count.
+        sqlite3.Error: If any database error occurs.
+    """
+    _check_catalog_page(sort_by_play_count, after_id, limit)
+
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            logger.info("Attempting to retrieve all non-deleted songs from the catalog as columns")
+
+            _execute_catalog_query(cursor, sort_by_play_count, after_id, limit)
+            columns = SongColumns.from_rows(row for batch in iter(lambda: cursor.fetchmany(CATALOG_FETCH_SIZE), []) for row in batch)
+
+            if not columns.count() and after_id is None:
+                logger.warning("The song catalog is empty.")
+
+            if include_pending:
+                pending = get_pending_play_counts()
+                if pending:
+                    for position, song_id in enumerate(columns.id):
+                        columns.play_count[position] += pending.get(song_id, 0)
+                    if sort_by_play_count:
+                        columns = columns.take(sorted(range(columns.count()), key=columns.play_count.__getitem__, reverse=True))
+
+            logger.info("Retrieved %d songs from the catalog", columns.count())
+            return columns
+
+    except sqlite3.Error as e:
+        logger.error("Database error while retrieving all songs: %s", str(e))
+        raise e
+
+def _check_catalog_page(sort_by_play_count: bool, after_id: Optional[int], limit: Optional[int]) -> None:
+    if limit is not None and not 1 <= limit <= CATALOG_MAX_LIMIT:
+        logger.error("Invalid catalog limit: %s", limit)
+        raise ValueError(f"Invalid catalog limit: {limit} (must be between 1 and {CATALOG_MAX_LIMIT}).")
+    if after_id is not None and sort_by_play_count:
+        logger.error("Catalog pages after song ID %s cannot be sorted by play count", after_id)
+        raise ValueError("after_id pages through the catalog in ID order and cannot be combined with sort_by_play_count, "
+                         "use the song leaderboard instead.")
+
+def _execute_catalog_query(cursor, sort_by_play_count: bool, after_id: Optional[int], limit: Optional[int]) -> None:
+    # Determine the sort order based on the 'sort_by_play_count' flag
+    query = """
+        SELECT id, artist, title, year, genre, duration, play_count
+        FROM songs
+        WHERE deleted = FALSE
+    """
+    params = []
+    if after_id is not None:
+        query += " AND id > ?"
+        params.append(after_id)
+    if sort_by_play_count:
+        query += " ORDER BY play_count DESC"
+    elif after_id is not None or limit is not None:
+        query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+
+def iter_song_pages(sort_by_play_count: bool = False, page_size: int = CATALOG_STREAM_PAGE_SIZE) -> Iterator[list[dict]]:
+    """
+    Returns an iterator over the songs that are not marked as deleted, one page at a time, for
+    streaming the catalog without holding it in memory.
+
+    Each page is read with its own keyset query, on the song ID or on the (play_count, id)
+    leaderboard index, so no connection or read transaction is held while the caller
+    consumes a page. Play counts are the flushed ones.
+
+    Args:
+        sort_by_play_count (bool): If True, yield the songs by play count in descending order,
+            with ties broken by song ID. Otherwise yield them in ID order.
+        page_size (int): The number of songs read per query, between 1 and CATALOG_MAX_LIMIT.
+
+    Returns:
+        Iterator[list[dict]]: The pages of songs, each song with its play_count.
+
+    Raises:
+        ValueError: If the page size is out of range, when the function is called.
+        sqlite3.Error: If any database error occurs while iterating.
+    """
+    # Checked before the generator is created, so a bad page size fails the call rather than the first page
+    if not 1 <= page_size <= CATALOG_MAX_LIMIT:
+        logger.error("Invalid catalog page size: %s", page_size)
+        raise ValueError(f"Invalid catalog page size: {page_size} (must be between 1 and {CATALOG_MAX_LIMIT}).")
+    return _iter_song_pages(sort_by_play_count, page_size)
+
+def _iter_song_pages(sort_by_play_count: bool, page_size: int) -> Iterator[list[dict]]:
+    after = None
+    while True:
+        if sort_by_play_count:
+            page = _get_song_leaderboard_page(page_size, after)
+        else:
+            page = get_all_songs(after_id=after, limit=page_size)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+        after = (last["play_count"], last["id"]) if sort_by_play_count else last["id"]
+
+def get_song_leaderboard(limit: int = LEADERBOARD_DEFAULT_LIMIT, after: Optional[Tuple[int, int]] = None) -> list[dict]:
+    """
+    Retrieves a page of the non-deleted songs ordered by play count, highest first, with ties
+    broken by song ID.
+
+    The query walks the partial index on (play_count DESC, id), so a page costs time in the
+    number of songs returned rather than a sort of the whole catalog. Pages are chained with
+    a keyset cursor instead of an offset, so later pages are as cheap as the first.
+
+    Args:
+        limit (int): The maximum number of songs to return, between 1 and LEADERBOARD_MAX_LIMIT.
+        after (Tuple[int, int], optional): The (play_count, id) of the last song of the previous
+            page. If None, the page starts at the top of the leaderboard.
+
+    Returns:
+        list[dict]: The songs on the page, each with its play_count.
+
+    Raises:
+        ValueError: If the limit is out of range.
+        sqlite3.Error: If any database error occurs.
+    """
+    if not 1 <= limit <= LEADERBOARD_MAX_LIMIT:
+        logger.error("Invalid leaderboard limit: %s", limit)
+        raise ValueError(f"Invalid leaderboard limit: {limit} (must be between 1 and {LEADERBOARD_MAX_LIMIT}).")
+    return _get_song_leaderboard_page(limit, after)
+
+def _get_song_leaderboard_page(limit: int, after: Optional[Tuple[int, int]]) -> list[dict]:
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            logger.info("Attempting to retrieve %d songs from the leaderboard after %s", limit, after)
+
+            query = """
+                SELECT id, artist, title, year, genre, duration, play_count
+                FROM songs
+                WHERE deleted = FALSE
+            """
+            params = []
+            if after is not None:
+                # The play_count bound lets sqlite seek into the index, the rest skips the tied songs already returned
+                query += " AND play_count <= ? AND (play_count < ? OR id > ?)"
+                after_play_count, after_id = after
+                params.extend([after_play_count, after_play_count, after_id])
+            query += " ORDER BY play_count DESC, id LIMIT ?"
+            params.append(limit)
+
+            cursor.execute(query, params)
+            songs = _song_rows_to_dicts(cursor.fetchall())
+            logger.info("Retrieved %d songs from the leaderboard", len(songs))
+            return songs
+
+    except sqlite3.Error as e:
+        logger.error("Database error while retrieving the song leaderboard: %s", str(e))
+        raise e
+
+def _song_rows_to_dicts(rows: Iterable[tuple]) -> list[dict]:
+    return [
+        {
+            "id": row[0],
+            "artist": row[1],
+            "title": row[2],
+            "year": row[3],
+            "genre": row[4],
+            "duration": row[5],
+            "play_count": row[6],
+        }
+        for row in rows
+    ]
+
 def get_random_song() -> Song:
     """
-    Retrieves a random song from the catalog.
+    Retrieves a random song from the catalog without reading the whole catalog.
+
+    Random ids are drawn from the range of ids in the table and rejected if they land on a
+    deleted or missing row, so every live song is equally likely. If every probe misses, a
+    random position among the live songs is used instead.
 
     Returns:
         Song: A randomly selected Song object.
@@ -268,26 +891,49 @@ def get_random_song() -> Song:
         ValueError: If the catalog is empty.
     """
     try:
-        all_songs = get_all_songs()
-
-        if not all_songs:
-            logger.info("Cannot retrieve random song because the song catalog is empty.")
-            raise ValueError("The song catalog is empty.")
-
-        # Get a random index using the random.org API
-        random_index = get_random(len(all_songs))
-        logger.info("Random index selected: %d (total songs: %d)", random_index, len(all_songs))
-
-        # Return the song at the random index, adjust for 0-based indexing
-        song_data = all_songs[random_index - 1]
-        return Song(
-            id=song_data["id"],
-            artist=song_data["artist"],
-            title=song_data["title"],
-            year=song_data["year"],
-            genre=song_data["genre"],
-            duration=song_data["duration"]
-        )
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+
+            # Separate subqueries let sqlite answer each bound from the primary key index
+            cursor.execute("SELECT (SELECT MIN(id) FROM songs), (SELECT MAX(id) FROM songs)")
+            min_id, max_id = cursor.fetchone()
+
+            if max_id is None:
+                logger.info("Cannot retrieve random song because the song catalog is empty.")
+                raise ValueError("The song catalog is empty.")
+
+            for _ in range(RANDOM_SONG_MAX_PROBES):
+                song_id = min_id + get_random(max_id - min_id + 1) - 1
+                cursor.execute("""
+                    SELECT id, artist, title, year, genre, duration
+                    FROM songs
+                    WHERE id = ? AND deleted = FALSE
+                """, (song_id,))
+                row = cursor.fetchone()
+                if row:
+                    logger.info("Random song ID selected: %d (id range %d-%d)", song_id, min_id, max_id)
+                    return Song(id=row[0], artist=row[1], title=row[2], year=row[3], genre=row[4], duration=row[5])
+
+            # The id range is too sparse to keep probing, pick a position among the live songs
+            logger.info("No live song found in %d probes, selecting by position", RANDOM_SONG_MAX_PROBES)
+            cursor.execute("SELECT COUNT(*) FROM songs WHERE deleted = FALSE")
+            num_songs = cursor.fetchone()[0]
+
+            if not num_songs:
+                logger.info("Cannot retrieve random song because the song catalog is empty.")
+                raise ValueError("The song catalog is empty.")
+
+            random_index = get_random(num_songs)
+            logger.info("Random index selected: %d (total songs: %d)", random_index, num_songs)
+            cursor.execute("""
+                SELECT id, artist, title, year, genre, duration
+                FROM songs
+                WHERE deleted = FALSE
+                ORDER BY id
+                LIMIT 1 OFFSET ?
+            """, (random_index - 1,))
+            row = cursor.fetchone()
+            return Song(id=row[0], artist=row[1], title=row[2], year=row[3], genre=row[4], duration=row[5])
 
     except Exception as e:
         logger.error("Error while retrieving random song: %s", str(e))
@@ -295,7 +941,8 @@ def get_random_song() -> Song:
 
 def update_play_count(song_id: int) -> None:
     """
-    Increments the play count of a song by song ID.
+    Increments the play count of a song by song ID. With write-behind enabled the song is
+    validated and the increment is queued instead of written.
 
     Args:
         song_id (int): The ID of the song whose play count should be incremented.
@@ -320,6 +967,12 @@ def update_play_count(song_id: int) -> None:
                 logger.info("Song with ID %d not found", song_id)
                 raise ValueError(f"Song with ID {song_id} not found")
 
+            buffer = get_play_count_buffer()
+            if buffer is not None:
+                buffer.add({song_id: 1})
+                logger.info("Play count increment for song with ID %d queued for write-behind", song_id)
+                return
+
             # Increment the play count
             cursor.execute("UPDATE songs SET play_count = play_count + 1 WHERE id = ?", (song_id,))
             conn.commit()
@@ -329,3 +982,292 @@ def update_play_count(song_id: int) -> None:
     except sqlite3.Error as e:
         logger.error("Database error while updating play count for song with ID %d: %s", song_id, str(e))
         raise e
+
+def update_play_counts(ids_with_increments: Union[Mapping[int, int], Iterable[Tuple[int, int]]]) -> None:
+    """
+    Increments the play counts of several songs in a single transaction.
+
+    All of the song IDs are validated before any play count is changed, so either every
+    increment is applied or none is. With write-behind enabled the validated increments are
+    queued instead of written.
+
+    Args:
+        ids_with_increments (Mapping[int, int] | Iterable[Tuple[int, int]]): The song IDs and the
+            amount to add to each play count. Repeated IDs are summed.
+
+    Raises:
+        ValueError: If any of the songs does not exist or is marked as deleted.
+        sqlite3.Error: If there is a database error.
+    """
+    if isinstance(ids_with_increments, Mapping):
+        ids_with_increments = ids_with_increments.items()
+    increments = Counter()
+    for song_id, increment in ids_with_increments:
+        increments[song_id] += increment
+    if not increments:
+        logger.info("No play counts to update")
+        return
+
+    song_ids = list(increments)
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            logger.info("Attempting to update play counts for %d songs", len(song_ids))
+
+            # Check that every song exists and is not deleted before writing anything
+            deleted_by_id = {}
+            for start in range(0, len(song_ids), MAX_SQL_VARIABLES):
+                chunk = song_ids[start:start + MAX_SQL_VARIABLES]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(f"SELECT id, deleted FROM songs WHERE id IN ({placeholders})", chunk)
+                deleted_by_id.update(cursor.fetchall())
+
+            for song_id in song_ids:
+                if song_id not in deleted_by_id:
+                    logger.info("Song with ID %d not found", song_id)
+                    raise ValueError(f"Song with ID {song_id} not found")
+                if deleted_by_id[song_id]:
+                    logger.info("Song with ID %d has been deleted", song_id)
+                    raise ValueError(f"Song with ID {song_id} has been deleted")
+
+            buffer = get_play_count_buffer()
+            if buffer is not None:
+                buffer.add(increments)
+                logger.info("Play count increments for %d songs queued for write-behind", len(song_ids))
+                return
+
+            # Increment the play counts
+            cursor.executemany(
+                "UPDATE songs SET play_count = play_count + ? WHERE id = ?",
+                [(increment, song_id) for song_id, increment in increments.items()]
+            )
+            conn.commit()
+
+            logger.info("Play counts incremented for %d songs (%d plays)", len(song_ids), sum(increments.values()))
+
+    except sqlite3.Error as e:
+        logger.error("Database error while updating play counts: %s", str(e))
+        raise e
+
+
+class PlayCountBuffer:
+    """
+    Accumulates play count increments in memory and writes them to the songs table in batches.
+
+    A background thread flushes the pending increments every flush_interval seconds, or as
+    soon as flush_threshold increments are pending. Increments for songs deleted before the
+    flush are dropped. If a flush fails, its increments are kept and retried with the next one.
+
+    Attributes:
+        flush_interval (float): The number of seconds between timed flushes.
+        flush_threshold (int): The number of pending increments that triggers a flush.
+    """
+
+    def __init__(self, flush_interval: float = PLAY_COUNT_FLUSH_INTERVAL, flush_threshold: int = PLAY_COUNT_FLUSH_THRESHOLD):
+        if flush_interval <= 0:
+            raise ValueError(f"Invalid flush interval: {flush_interval} (must be greater than 0).")
+        if flush_threshold < 1:
+            raise ValueError(f"Invalid flush threshold: {flush_threshold} (must be at least 1).")
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = Counter()
+        self._in_flight = Counter()
+        self._num_pending = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_needed = threading.Event()
+        self._stopped = threading.Event()
+        self.stats = {
+            "flushes": 0,
+            "flush_failures": 0,
+            "flushed_increments": 0,
+            "last_flush_size": 0,
+            "last_flush_latency": None,
+        }
+        self._thread = threading.Thread(target=self._flush_loop, name="play-count-flush", daemon=True)
+        self._thread.start()
+
+    def add(self, increments: Mapping[int, int]) -> None:
+        """
+        Queues play count increments, keyed by song ID.
+        """
+        with self._lock:
+            for song_id, increment in increments.items():
+                self._pending[song_id] += increment
+                self._num_pending += increment
+            if self._num_pending >= self.flush_threshold:
+                self._flush_needed.set()
+
+    def pending_counts(self) -> Dict[int, int]:
+        """
+        Returns the increments that have not been committed yet, including a flush in progress.
+        """
+        with self._lock:
+            pending = self._pending + self._in_flight
+        return dict(pending)
+
+    def flush(self) -> int:
+        """
+        Writes the pending increments to the songs table in a single transaction.
+
+        Returns:
+            int: The number of increments flushed.
+
+        Raises:
+            sqlite3.Error: If there is a database error. The increments stay pending.
+        """
+        with self._flush_lock:
+            with self._lock:
+                increments, self._pending = self._pending, Counter()
+                num_increments, self._num_pending = self._num_pending, 0
+                self._in_flight = increments
+            if not increments:
+                return 0
+
+            start = time.monotonic()
+            try:
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany(
+                        "UPDATE songs SET play_count = play_count + ? WHERE id = ? AND deleted = FALSE",
+                        [(increment, song_id) for song_id, increment in increments.items()]
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                logger.error("Database error while flushing %d play count increments: %s", num_increments, str(e))
+                with self._lock:
+                    self._pending.update(increments)
+                    self._num_pending += num_increments
+                    self._in_flight = Counter()
+                    self.stats["flush_failures"] += 1
+                raise e
+            latency = time.monotonic() - start
+
+            with self._lock:
+                self._in_flight = Counter()
+                self.stats["flushes"] += 1
+                self.stats["flushed_increments"] += num_increments
+                self.stats["last_flush_size"] = num_increments
+                self.stats["last_flush_latency"] = latency
+            logger.info("Flushed %d play count increments for %d songs in %.3fs", num_increments, len(increments), latency)
+            return num_increments
+
+    def discard(self) -> None:
+        """
+        Drops every pending increment without writing it, once a flush in progress has finished.
+        """
+        with self.discarding():
+            pass
+
+    @contextmanager
+    def discarding(self) -> Iterator[None]:
+        """
+        Holds off flushes for the duration of the block, then drops every pending increment
+        unless the block raised. A flush in progress finishes before the block starts, so no
+        increment taken before the block is written after it.
+        """
+        with self._flush_lock:
+            yield
+            with self._lock:
+                self._pending = Counter()
+                self._num_pending = 0
+
+    def get_stats(self) -> dict:
+        """
+        Returns the pending increment count and the flush counters and latency.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending_increments"] = self._num_pending
+            stats["pending_songs"] = len(self._pending)
+        stats["flush_interval"] = self.flush_interval
+        stats["flush_threshold"] = self.flush_threshold
+        return stats
+
+    def close(self) -> None:
+        """
+        Stops the flush thread and flushes whatever is still pending.
+
+        Raises:
+            sqlite3.Error: If the final flush fails.
+        """
+        self._stopped.set()
+        self._flush_needed.set()
+        self._thread.join()
+        self.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._flush_needed.wait(self.flush_interval)
+            if self._stopped.is_set():
+                break
+            self._flush_needed.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Already logged, the increments are retried on the next flush
+                pass
+
+
+_play_count_buffer = None
+_play_count_buffer_lock = threading.Lock()
+
+
+def get_play_count_buffer() -> Optional[PlayCountBuffer]:
+    """
+    Returns the write-behind play count buffer, creating it on first use if PLAY_COUNT_WRITE_BEHIND
+    is enabled, or None if play counts are written synchronously.
+    """
+    global _play_count_buffer
+    if _play_count_buffer is None and PLAY_COUNT_WRITE_BEHIND:
+        with _play_count_buffer_lock:
+            if _play_count_buffer is None:
+                _play_count_buffer = PlayCountBuffer()
+                logger.info("Write-behind play counts enabled (interval %.1fs, threshold %d)",
+                            PLAY_COUNT_FLUSH_INTERVAL, PLAY_COUNT_FLUSH_THRESHOLD)
+    return _play_count_buffer
+
+def set_play_count_buffer(buffer: Optional[PlayCountBuffer]) -> None:
+    """
+    Replaces the write-behind play count buffer, closing and flushing the previous one.
+    Passing None goes back to the buffer configured by the environment.
+    """
+    global _play_count_buffer
+    with _play_count_buffer_lock:
+        previous, _play_count_buffer = _play_count_buffer, buffer
+    if previous is not None and previous is not buffer:
+        previous.close()
+
+def close_play_count_buffer() -> None:
+    """
+    Flushes the pending play counts and stops the write-behind buffer. Called on shutdown.
+    """
+    if _play_count_buffer is not None:
+        logger.info("Flushing pending play counts before shutdown")
+        set_play_count_buffer(None)
+
+def flush_play_counts() -> int:
+    """
+    Flushes the pending play counts now.
+
+    Returns:
+        int: The number of increments flushed, 0 if write-behind is disabled.
+    """
+    buffer = get_play_count_buffer()
+    return buffer.flush() if buffer is not None else 0
+
+def get_pending_play_counts() -> Dict[int, int]:
+    """
+    Returns the play count increments that have not been written yet, keyed by song ID.
+    """
+    buffer = _play_count_buffer
+    return buffer.pending_counts() if buffer is not None else {}
+
+def get_play_count_stats() -> dict:
+    """
+    Returns whether write-behind is enabled along with the buffer counters.
+    """
+    buffer = get_play_count_buffer()
+    if buffer is None:
+        return {"write_behind": False}
+    return {"write_behind": True, **buffer.get_stats()}
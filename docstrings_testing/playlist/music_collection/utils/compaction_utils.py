@@ -0,0 +1,230 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from music_collection.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# load the compaction settings from the environment with default values, an interval of 0 disables the background job
+COMPACTION_RETENTION_DAYS = float(os.getenv("COMPACTION_RETENTION_DAYS", "30"))
+COMPACTION_LOCK_BUDGET_MS = float(os.getenv("COMPACTION_LOCK_BUDGET_MS", "50"))
+COMPACTION_INTERVAL = float(os.getenv("COMPACTION_INTERVAL", "0"))
+
+# rows archived and pages vacuumed by the first transaction, later ones are sized from how long the previous one took
+COMPACTION_INITIAL_BATCH = 100
+COMPACTION_MAX_BATCH = 10000
+VACUUM_INITIAL_PAGES = 100
+VACUUM_MAX_PAGES = 10000
+
+
+def get_retention_cutoff(retention_days: float) -> int:
+    """
+    Returns the Unix time before which soft-deleted rows are compacted.
+
+    Raises:
+        ValueError: If the retention is negative.
+    """
+    if retention_days < 0:
+        raise ValueError(f"Invalid retention: {retention_days} days (must not be negative).")
+    return int(time.time() - retention_days * 86400)
+
+def next_batch_size(size: int, elapsed: float, lock_budget: float, maximum: int) -> int:
+    """
+    Sizes the next batch so that it takes about 80% of the lock budget, at the rate of the last one.
+    """
+    if elapsed <= 0:
+        return min(size * 2, maximum)
+    return max(1, min(int(size * lock_budget * 0.8 / elapsed), size * 2, maximum))
+
+def archive_deleted_rows(conn: sqlite3.Connection, table: str, archive_table: str, columns: Iterable[str],
+                         cutoff: int, lock_budget: float, on_purged: Optional[Callable[[List[int]], None]] = None,
+                         stop_event: Optional[threading.Event] = None) -> dict:
+    """
+    Copies soft-deleted rows deleted before the cutoff into the archive table and deletes them.
+
+    Rows are moved in batches, oldest IDs first, each in its own IMMEDIATE transaction. The
+    batch size follows the time the previous batch held the write lock, so that a batch stays
+    within the lock budget, and the job waits as long as the budget between batches so other
+    writers get the lock.
+
+    Args:
+        conn (sqlite3.Connection): A connection with no open transaction.
+        table (str): The table with id, deleted and deleted_at columns.
+        archive_table (str): The table the rows are copied to, with the same columns and archived_at.
+        columns (Iterable[str]): The columns copied to the archive, including id.
+        cutoff (int): Rows deleted before this Unix time are moved.
+        lock_budget (float): The number of seconds a batch should hold the write lock for at most.
+        on_purged (Callable, optional): Called with the IDs of each committed batch.
+        stop_event (threading.Event, optional): Stops the job between batches once set.
+
+    Returns:
+        dict: The rows archived, the batches and the longest time the write lock was held.
+
+    Raises:
+        sqlite3.Error: If a batch fails. It is rolled back, earlier batches stay committed.
+    """
+    column_list = ", ".join(columns)
+    report = {"archived": 0, "batches": 0, "max_lock_seconds": 0.0}
+    batch_size = COMPACTION_INITIAL_BATCH
+    cursor = conn.cursor()
+    stop_event = stop_event or threading.Event()
+
+    while not stop_event.is_set():
+        cursor.execute("BEGIN IMMEDIATE;")
+        # The lock is held from here, any wait for it was spent in BEGIN
+        start = time.monotonic()
+        try:
+            cursor.execute(f"""
+                SELECT id FROM {table}
+                WHERE deleted = TRUE AND deleted_at < ?
+                ORDER BY id LIMIT ?
+            """, (cutoff, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if ids:
+                # The batch is every matching row between its first and last ID
+                condition = "id BETWEEN ? AND ? AND deleted = TRUE AND deleted_at < ?"
+                params = (ids[0], ids[-1], cutoff)
+                cursor.execute(f"""
+                    INSERT INTO {archive_table} ({column_list}, archived_at)
+                    SELECT {column_list}, CAST(strftime('%s', 'now') AS INTEGER) FROM {table} WHERE {condition}
+                """, params)
+                cursor.execute(f"DELETE FROM {table} WHERE {condition}", params)
+            cursor.execute("COMMIT;")
+        except sqlite3.Error as e:
+            logger.error("Database error while archiving deleted rows from %s: %s", table, str(e))
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK;")
+            raise e
+        elapsed = time.monotonic() - start
+
+        if not ids:
+            break
+        report["archived"] += len(ids)
+        report["batches"] += 1
+        report["max_lock_seconds"] = max(report["max_lock_seconds"], elapsed)
+        logger.debug("Archived %d deleted rows from %s in %.3fs", len(ids), table, elapsed)
+        if on_purged is not None:
+            on_purged(ids)
+        if len(ids) < batch_size:
+            break
+
+        batch_size = next_batch_size(batch_size, elapsed, lock_budget, COMPACTION_MAX_BATCH)
+        stop_event.wait(lock_budget)
+
+    logger.info("Archived %d deleted rows from %s in %d batches", report["archived"], table, report["batches"])
+    return report
+
+def incremental_vacuum(conn: sqlite3.Connection, lock_budget: float, stop_event: Optional[threading.Event] = None) -> int:
+    """
+    Returns the free pages of the database file to the filesystem, a few at a time.
+
+    Does nothing unless the database uses incremental auto-vacuum, which only new databases
+    get from the pragma profiles. Older ones are converted by full_vacuum().
+
+    Args:
+        conn (sqlite3.Connection): A connection with no open transaction.
+        lock_budget (float): The number of seconds a step should hold the write lock for at most.
+        stop_event (threading.Event, optional): Stops the vacuum between steps once set.
+
+    Returns:
+        int: The number of pages freed.
+    """
+    if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+        logger.info("Skipping incremental vacuum, the database does not use incremental auto-vacuum")
+        return 0
+
+    freed = 0
+    pages = VACUUM_INITIAL_PAGES
+    stop_event = stop_event or threading.Event()
+    free_pages = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    while free_pages and not stop_event.is_set():
+        step = min(pages, free_pages)
+        start = time.monotonic()
+        # execute() would only run the pragma once, freeing a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(step)});")
+        elapsed = time.monotonic() - start
+
+        remaining = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+        freed += free_pages - remaining
+        if remaining >= free_pages:
+            break
+        free_pages = remaining
+        pages = next_batch_size(step, elapsed, lock_budget, VACUUM_MAX_PAGES)
+        if free_pages:
+            stop_event.wait(lock_budget)
+
+    logger.info("Incremental vacuum freed %d pages", freed)
+    return freed
+
+def full_vacuum(conn: sqlite3.Connection) -> None:
+    """
+    Rebuilds the database file with VACUUM and switches it to incremental auto-vacuum.
+
+    The rebuild holds the write lock until it finishes, so it is meant to be run by hand.
+    """
+    logger.info("Rebuilding the database with VACUUM")
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("VACUUM;")
+    logger.info("Database rebuilt")
+
+
+class CompactionScheduler:
+    """
+    Runs a compaction job in a background thread every interval seconds.
+
+    The job is called with a stop_event keyword argument, which is set when the scheduler is
+    closed so that a run in progress stops between two transactions. A failed run is logged
+    and retried at the next interval.
+
+    Attributes:
+        interval (float): The number of seconds between the end of a run and the start of the next.
+    """
+
+    def __init__(self, job: Callable[..., dict], interval: float = COMPACTION_INTERVAL):
+        if interval <= 0:
+            raise ValueError(f"Invalid compaction interval: {interval} (must be greater than 0).")
+        self.interval = interval
+        self._job = job
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.stats = {"runs": 0, "failures": 0, "last_run": None, "last_run_seconds": None}
+        self._thread = threading.Thread(target=self._run_loop, name="compaction", daemon=True)
+        self._thread.start()
+
+    def get_stats(self) -> dict:
+        """
+        Returns the run counters and the report of the last successful run.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats["interval"] = self.interval
+        return stats
+
+    def close(self) -> None:
+        """
+        Stops the background thread, waiting for a run in progress to reach the end of its transaction.
+        """
+        self._stopped.set()
+        self._thread.join()
+
+    def _run_loop(self) -> None:
+        while not self._stopped.wait(self.interval):
+            start = time.monotonic()
+            try:
+                report = self._job(stop_event=self._stopped)
+            except sqlite3.Error:
+                # Already logged, compaction is retried at the next interval
+                with self._lock:
+                    self.stats["failures"] += 1
+                continue
+            with self._lock:
+                self.stats["runs"] += 1
+                self.stats["last_run"] = report
+                self.stats["last_run_seconds"] = time.monotonic() - start
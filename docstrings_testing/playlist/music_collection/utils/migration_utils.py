@@ -0,0 +1,120 @@
+import logging
+import sqlite3
+from typing import Callable, List, NamedTuple, Sequence, Union
+
+from music_collection.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class Migration(NamedTuple):
+    """
+    One schema change, recorded in PRAGMA user_version once it has been applied.
+
+    Attributes:
+        version (int): The schema version the migration brings the database to.
+        description (str): A short description used in logs.
+        apply (str | Callable): A single SQL statement, or a function that makes the change
+            with the cursor it is given. Neither may commit.
+    """
+    version: int
+    description: str
+    apply: Union[str, Callable[[sqlite3.Cursor], None]]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Returns the schema version stored in the database header, 0 for a new database.
+    """
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+def check_migrations(migrations: Sequence[Migration]) -> None:
+    """
+    Checks that the migrations are numbered 1, 2, 3, ... in order.
+
+    Raises:
+        ValueError: If a version is missing, repeated or out of order.
+    """
+    for expected, migration in enumerate(migrations, start=1):
+        if migration.version != expected:
+            raise ValueError(f"Migration '{migration.description}' has version {migration.version}, expected {expected}")
+
+def apply_migrations(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> List[int]:
+    """
+    Brings the database up to the latest schema version by applying the migrations it is missing.
+
+    Each migration runs in its own IMMEDIATE transaction together with the update of
+    PRAGMA user_version, so a failed migration leaves the database at the previous version.
+    The version is read again once the write lock is held, so processes starting together
+    apply each migration once. A database at a newer version than the migrations know is
+    left alone.
+
+    Args:
+        conn (sqlite3.Connection): A connection with no open transaction.
+        migrations (Sequence[Migration]): Every migration, ordered by version.
+
+    Returns:
+        List[int]: The versions applied by this call.
+
+    Raises:
+        ValueError: If the migrations are not numbered in order.
+        sqlite3.Error: If a migration fails. It is rolled back.
+    """
+    check_migrations(migrations)
+    latest = len(migrations)
+    version = get_schema_version(conn)
+    if version > latest:
+        logger.warning("Database schema version %d is newer than the latest known version %d", version, latest)
+        return []
+
+    applied = []
+    for migration in migrations[version:]:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            if get_schema_version(conn) >= migration.version:
+                cursor.execute("ROLLBACK;")
+                continue
+            logger.info("Applying schema migration %d: %s", migration.version, migration.description)
+            if callable(migration.apply):
+                migration.apply(cursor)
+            else:
+                cursor.execute(migration.apply)
+            # PRAGMA arguments cannot be bound, the version is always an int
+            cursor.execute(f"PRAGMA user_version = {int(migration.version)};")
+            cursor.execute("COMMIT;")
+        except sqlite3.Error as e:
+            logger.error("Schema migration %d failed: %s", migration.version, str(e))
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK;")
+            raise e
+        applied.append(migration.version)
+
+    if applied:
+        logger.info("Database schema migrated to version %d", latest)
+    else:
+        logger.info("Database schema is up to date at version %d", latest)
+    return applied
+
+def add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> bool:
+    """
+    Adds a column to a table unless the table already has it, such as a table created by
+    a schema script that already includes the column.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor of the migration.
+        table (str): The table name.
+        column (str): The column name.
+        definition (str): The column type and constraints, as in ALTER TABLE ... ADD COLUMN.
+
+    Returns:
+        bool: True if the column was added.
+    """
+    # table_xinfo, unlike table_info, also lists generated columns
+    columns = {row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table});")}
+    if column in columns:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
+    return True
@@ -1,4 +1,13 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from decimal import Decimal, InvalidOperation
 import logging
+import os
+import random
+import secrets
+import threading
+import time
+
 import requests
 
 from music_collection.utils.logger import configure_logger
@@ -7,42 +16,386 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-def get_random(num_songs: int) -> int:
+# load the random source settings from the environment with default values
+RANDOM_SOURCE = os.getenv("RANDOM_SOURCE", "system")
+RANDOM_SEED = os.getenv("RANDOM_SEED", "0")
+
+# prefetch settings for the buffered random.org source
+RANDOM_ORG_BATCH_SIZE = int(os.getenv("RANDOM_ORG_BATCH_SIZE", "1000"))
+RANDOM_ORG_LOW_WATER = int(os.getenv("RANDOM_ORG_LOW_WATER", "250"))
+RANDOM_ORG_DECIMALS = int(os.getenv("RANDOM_ORG_DECIMALS", "10"))
+RANDOM_ORG_WAIT_TIMEOUT = float(os.getenv("RANDOM_ORG_WAIT_TIMEOUT", "5"))
+
+# random.org limits for the decimal-fractions endpoint
+RANDOM_ORG_MAX_BATCH = 10000
+RANDOM_ORG_MAX_DECIMALS = 20
+
+
+class RandomSource(ABC):
     """
-    Fetches a random int between 1 and the number of songs in the catalog from random.org.
+    Base class for the sources get_random() draws from.
 
-    Returns:
-        int: The random number fetched from random.org.
+    Subclasses implement randint(), returning a uniformly distributed integer
+    between low and high inclusive.
+    """
 
-    Raises:
-        RuntimeError: If the request to random.org fails or returns an invalid response.
-        ValueError: If the response from random.org is not a valid float.
+    name = "base"
+
+    @abstractmethod
+    def randint(self, low: int, high: int) -> int:
+        """
+        Returns a random integer between low and high inclusive.
+
+        Args:
+            low (int): The smallest value that can be returned.
+            high (int): The largest value that can be returned.
+
+        Returns:
+            int: The random number.
+        """
+
+    def get_stats(self) -> dict:
+        """
+        Returns the counters of the source.
+        """
+        return {"source": self.name}
+
+    def close(self) -> None:
+        """
+        Releases any resources held by the source.
+        """
+
+
+class SystemRandomSource(RandomSource):
+    """
+    Draws random numbers from the operating system CSPRNG through the secrets module.
+    Never touches the network.
+    """
+
+    name = "system"
+
+    def randint(self, low: int, high: int) -> int:
+        return low + secrets.randbelow(high - low + 1)
+
+
+class SeededRandomSource(RandomSource):
+    """
+    Draws random numbers from a seeded Mersenne Twister, so that a sequence of draws
+    can be replayed. Not suitable when the draws must be unpredictable.
+
+    Attributes:
+        seed (int): The seed the generator was initialized with.
     """
-    url = f"https://www.random.org/integers/?num=1&min=1&max={num_songs}&col=1&base=10&format=plain&rnd=new"
 
-    try:
-        # Log the request to random.org
-        logger.info("Fetching random number from %s", url)
+    name = "seeded"
 
-        response = requests.get(url, timeout=5)
+    def __init__(self, seed: int):
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
 
-        # Check if the request was successful
-        response.raise_for_status()
+    def randint(self, low: int, high: int) -> int:
+        with self._lock:
+            return self._random.randint(low, high)
 
-        random_number_str = response.text.strip()
+
+class RandomOrgSource(RandomSource):
+    """
+    Fetches every random number from random.org with a blocking HTTPS request.
+    """
+
+    name = "random_org"
+
+    def randint(self, low: int, high: int) -> int:
+        """
+        Fetches a random int between low and high from random.org.
+
+        Returns:
+            int: The random number fetched from random.org.
+
+        Raises:
+            RuntimeError: If the request to random.org fails or returns an invalid response.
+            ValueError: If the response from random.org is not a valid int.
+        """
+        url = f"https://www.random.org/integers/?num=1&min={low}&max={high}&col=1&base=10&format=plain&rnd=new"
 
         try:
-            random_number = int(random_number_str)
+            # Log the request to random.org
+            logger.info("Fetching random number from %s", url)
+
+            response = requests.get(url, timeout=5)
+
+            # Check if the request was successful
+            response.raise_for_status()
+
+            random_number_str = response.text.strip()
+
+            try:
+                random_number = int(random_number_str)
+            except ValueError:
+                raise ValueError("Invalid response from random.org: %s" % random_number_str)
+
+            logger.info("Received random number: %.3f", random_number)
+            return random_number
+
+        except requests.exceptions.Timeout:
+            logger.error("Request to random.org timed out.")
+            raise RuntimeError("Request to random.org timed out.")
+
+        except requests.exceptions.RequestException as e:
+            logger.error("Request to random.org failed: %s", e)
+            raise RuntimeError("Request to random.org failed: %s" % e)
+
+
+class BufferedRandomOrgSource(RandomSource):
+    """
+    Serves random numbers from a ring buffer of random.org decimal fractions.
+
+    A background thread fetches fractions in batches of up to 10,000 and tops the buffer
+    up whenever it drops below the low-water mark. Each fraction is kept as its integer
+    numerator k over 10**decimals and mapped onto the requested range by rejection, so
+    no value in the range is favoured. If the buffer stays empty for longer than
+    wait_timeout the draw falls back to the system CSPRNG and is counted.
+
+    Attributes:
+        batch_size (int): The number of fractions fetched per request.
+        low_water (int): The buffer depth that triggers a refill.
+        capacity (int): The maximum number of buffered fractions.
+        decimals (int): The number of decimal places requested from random.org.
+        wait_timeout (float): The number of seconds a draw waits for a refill.
+    """
+
+    name = "random_org_buffered"
+
+    def __init__(self, batch_size: int = RANDOM_ORG_BATCH_SIZE, low_water: int = RANDOM_ORG_LOW_WATER,
+                 decimals: int = RANDOM_ORG_DECIMALS, wait_timeout: float = RANDOM_ORG_WAIT_TIMEOUT,
+                 fallback: RandomSource = None):
+        if not 1 <= batch_size <= RANDOM_ORG_MAX_BATCH:
+            raise ValueError(f"Invalid batch size: {batch_size} (must be between 1 and {RANDOM_ORG_MAX_BATCH}).")
+        if not 1 <= decimals <= RANDOM_ORG_MAX_DECIMALS:
+            raise ValueError(f"Invalid decimals: {decimals} (must be between 1 and {RANDOM_ORG_MAX_DECIMALS}).")
+        self.batch_size = batch_size
+        self.low_water = min(low_water, batch_size)
+        self.capacity = batch_size + self.low_water
+        self.decimals = decimals
+        self.wait_timeout = wait_timeout
+        self._space = 10 ** decimals
+        self._fallback = fallback or SystemRandomSource()
+        self._buffer = deque(maxlen=self.capacity)
+        self._lock = threading.Lock()
+        self._refilled = threading.Condition(self._lock)
+        self._refill_needed = threading.Event()
+        self._stopped = threading.Event()
+        self.stats = {
+            "refills": 0,
+            "refill_failures": 0,
+            "last_refill_latency": None,
+            "fallbacks": 0,
+            "rejections": 0,
+        }
+        self._refill_needed.set()
+        self._thread = threading.Thread(target=self._refill_loop, name="random-org-refill", daemon=True)
+        self._thread.start()
+
+    def randint(self, low: int, high: int) -> int:
+        """
+        Returns a random integer between low and high inclusive from the buffer.
+
+        Raises:
+            ValueError: If the range is larger than the number of distinct fractions.
+        """
+        span = high - low + 1
+        if span > self._space:
+            raise ValueError(f"Range of {span} values exceeds the {self._space} distinct fractions buffered.")
+
+        # Numerators at or above the largest multiple of span would make the low values more likely
+        limit = self._space - self._space % span
+        while True:
+            numerator = self._take()
+            if numerator < limit:
+                return low + numerator % span
+            with self._lock:
+                self.stats["rejections"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["depth"] = len(self._buffer)
+        stats["source"] = self.name
+        stats["capacity"] = self.capacity
+        return stats
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._refill_needed.set()
+        self._thread.join(timeout=self.wait_timeout)
+
+    def fetch_fractions(self, num: int) -> list:
+        """
+        Fetches a batch of decimal fractions from random.org.
+
+        Args:
+            num (int): The number of fractions to fetch.
+
+        Returns:
+            list[int]: The numerators of the fractions over 10**decimals.
+
+        Raises:
+            RuntimeError: If the request to random.org fails.
+            ValueError: If the response contains an invalid fraction.
+        """
+        url = f"https://www.random.org/decimal-fractions/?num={num}&dec={self.decimals}&col=1&format=plain&rnd=new"
+        logger.info("Fetching %d random fractions from random.org", num)
+
+        try:
+            response = requests.get(url, timeout=5)
+            response.raise_for_status()
+        except requests.exceptions.Timeout:
+            logger.error("Request to random.org timed out.")
+            raise RuntimeError("Request to random.org timed out.")
+        except requests.exceptions.RequestException as e:
+            logger.error("Request to random.org failed: %s", e)
+            raise RuntimeError("Request to random.org failed: %s" % e)
+
+        numerators = []
+        for line in response.text.split()[:num]:
+            try:
+                numerator = int(Decimal(line).scaleb(self.decimals))
+            except InvalidOperation:
+                raise ValueError("Invalid response from random.org: %s" % line)
+            if not 0 <= numerator < self._space:
+                raise ValueError("Invalid response from random.org: %s" % line)
+            numerators.append(numerator)
+        return numerators
+
+    def _take(self) -> int:
+        with self._lock:
+            if not self._buffer:
+                self._refill_needed.set()
+                self._refilled.wait_for(lambda: self._buffer or self._stopped.is_set(), timeout=self.wait_timeout)
+            if self._buffer:
+                numerator = self._buffer.popleft()
+                if len(self._buffer) < self.low_water:
+                    self._refill_needed.set()
+                return numerator
+            self.stats["fallbacks"] += 1
+
+        logger.warning("random.org buffer is empty, falling back to the %s source", self._fallback.name)
+        return self._fallback.randint(0, self._space - 1)
+
+    def _refill_loop(self) -> None:
+        while not self._stopped.is_set():
+            self._refill_needed.wait()
+            if self._stopped.is_set():
+                break
+            self._refill_needed.clear()
+
+            with self._lock:
+                depth = len(self._buffer)
+            # A draw may have asked for a refill that an earlier batch already covered
+            if depth >= self.low_water:
+                continue
+            num = min(self.batch_size, self.capacity - depth)
+
+            start = time.monotonic()
+            try:
+                numerators = self.fetch_fractions(num)
+            except (RuntimeError, ValueError) as e:
+                logger.error("Failed to refill random.org buffer: %s", e)
+                with self._lock:
+                    self.stats["refill_failures"] += 1
+                # Back off before retrying so an outage does not turn into a request storm
+                self._stopped.wait(self.wait_timeout)
+                self._refill_needed.set()
+                continue
+            latency = time.monotonic() - start
+
+            with self._lock:
+                self._buffer.extend(numerators)
+                self.stats["refills"] += 1
+                self.stats["last_refill_latency"] = latency
+                depth = len(self._buffer)
+                self._refilled.notify_all()
+            logger.info("Refilled random.org buffer with %d fractions in %.3fs (depth %d)", len(numerators), latency, depth)
+
+
+def create_random_source(name: str = None) -> RandomSource:
+    """
+    Creates the random source with the given name.
+
+    Args:
+        name (str, optional): One of 'system', 'seeded', 'random_org' or 'random_org_buffered'.
+                              Defaults to RANDOM_SOURCE.
+
+    Returns:
+        RandomSource: The new random source.
+
+    Raises:
+        ValueError: If the name or the seed is invalid.
+    """
+    name = name or RANDOM_SOURCE
+    if name == SystemRandomSource.name:
+        return SystemRandomSource()
+    if name == SeededRandomSource.name:
+        try:
+            seed = int(RANDOM_SEED)
         except ValueError:
-            raise ValueError("Invalid response from random.org: %s" % random_number_str)
+            raise ValueError(f"Invalid random seed: {RANDOM_SEED} (must be an integer).")
+        return SeededRandomSource(seed)
+    if name == RandomOrgSource.name:
+        return RandomOrgSource()
+    if name == BufferedRandomOrgSource.name:
+        return BufferedRandomOrgSource()
+    raise ValueError(f"Invalid random source: {name}. Must be 'system', 'seeded', 'random_org' or 'random_org_buffered'.")
+
+
+_random_source = None
 
-        logger.info("Received random number: %.3f", random_number)
-        return random_number
 
-    except requests.exceptions.Timeout:
-        logger.error("Request to random.org timed out.")
-        raise RuntimeError("Request to random.org timed out.")
+def get_random_source() -> RandomSource:
+    """
+    Returns the random source get_random() draws from, creating it from the
+    environment on first use.
+    """
+    global _random_source
+    if _random_source is None:
+        _random_source = create_random_source()
+        logger.info("Using random source: %s", _random_source.name)
+    return _random_source
+
+def set_random_source(source: RandomSource) -> None:
+    """
+    Replaces the random source get_random() draws from.
+
+    Args:
+        source (RandomSource): The new random source, or None to recreate it from the environment.
+    """
+    global _random_source
+    previous, _random_source = _random_source, source
+    if previous is not None and previous is not source:
+        previous.close()
+    if source is not None:
+        logger.info("Using random source: %s", source.name)
 
-    except requests.exceptions.RequestException as e:
-        logger.error("Request to random.org failed: %s", e)
-        raise RuntimeError("Request to random.org failed: %s" % e)
+def get_random_source_stats() -> dict:
+    """
+    Returns the counters of the random source, including the buffer depth, refill
+    latency and fallback count when the buffered random.org source is in use.
+    """
+    return get_random_source().get_stats()
+
+def get_random(num_songs: int) -> int:
+    """
+    Returns a random int between 1 and the number of songs in the catalog.
+
+    Args:
+        num_songs (int): The number of songs in the catalog.
+
+    Returns:
+        int: The random number drawn from the configured random source.
+
+    Raises:
+        RuntimeError: If the random.org source is in use and the request fails.
+        ValueError: If the random.org source is in use and returns an invalid response.
+    """
+    return get_random_source().randint(1, num_songs)
@@ -77,6 +77,22 @@ create_song() {
   fi
 }
 
+import_songs() {
+  echo "Importing songs from CSV, with one duplicate..."
+  response=$(printf 'artist,title,year,genre,duration\nPink Floyd,Money,1973,Rock,382\nNirvana,Lithium,1991,Grunge,257\nQueen,Bohemian Rhapsody,1975,Rock,180\n' | \
+    curl -s -X POST "$BASE_URL/import-songs" -H "Content-Type: text/csv" --data-binary @-)
+  if echo "$response" | grep -q '"created": 2' && echo "$response" | grep -q '"duplicates": 1'; then
+    echo "Songs imported successfully."
+    if [ "$ECHO_JSON" = true ]; then
+      echo "Import report JSON:"
+      echo "$response" | jq .
+    fi
+  else
+    echo "Failed to import songs."
+    exit 1
+  fi
+}
+
 delete_song_by_id() {
   song_id=$1
 
@@ -105,6 +121,22 @@ get_all_songs() {
   fi
 }
 
+get_all_songs_paged() {
+  echo "Getting the first page of songs and streaming the catalog..."
+  response=$(curl -s -X GET "$BASE_URL/get-all-songs-from-catalog?limit=2")
+  if echo "$response" | grep -q '"next_after_id"' && \
+     curl -s -X GET "$BASE_URL/get-all-songs-from-catalog?stream=ndjson" | head -n 1 | grep -q '"artist"'; then
+    echo "Songs paged and streamed successfully."
+    if [ "$ECHO_JSON" = true ]; then
+      echo "Songs page JSON:"
+      echo "$response" | jq .
+    fi
+  else
+    echo "Failed to page or stream songs."
+    exit 1
+  fi
+}
+
 get_song_by_id() {
   song_id=$1
 
@@ -452,7 +484,7 @@ swap_songs_in_playlist() {
 # Function to get the song leaderboard sorted by play count
 get_song_leaderboard() {
   echo "Getting song leaderboard sorted by play count..."
-  response=$(curl -s -X GET "$BASE_URL/song-leaderboard?sort=play_count")
+  response=$(curl -s -X GET "$BASE_URL/song-leaderboard?limit=10")
   if echo "$response" | grep -q '"status": "success"'; then
     echo "Song leaderboard retrieved successfully."
     if [ "$ECHO_JSON" = true ]; then
@@ -479,9 +511,11 @@ create_song "The Rolling Stones" "Paint It Black" 1966 "Rock" 180
 create_song "The Beatles" "Let It Be" 1970 "Rock" 180
 create_song "Queen" "Bohemian Rhapsody" 1975 "Rock" 180
 create_song "Led Zeppelin" "Stairway to Heaven" 1971 "Rock" 180
+import_songs
 
 delete_song_by_id 1
 get_all_songs
+get_all_songs_paged
 
 get_song_by_id 2
 get_song_by_compound_key "The Beatles" "Let It Be" 1970
@@ -1,4 +1,8 @@
+-- Lets compaction return freed pages to the filesystem, only takes effect on a new database
+PRAGMA auto_vacuum = INCREMENTAL;
+
 DROP TABLE IF EXISTS songs;
+DROP TABLE IF EXISTS songs_archive;
 CREATE TABLE songs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     artist TEXT NOT NULL,
@@ -8,5 +12,30 @@ CREATE TABLE songs (
     duration INTEGER NOT NULL CHECK(duration > 0),
     play_count INTEGER DEFAULT 0,
     deleted BOOLEAN DEFAULT FALSE,
+    deleted_at INTEGER,
     UNIQUE(artist, title, year)
-);
\ No newline at end of file
+);
+
+-- Serves the play count leaderboard in order without sorting, and skips deleted songs
+CREATE INDEX IF NOT EXISTS idx_songs_leaderboard ON songs (play_count DESC, id) WHERE deleted = FALSE;
+
+-- Answers lookups by artist, title and year from the index alone
+CREATE INDEX IF NOT EXISTS idx_songs_compound_key ON songs (artist, title, year, genre, duration, deleted);
+
+-- Deleted songs waiting to be moved to the archive by compact_catalog
+CREATE INDEX IF NOT EXISTS idx_songs_deleted_at ON songs (deleted_at) WHERE deleted = TRUE;
+
+CREATE TABLE songs_archive (
+    id INTEGER PRIMARY KEY,
+    artist TEXT NOT NULL,
+    title TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    genre TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    play_count INTEGER,
+    deleted_at INTEGER,
+    archived_at INTEGER NOT NULL
+);
+
+-- Matches the last of SONG_MIGRATIONS in song_model, so a new database needs no migrations
+PRAGMA user_version = 6;
@@ -0,0 +1,113 @@
+import asyncio
+import importlib
+import json
+import os
+import threading
+
+import pytest
+
+from music_collection.models.song_model import migrate_catalog, song_cache
+from music_collection.utils.sql_utils import close_pool
+
+
+CREATE_SONG_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "create_song_table.sql")
+
+
+@pytest.fixture
+def application(tmp_path, mocker):
+    """Fixture providing the ASGI application on a new migrated database, without the background compaction job."""
+    close_pool()
+    song_cache.clear()
+    mocker.patch("music_collection.utils.sql_utils.DB_PATH", str(tmp_path / "catalog.db"))
+    with open(CREATE_SONG_TABLE_PATH, "r") as fh:
+        mocker.patch("music_collection.models.song_model._create_table_script", fh.read())
+    mocker.patch("music_collection.utils.compaction_utils.COMPACTION_INTERVAL", 0)
+    mocker.patch("dotenv.load_dotenv")
+    asgi = importlib.import_module("asgi")
+    # app.py only migrates the catalog the first time it is imported
+    migrate_catalog()
+    yield asgi.application
+    close_pool()
+    song_cache.clear()
+
+async def call(application, method, path, body=None):
+    """Sends one HTTP request through the ASGI interface and returns the status and JSON body."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    status = next(message["status"] for message in sent if message["type"] == "http.response.start")
+    content = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return status, json.loads(content)
+
+
+def test_health(application):
+    """Test that a route answers through the ASGI application as it does under Flask."""
+    status, body = asyncio.run(call(application, "GET", "/api/health"))
+
+    assert status == 200
+    assert body == {"status": "healthy"}
+
+def test_create_and_get_song(application):
+    """Test that a JSON request body reaches the view and the song it creates can be read back."""
+    song = {"artist": "Artist", "title": "Song", "year": 2000, "genre": "Pop", "duration": 180}
+
+    async def scenario():
+        created = await call(application, "POST", "/api/create-song", song)
+        fetched = await call(application, "GET", "/api/get-song-from-catalog-by-id/1")
+        missing = await call(application, "GET", "/api/get-song-from-catalog-by-id/2")
+        return created, fetched, missing
+
+    created, fetched, missing = asyncio.run(scenario())
+
+    assert created == (201, {"status": "success", "song": "Song"})
+    assert fetched[0] == 200
+    assert fetched[1]["song"]["title"] == "Song"
+    assert missing[0] == 500
+    assert "not found" in missing[1]["error"]
+
+def test_blocked_view_does_not_block_other_requests(application, mocker):
+    """Test that a view blocked in its thread leaves the event loop free to serve other requests."""
+    release = threading.Event()
+
+    def blocked(song_id):
+        release.wait(10)
+        return {"id": song_id}
+    mock_get_song = mocker.patch("music_collection.models.song_model.get_song_by_id", side_effect=blocked)
+
+    async def scenario():
+        slow = asyncio.ensure_future(call(application, "GET", "/api/get-song-from-catalog-by-id/1"))
+        health = await asyncio.wait_for(call(application, "GET", "/api/health"), timeout=5)
+        slow_blocked = mock_get_song.called and not slow.done()
+        release.set()
+        return health, slow_blocked, await slow
+
+    health, slow_blocked, slow = asyncio.run(scenario())
+
+    assert health == (200, {"status": "healthy"})
+    assert slow_blocked
+    assert slow == (200, {"status": "success", "song": {"id": 1}})
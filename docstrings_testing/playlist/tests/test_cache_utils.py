@@ -0,0 +1,96 @@
+import pytest
+
+from music_collection.utils.cache_utils import ReadThroughCache
+
+
+class Row:
+    def __init__(self, id):
+        self.id = id
+
+
+@pytest.fixture
+def cache():
+    """Fixture providing a small cache that never expires during a test."""
+    return ReadThroughCache("test", max_size=3, ttl=60)
+
+def missing(key):
+    """Loader that fails like a lookup of a missing row."""
+    def load():
+        raise ValueError(f"Row {key} not found")
+    return load
+
+
+def test_get_or_load_caches_value(cache, mocker):
+    """Test that the loader only runs on the first lookup."""
+    loader = mocker.Mock(return_value=Row(1))
+
+    assert cache.get_or_load("a", loader) is cache.get_or_load("a", loader)
+
+    loader.assert_called_once()
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+def test_negative_entry(cache):
+    """Test that a ValueError from the loader is cached and raised again on a hit."""
+    with pytest.raises(ValueError, match="Row b not found"):
+        cache.get_or_load("b", missing("b"))
+    with pytest.raises(ValueError, match="Row b not found"):
+        cache.get_or_load("b", lambda: Row(2))
+
+    assert cache.get_stats()["negative_hits"] == 1
+
+def test_lru_eviction(cache):
+    """Test that the least recently used entry is evicted once the cache is full."""
+    for key in ("a", "b", "c"):
+        cache.get_or_load(key, lambda: Row(key))
+    cache.get_or_load("a", lambda: Row("unused"))
+    cache.get_or_load("d", lambda: Row("d"))
+
+    assert len(cache) == 3
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get_or_load("b", lambda: Row("reloaded")).id == "reloaded"
+
+def test_expiry(mocker):
+    """Test that entries older than the TTL are reloaded."""
+    clock = mocker.patch("music_collection.utils.cache_utils.time.monotonic", return_value=100.0)
+    cache = ReadThroughCache("test", max_size=3, ttl=10)
+    cache.get_or_load("a", lambda: Row(1))
+
+    clock.return_value = 111.0
+    assert cache.get_or_load("a", lambda: Row(2)).id == 2
+    assert cache.get_stats()["expirations"] == 1
+
+def test_invalidate_id():
+    """Test that invalidating a row ID drops every key that resolved to it."""
+    cache = ReadThroughCache("test", max_size=10, ttl=60)
+    cache.get_or_load(("id", 1), lambda: Row(1))
+    cache.get_or_load(("name", "x"), lambda: Row(1))
+    cache.get_or_load(("id", 2), lambda: Row(2))
+    with pytest.raises(ValueError):
+        cache.get_or_load(("id", 3), missing(3), entity_id=3)
+
+    cache.invalidate_id(1)
+    cache.invalidate_id(3)
+
+    assert len(cache) == 1
+    assert cache.get_stats()["invalidations"] == 3
+
+def test_invalidation_during_load_is_not_cached(cache):
+    """Test that a value loaded while an invalidation ran is returned but not cached."""
+    def load():
+        cache.invalidate("a")
+        return Row(1)
+
+    cache.get_or_load("a", load)
+
+    assert len(cache) == 0
+
+def test_disabled_cache(mocker):
+    """Test that a cache with size 0 always calls the loader."""
+    cache = ReadThroughCache("test", max_size=0)
+    loader = mocker.Mock(return_value=Row(1))
+
+    cache.get_or_load("a", loader)
+    cache.get_or_load("a", loader)
+
+    assert loader.call_count == 2
@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from music_collection.models.song_model import SONG_ARCHIVE_COLUMNS, SONG_MIGRATIONS
+from music_collection.utils.compaction_utils import (
+    CompactionScheduler,
+    archive_deleted_rows,
+    get_retention_cutoff,
+    incremental_vacuum,
+    next_batch_size,
+)
+from music_collection.utils.migration_utils import apply_migrations
+
+
+NOW = int(time.time())
+DAY = 86400
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Fixture providing a migrated songs database that uses incremental auto-vacuum."""
+    conn = sqlite3.connect(str(tmp_path / "test.db"))
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    apply_migrations(conn, SONG_MIGRATIONS)
+    yield conn
+    conn.close()
+
+def add_songs(conn, count, deleted_at=None):
+    """Adds songs, soft deleted at deleted_at if it is given."""
+    start = conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO songs (artist, title, year, genre, duration, deleted, deleted_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [("Artist", f"Song {start + index}", 2000, "Pop", 180, deleted_at is not None, deleted_at) for index in range(count)]
+    )
+    conn.commit()
+
+def archive(conn, cutoff, **kwargs):
+    return archive_deleted_rows(conn, "songs", "songs_archive", SONG_ARCHIVE_COLUMNS, cutoff, lock_budget=0.001, **kwargs)
+
+
+def test_archive_deleted_rows(conn):
+    """Test that only songs deleted before the cutoff are moved to the archive."""
+    add_songs(conn, 3)
+    add_songs(conn, 4, deleted_at=NOW - 40 * DAY)
+    add_songs(conn, 2, deleted_at=NOW - DAY)
+
+    report = archive(conn, get_retention_cutoff(30))
+
+    assert report["archived"] == 4
+    assert conn.execute("SELECT COUNT(*) FROM songs WHERE deleted = FALSE").fetchone()[0] == 3
+    assert conn.execute("SELECT COUNT(*) FROM songs WHERE deleted = TRUE").fetchone()[0] == 2
+    archived = conn.execute("SELECT id, title, deleted_at, archived_at FROM songs_archive ORDER BY id").fetchall()
+    assert [row[:3] for row in archived] == [(4 + index, f"Song {3 + index}", NOW - 40 * DAY) for index in range(4)]
+    assert all(row[3] >= NOW for row in archived)
+    assert not conn.in_transaction
+
+def test_archive_deleted_rows_in_batches(conn, mocker):
+    """Test that the rows are moved in several transactions and every batch is reported."""
+    mocker.patch("music_collection.utils.compaction_utils.COMPACTION_INITIAL_BATCH", 10)
+    mocker.patch("music_collection.utils.compaction_utils.COMPACTION_MAX_BATCH", 10)
+    add_songs(conn, 35, deleted_at=NOW - 40 * DAY)
+    purged = []
+
+    report = archive(conn, NOW, on_purged=purged.extend)
+
+    assert report["batches"] == 4
+    assert report["archived"] == 35
+    assert sorted(purged) == list(range(1, 36))
+    assert conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM songs_archive").fetchone()[0] == 35
+
+def test_archive_deleted_rows_stops(conn, mocker):
+    """Test that a set stop event stops the job before the next batch."""
+    mocker.patch("music_collection.utils.compaction_utils.COMPACTION_INITIAL_BATCH", 10)
+    mocker.patch("music_collection.utils.compaction_utils.COMPACTION_MAX_BATCH", 10)
+    add_songs(conn, 35, deleted_at=NOW - 40 * DAY)
+    stop_event = threading.Event()
+
+    report = archive(conn, NOW, on_purged=lambda ids: stop_event.set(), stop_event=stop_event)
+
+    assert report["archived"] == 10
+    assert conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 25
+
+def test_archive_deleted_rows_rolls_back(conn):
+    """Test that a failed batch leaves the songs in place."""
+    add_songs(conn, 3, deleted_at=NOW - 40 * DAY)
+    conn.execute("DROP TABLE songs_archive")
+
+    with pytest.raises(sqlite3.OperationalError):
+        archive(conn, NOW)
+
+    assert conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 3
+    assert not conn.in_transaction
+
+def test_incremental_vacuum(conn):
+    """Test that the pages freed by purged songs are returned to the filesystem."""
+    add_songs(conn, 5000, deleted_at=NOW - 40 * DAY)
+    archive(conn, NOW)
+    conn.execute("DELETE FROM songs_archive")
+    conn.commit()
+    free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    assert free_pages > 0
+    assert incremental_vacuum(conn, lock_budget=0.001) == free_pages
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+def test_incremental_vacuum_skipped(tmp_path):
+    """Test that a database without incremental auto-vacuum is left alone."""
+    conn = sqlite3.connect(str(tmp_path / "plain.db"))
+    apply_migrations(conn, SONG_MIGRATIONS)
+
+    assert incremental_vacuum(conn, lock_budget=0.001) == 0
+    conn.close()
+
+def test_next_batch_size():
+    """Test that batches grow at most twofold and shrink to fit the lock budget."""
+    assert next_batch_size(100, 0.001, 0.05, 10000) == 200
+    assert next_batch_size(100, 0.1, 0.05, 10000) == 40
+    assert next_batch_size(8000, 0.001, 0.05, 10000) == 10000
+    assert next_batch_size(1, 1.0, 0.05, 10000) == 1
+
+def test_get_retention_cutoff_invalid():
+    """Test that a negative retention is rejected."""
+    with pytest.raises(ValueError, match="Invalid retention"):
+        get_retention_cutoff(-1)
+
+def test_scheduler_runs_job():
+    """Test that the scheduler runs the job with a stop event and records its report."""
+    ran = threading.Event()
+
+    def job(stop_event):
+        ran.set()
+        return {"archived": 1}
+
+    scheduler = CompactionScheduler(job, interval=0.01)
+    assert ran.wait(1)
+    scheduler.close()
+
+    stats = scheduler.get_stats()
+    assert stats["runs"] >= 1
+    assert stats["last_run"] == {"archived": 1}
+
+def test_scheduler_counts_failures():
+    """Test that a failed run is counted and the scheduler keeps running."""
+    calls = []
+
+    def job(stop_event):
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return {}
+
+    scheduler = CompactionScheduler(job, interval=0.01)
+    deadline = time.monotonic() + 1
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    scheduler.close()
+
+    assert scheduler.get_stats()["failures"] == 1
+    assert scheduler.get_stats()["runs"] >= 1
@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from music_collection.utils.import_utils import get_import_format, iter_records
+
+
+def test_iter_records_json_lines():
+    """Test that each non-blank line is read as one record."""
+    stream = io.BytesIO(b'{"title": "Song 1"}\n\n{"title": "Song 2"}\n')
+    assert list(iter_records(stream, "jsonl")) == [{"title": "Song 1"}, {"title": "Song 2"}]
+
+def test_iter_records_json_lines_malformed():
+    """Test that malformed lines are yielded as errors without stopping the stream."""
+    stream = io.StringIO('{"title": "Song 1"\n[1, 2]\n{"title": "Song 3"}\n')
+    records = list(iter_records(stream, "jsonl"))
+
+    assert isinstance(records[0], ValueError) and "line 1" in str(records[0])
+    assert str(records[1]) == "Line 2 is not a JSON object"
+    assert records[2] == {"title": "Song 3"}
+
+def test_iter_records_csv():
+    """Test that CSV rows are read against the header, with rows of the wrong width as errors."""
+    stream = io.BytesIO(b"\xef\xbb\xbftitle,year\nSong 1,2001\nSong 2\nSong 3,2003\n")
+    records = list(iter_records(stream, "csv"))
+
+    assert records[0] == {"title": "Song 1", "year": "2001"}
+    assert isinstance(records[1], ValueError)
+    assert records[2] == {"title": "Song 3", "year": "2003"}
+
+def test_iter_records_read_only_stream():
+    """Test that a stream with nothing but read(), like gunicorn's request body, is decoded."""
+    class Body:
+        def __init__(self, data):
+            self._stream = io.BytesIO(data)
+
+        def read(self, size=-1):
+            return self._stream.read(size)
+
+    records = list(iter_records(Body(b"title,year\nSong 1,2001\n"), "csv"))
+
+    assert records == [{"title": "Song 1", "year": "2001"}]
+
+@pytest.mark.parametrize("import_format, content_type, expected", [
+    ("csv", None, "csv"),
+    ("jsonl", "text/csv", "jsonl"),
+    (None, "application/x-ndjson", "jsonl"),
+    (None, "text/csv; charset=utf-8", "csv"),
+])
+def test_get_import_format(import_format, content_type, expected):
+    """Test that an explicit format wins over the one implied by the content type."""
+    assert get_import_format(import_format, content_type) == expected
+
+def test_get_import_format_invalid():
+    """Test that an unknown format is rejected."""
+    with pytest.raises(ValueError, match="Invalid import format: xml"):
+        get_import_format("xml")
+    with pytest.raises(ValueError, match="Invalid import format: None"):
+        get_import_format(None, "application/json")
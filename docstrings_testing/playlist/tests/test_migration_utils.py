@@ -0,0 +1,139 @@
+import os
+import sqlite3
+
+import pytest
+
+from music_collection.models.song_model import SONG_MIGRATIONS
+from music_collection.utils.migration_utils import Migration, add_column_if_missing, apply_migrations, get_schema_version
+
+
+CREATE_SONG_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "create_song_table.sql")
+
+# The songs table as it was created before schema versions were recorded
+UNVERSIONED_SONGS_TABLE = """
+    CREATE TABLE songs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        artist TEXT NOT NULL,
+        title TEXT NOT NULL,
+        year INTEGER NOT NULL CHECK(year >= 1900),
+        genre TEXT NOT NULL,
+        duration INTEGER NOT NULL CHECK(duration > 0),
+        play_count INTEGER DEFAULT 0,
+        deleted BOOLEAN DEFAULT FALSE,
+        UNIQUE(artist, title, year)
+    )
+"""
+
+SONG_INDEXES = {"idx_songs_leaderboard", "idx_songs_compound_key", "idx_songs_deleted_at"}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Fixture providing a connection to a new database file."""
+    conn = sqlite3.connect(str(tmp_path / "test.db"))
+    yield conn
+    conn.close()
+
+def get_indexes(conn):
+    """Returns the names of the indexes created by migrations or scripts, not by constraints."""
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+
+def get_columns(conn):
+    """Returns the column names of every table, in any order."""
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return {table: {row[1] for row in conn.execute(f"PRAGMA table_info({table})")} for table in tables}
+
+
+def test_apply_migrations_to_new_database(conn):
+    """Test that a new database gets the songs table, its indexes and the latest version."""
+    assert apply_migrations(conn, SONG_MIGRATIONS) == list(range(1, len(SONG_MIGRATIONS) + 1))
+
+    assert get_schema_version(conn) == len(SONG_MIGRATIONS)
+    assert get_indexes(conn) == SONG_INDEXES
+    assert not conn.in_transaction
+
+def test_apply_migrations_is_idempotent(conn):
+    """Test that an up to date database is left as it is."""
+    apply_migrations(conn, SONG_MIGRATIONS)
+
+    assert apply_migrations(conn, SONG_MIGRATIONS) == []
+    assert get_schema_version(conn) == len(SONG_MIGRATIONS)
+
+def test_apply_migrations_keeps_existing_songs(conn):
+    """Test that a database created before versioning is upgraded without losing songs."""
+    conn.execute(UNVERSIONED_SONGS_TABLE)
+    conn.execute("INSERT INTO songs (artist, title, year, genre, duration, play_count) VALUES ('Artist', 'Song', 2000, 'Pop', 180, 4)")
+    conn.execute("INSERT INTO songs (artist, title, year, genre, duration, deleted) VALUES ('Artist', 'Gone', 2000, 'Pop', 180, TRUE)")
+    conn.commit()
+
+    assert apply_migrations(conn, SONG_MIGRATIONS) == list(range(1, len(SONG_MIGRATIONS) + 1))
+
+    rows = conn.execute("SELECT title, play_count, deleted_at IS NOT NULL FROM songs ORDER BY id").fetchall()
+    assert rows == [("Song", 4, 0), ("Gone", 0, 1)], "Songs deleted before the upgrade should get a deletion time"
+    assert get_indexes(conn) == SONG_INDEXES
+
+def test_create_script_matches_migrations(conn, tmp_path):
+    """Test that the create script and the migrations produce the same schema and version."""
+    with open(CREATE_SONG_TABLE_PATH, "r") as fh:
+        conn.executescript(fh.read())
+    migrated = sqlite3.connect(str(tmp_path / "migrated.db"))
+    apply_migrations(migrated, SONG_MIGRATIONS)
+
+    assert get_schema_version(conn) == get_schema_version(migrated)
+    assert get_indexes(conn) == get_indexes(migrated)
+    assert get_columns(conn) == get_columns(migrated)
+    assert apply_migrations(conn, SONG_MIGRATIONS) == []
+    migrated.close()
+
+def test_compound_key_lookup_is_covered(conn):
+    """Test that the compound key lookup is answered from the covering index."""
+    apply_migrations(conn, SONG_MIGRATIONS)
+
+    plan = conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT id, artist, title, year, genre, duration, deleted
+        FROM songs INDEXED BY idx_songs_compound_key
+        WHERE artist = ? AND title = ? AND year = ?
+    """, ("Artist", "Song", 2000)).fetchall()
+
+    assert "COVERING INDEX idx_songs_compound_key" in plan[0][-1]
+
+def test_failed_migration_is_rolled_back(conn):
+    """Test that a failing migration leaves the database at the previous version."""
+    def fail(cursor):
+        cursor.execute("CREATE TABLE partial (id INTEGER)")
+        cursor.execute("SELECT * FROM missing_table")
+
+    migrations = SONG_MIGRATIONS[:1] + (Migration(2, "fail halfway", fail),)
+
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        apply_migrations(conn, migrations)
+
+    assert get_schema_version(conn) == 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'partial'").fetchone() is None
+    assert not conn.in_transaction
+
+def test_newer_database_is_left_alone(conn):
+    """Test that a database migrated by newer code is not touched."""
+    conn.execute("PRAGMA user_version = 99")
+
+    assert apply_migrations(conn, SONG_MIGRATIONS) == []
+    assert get_schema_version(conn) == 99
+
+def test_migrations_out_of_order(conn):
+    """Test that migrations must be numbered from 1 without gaps."""
+    migrations = (SONG_MIGRATIONS[0], SONG_MIGRATIONS[2])
+
+    with pytest.raises(ValueError, match="expected 2"):
+        apply_migrations(conn, migrations)
+
+    assert get_schema_version(conn) == 0
+
+def test_add_column_if_missing(conn):
+    """Test that a column, including a generated one, is only added once."""
+    conn.execute("CREATE TABLE stats (wins INTEGER, battles INTEGER)")
+    definition = "REAL GENERATED ALWAYS AS (wins * 1.0 / battles) VIRTUAL"
+    cursor = conn.cursor()
+
+    assert add_column_if_missing(cursor, "stats", "win_pct", definition)
+    assert not add_column_if_missing(cursor, "stats", "win_pct", definition)
@@ -4,16 +4,21 @@ from music_collection.models.playlist_model import PlaylistModel
 from music_collection.models.song_model import Song
 
 
-@pytest.fixture()
-def playlist_model():
-    """Fixture to provide a new instance of PlaylistModel for each test."""
-    return PlaylistModel()
+@pytest.fixture(params=["list", "tree"])
+def playlist_model(request):
+    """Fixture to provide a new instance of PlaylistModel for each test, with each storage engine."""
+    return PlaylistModel(storage=request.param)
 
 @pytest.fixture
 def mock_update_play_count(mocker):
     """Mock the update_play_count function for testing purposes."""
     return mocker.patch("music_collection.models.playlist_model.update_play_count")
 
+@pytest.fixture
+def mock_update_play_counts(mocker):
+    """Mock the bulk update_play_counts function for testing purposes."""
+    return mocker.patch("music_collection.models.playlist_model.update_play_counts")
+
 """Fixtures providing sample songs for the tests."""
 @pytest.fixture
 def sample_song1():
@@ -283,29 +288,46 @@ def test_go_to_track_number(playlist_model, sample_playlist):
     playlist_model.go_to_track_number(2)
     assert playlist_model.current_track_number == 2, "Expected to be at track 2 after moving song"
 
-def test_play_entire_playlist(playlist_model, sample_playlist, mock_update_play_count):
+def test_play_entire_playlist(playlist_model, sample_playlist, mock_update_play_counts):
     """Test playing the entire playlist."""
     playlist_model.playlist.extend(sample_playlist)
 
     playlist_model.play_entire_playlist()
 
-    # Check that all play counts were updated
-    mock_update_play_count.assert_any_call(1)
-    mock_update_play_count.assert_any_call(2)
-    assert mock_update_play_count.call_count == len(playlist_model.playlist)
+    # Check that all play counts were updated in one bulk call
+    mock_update_play_counts.assert_called_once_with({1: 1, 2: 1})
 
     # Check that the current track number was updated back to the first song
     assert playlist_model.current_track_number == 1, "Expected to loop back to the beginning of the playlist"
 
-def test_play_rest_of_playlist(playlist_model, sample_playlist, mock_update_play_count):
+def test_play_rest_of_playlist(playlist_model, sample_playlist, mock_update_play_counts):
     """Test playing from the current position to the end of the playlist."""
     playlist_model.playlist.extend(sample_playlist)
     playlist_model.current_track_number = 2
 
     playlist_model.play_rest_of_playlist()
 
-    # Check that play counts were updated for the remaining songs
-    mock_update_play_count.assert_any_call(2)
-    assert mock_update_play_count.call_count == 1
+    # Check that play counts were updated for the remaining songs only
+    mock_update_play_counts.assert_called_once_with({2: 1})
+
+    assert playlist_model.current_track_number == 1, "Expected to loop back to the beginning of the playlist"
+
+def test_play_tracks_wraps_around(playlist_model, sample_playlist, mock_update_play_counts):
+    """Test that playing past the end of the playlist wraps around and sums repeated plays."""
+    playlist_model.playlist.extend(sample_playlist)
+    playlist_model.current_track_number = 2
+
+    playlist_model.play_tracks(4)
+
+    mock_update_play_counts.assert_called_once_with({2: 2, 1: 2})
+    assert playlist_model.current_track_number == 2
+
+def test_play_tracks_failed_update(playlist_model, sample_playlist, mock_update_play_counts):
+    """Test that the current track number does not advance if the play counts cannot be written."""
+    playlist_model.playlist.extend(sample_playlist)
+    mock_update_play_counts.side_effect = ValueError("Song with ID 2 has been deleted")
+
+    with pytest.raises(ValueError, match="Song with ID 2 has been deleted"):
+        playlist_model.play_entire_playlist()
 
-    assert playlist_model.current_track_number == 1, "Expected to loop back to the beginning of the playlist"
\ No newline at end of file
+    assert playlist_model.current_track_number == 1
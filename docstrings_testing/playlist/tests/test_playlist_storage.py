@@ -0,0 +1,133 @@
+import random
+
+import pytest
+
+from music_collection.models.playlist_storage import IndexedSongList, TreeSongList
+from music_collection.models.song_model import Song
+
+
+@pytest.fixture
+def songs():
+    """Fixture providing five sample songs with IDs 1-5."""
+    return [Song(i, f'Artist {i}', f'Song {i}', 2000 + i, 'Pop', 100 + i) for i in range(1, 6)]
+
+@pytest.fixture(params=[IndexedSongList, TreeSongList])
+def storage(request):
+    """Fixture providing each playlist storage engine."""
+    return request.param
+
+@pytest.fixture
+def song_list(storage, songs):
+    """Fixture providing a list of the sample songs in each storage engine."""
+    return storage(songs)
+
+
+def assert_index_consistent(song_list):
+    """Check that every song's indexed position matches its actual position."""
+    for index, song in enumerate(song_list):
+        assert song_list.position_of(song.id) == index, f"Song {song.id} indexed at {song_list.position_of(song.id)}, found at {index}"
+    assert song_list.total_duration == sum(song.duration for song in song_list)
+
+
+def test_append_and_lookup(song_list, songs):
+    """Test that appended songs can be looked up by ID."""
+    assert len(song_list) == 5
+    assert song_list.has_song_id(3)
+    assert not song_list.has_song_id(99)
+    assert song_list[song_list.position_of(3)] is songs[2]
+    assert_index_consistent(song_list)
+
+def test_append_duplicate(song_list, songs):
+    """Test that a song with an ID already in the list is rejected."""
+    with pytest.raises(ValueError, match="Song with ID 1 already exists in the playlist"):
+        song_list.append(songs[0])
+
+def test_insert(song_list):
+    """Test inserting a song shifts the indexed positions of the songs after it."""
+    song_list.insert(1, Song(6, 'Artist 6', 'Song 6', 2006, 'Rock', 200))
+    assert [song.id for song in song_list] == [1, 6, 2, 3, 4, 5]
+    assert_index_consistent(song_list)
+
+def test_pop_and_remove(song_list):
+    """Test removing songs by position and by ID."""
+    assert song_list.pop(0).id == 1
+    assert song_list.remove_song_id(4).id == 4
+    del song_list[-1]
+    assert [song.id for song in song_list] == [2, 3]
+    assert not song_list.has_song_id(1)
+    assert_index_consistent(song_list)
+
+@pytest.mark.parametrize("song_id, index, expected", [
+    (5, 0, [5, 1, 2, 3, 4]),
+    (1, 4, [2, 3, 4, 5, 1]),
+    (2, 3, [1, 3, 4, 2, 5]),
+    (4, 1, [1, 4, 2, 3, 5]),
+    (3, 2, [1, 2, 3, 4, 5]),
+])
+def test_move(song_list, song_id, index, expected):
+    """Test moving a song keeps the index consistent in both directions."""
+    song_list.move(song_id, index)
+    assert [song.id for song in song_list] == expected
+    assert_index_consistent(song_list)
+
+def test_swap(song_list):
+    """Test swapping two songs updates both indexed positions."""
+    song_list.swap(1, 5)
+    assert [song.id for song in song_list] == [5, 2, 3, 4, 1]
+    assert_index_consistent(song_list)
+
+def test_clear(song_list):
+    """Test clearing the list empties the index."""
+    song_list.clear()
+    assert len(song_list) == 0
+    assert not song_list.has_song_id(1)
+    assert song_list.total_duration == 0
+
+def test_random_operations_match_list(storage):
+    """Test a long random sequence of operations against a plain list."""
+    rng = random.Random(42)
+    song_list = storage()
+    expected = []
+    next_id = 1
+
+    for _ in range(2000):
+        operation = rng.choice(["append", "insert", "pop", "move", "swap"])
+        if operation in ("append", "insert") or len(expected) < 2:
+            song = Song(next_id, 'Artist', f'Song {next_id}', 2000, 'Pop', rng.randint(1, 300))
+            next_id += 1
+            index = rng.randint(0, len(expected))
+            song_list.insert(index, song)
+            expected.insert(index, song)
+        elif operation == "pop":
+            index = rng.randrange(len(expected))
+            assert song_list.pop(index) is expected.pop(index)
+        elif operation == "move":
+            song = rng.choice(expected)
+            index = rng.randrange(len(expected))
+            song_list.move(song.id, index)
+            expected.remove(song)
+            expected.insert(index, song)
+        else:
+            song1, song2 = rng.sample(expected, 2)
+            song_list.swap(song1.id, song2.id)
+            index1, index2 = expected.index(song1), expected.index(song2)
+            expected[index1], expected[index2] = expected[index2], expected[index1]
+
+        assert list(song_list) == expected
+        if expected:
+            assert song_list[-1] is expected[-1]
+
+    assert_index_consistent(song_list)
+
+def test_index_out_of_range(song_list):
+    """Test that positions past either end raise IndexError."""
+    with pytest.raises(IndexError):
+        song_list[5]
+    with pytest.raises(IndexError):
+        song_list.pop(-6)
+
+def test_invalid_storage():
+    """Test that PlaylistModel rejects an unknown storage engine."""
+    from music_collection.models.playlist_model import PlaylistModel
+    with pytest.raises(ValueError, match="Invalid playlist storage: array"):
+        PlaylistModel(storage="array")
@@ -1,14 +1,30 @@
 import pytest
 import requests
 
-from music_collection.utils.random_utils import get_random
+from music_collection.utils.random_utils import (
+    BufferedRandomOrgSource,
+    RandomOrgSource,
+    RandomSource,
+    SeededRandomSource,
+    SystemRandomSource,
+    create_random_source,
+    get_random,
+    set_random_source
+)
 
 
 RANDOM_NUMBER = 42
 NUM_SONGS = 100
 
 @pytest.fixture
-def mock_random_org(mocker):
+def random_org_source():
+    """Fixture to route get_random through random.org for the duration of a test."""
+    set_random_source(RandomOrgSource())
+    yield
+    set_random_source(None)
+
+@pytest.fixture
+def mock_random_org(mocker, random_org_source):
     # Patch the requests.get call
     # requests.get returns an object, which we have replaced with a mock object
     mock_response = mocker.Mock()
@@ -28,14 +44,14 @@ def test_get_random(mock_random_org):
     # Ensure that the correct URL was called
     requests.get.assert_called_once_with("https://www.random.org/integers/?num=1&min=1&max=100&col=1&base=10&format=plain&rnd=new", timeout=5)
 
-def test_get_random_request_failure(mocker):
+def test_get_random_request_failure(mocker, random_org_source):
     """Simulate  a request failure."""
     mocker.patch("requests.get", side_effect=requests.exceptions.RequestException("Connection error"))
 
     with pytest.raises(RuntimeError, match="Request to random.org failed: Connection error"):
         get_random(NUM_SONGS)
 
-def test_get_random_timeout(mocker):
+def test_get_random_timeout(mocker, random_org_source):
     """Simulate  a timeout."""
     mocker.patch("requests.get", side_effect=requests.exceptions.Timeout)
 
@@ -47,4 +63,82 @@ def test_get_random_invalid_response(mock_random_org):
     mock_random_org.text = "invalid_response"
 
     with pytest.raises(ValueError, match="Invalid response from random.org: invalid_response"):
-        get_random(NUM_SONGS)
\ No newline at end of file
+        get_random(NUM_SONGS)
+
+def test_get_random_default_source_skips_network(mocker):
+    """Test that the default random source never calls random.org."""
+    mock_get = mocker.patch("requests.get")
+    set_random_source(None)
+
+    for _ in range(100):
+        result = get_random(NUM_SONGS)
+        assert 1 <= result <= NUM_SONGS, f"Random number {result} out of range"
+
+    mock_get.assert_not_called()
+
+def test_system_random_source_range():
+    """Test that the system source covers the whole range and nothing outside it."""
+    source = SystemRandomSource()
+    results = {source.randint(1, 3) for _ in range(200)}
+    assert results == {1, 2, 3}
+
+def test_seeded_random_source_replays():
+    """Test that two seeded sources with the same seed produce the same draws."""
+    first = SeededRandomSource(1234)
+    second = SeededRandomSource(1234)
+    assert [first.randint(1, NUM_SONGS) for _ in range(20)] == [second.randint(1, NUM_SONGS) for _ in range(20)]
+
+def test_random_source_requires_randint():
+    """Test that a source without randint() cannot be created."""
+    class IncompleteSource(RandomSource):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="abstract method"):
+        IncompleteSource()
+
+def test_create_random_source_invalid():
+    """Test that an unknown random source name is rejected."""
+    with pytest.raises(ValueError, match="Invalid random source: dice"):
+        create_random_source("dice")
+
+def test_buffered_source_fetches_in_bulk(mocker):
+    """Test that the buffered source serves many draws from one random.org request."""
+    mock_response = mocker.Mock()
+    mock_response.text = "\n".join(f"0.{i:02d}" for i in range(100))
+    mock_get = mocker.patch("requests.get", return_value=mock_response)
+
+    source = BufferedRandomOrgSource(batch_size=100, low_water=10, decimals=2, wait_timeout=1)
+    results = [source.randint(1, NUM_SONGS) for _ in range(50)]
+    source.close()
+
+    assert results == list(range(1, 51)), "Expected the buffered fractions to be served in order"
+    mock_get.assert_called_once_with("https://www.random.org/decimal-fractions/?num=100&dec=2&col=1&format=plain&rnd=new", timeout=5)
+    assert source.get_stats()["depth"] == 50
+    assert source.get_stats()["last_refill_latency"] is not None
+
+def test_buffered_source_rejects_biased_fractions(mocker):
+    """Test that fractions past the largest multiple of the range are rejected rather than wrapped."""
+    mock_response = mocker.Mock()
+    # With 10 distinct fractions and a range of 3, 0.9 would make 1 more likely than 2 or 3
+    mock_response.text = "0.9\n0.4"
+    mocker.patch("requests.get", return_value=mock_response)
+
+    source = BufferedRandomOrgSource(batch_size=2, low_water=1, decimals=1, wait_timeout=1)
+    result = source.randint(1, 3)
+    source.close()
+
+    assert result == 2, f"Expected 0.4 to map to 2, got {result}"
+    assert source.get_stats()["rejections"] == 1
+
+def test_buffered_source_falls_back_when_empty(mocker):
+    """Test that draws fall back to the local source and are counted when random.org is down."""
+    mocker.patch("requests.get", side_effect=requests.exceptions.RequestException("Connection error"))
+
+    source = BufferedRandomOrgSource(batch_size=10, low_water=5, decimals=2, wait_timeout=0.1)
+    result = source.randint(1, NUM_SONGS)
+    source.close()
+
+    assert 1 <= result <= NUM_SONGS
+    stats = source.get_stats()
+    assert stats["fallbacks"] >= 1
+    assert stats["refill_failures"] >= 1
@@ -1,20 +1,39 @@
 from contextlib import contextmanager
+import os
 import re
 import sqlite3
+import threading
+import time
 
 import pytest
 
 from music_collection.models.song_model import (
+    RANDOM_SONG_MAX_PROBES,
+    SONG_MIGRATIONS,
+    PlayCountBuffer,
     Song,
+    SongColumns,
     create_song,
+    create_songs,
     clear_catalog,
     delete_song,
     get_song_by_id,
     get_song_by_compound_key,
     get_all_songs,
+    get_all_songs_columnar,
     get_random_song,
-    update_play_count
+    get_song_leaderboard,
+    iter_song_pages,
+    migrate_catalog,
+    set_play_count_buffer,
+    song_cache,
+    update_play_count,
+    update_play_counts
 )
+from music_collection.utils.sql_utils import close_pool
+
+
+CREATE_SONG_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "create_song_table.sql")
 
 ######################################################
 #
@@ -25,6 +44,13 @@ from music_collection.models.song_model import (
 def normalize_whitespace(sql_query: str) -> str:
     return re.sub(r'\s+', ' ', sql_query).strip()
 
+@pytest.fixture(autouse=True)
+def clear_song_cache():
+    """Start every test with an empty song cache so lookups reach the mocked database."""
+    song_cache.clear()
+    yield
+    song_cache.clear()
+
 # Mocking the database connection for tests
 @pytest.fixture
 def mock_cursor(mocker):
@@ -46,6 +72,26 @@ def mock_cursor(mocker):
 
     return mock_cursor  # Return the mock cursor so we can set expectations per test
 
+@pytest.fixture
+def catalog_db(tmp_path, mocker):
+    """Fixture pointing the connection pool at a new migrated database, for tests that need real SQL."""
+    path = str(tmp_path / "catalog.db")
+    close_pool()
+    mocker.patch("music_collection.utils.sql_utils.DB_PATH", path)
+    with open(CREATE_SONG_TABLE_PATH, "r") as fh:
+        mocker.patch("music_collection.models.song_model._create_table_script", fh.read())
+    migrate_catalog()
+    yield path
+    close_pool()
+
+@pytest.fixture
+def play_count_buffer(mock_cursor):
+    """Fixture enabling write-behind play counts with flushes only on demand."""
+    buffer = PlayCountBuffer(flush_interval=3600, flush_threshold=1000000)
+    set_play_count_buffer(buffer)
+    yield buffer
+    set_play_count_buffer(None)
+
 ######################################################
 #
 #    Add and delete
@@ -107,6 +153,79 @@ def test_create_song_invalid_year():
     with pytest.raises(ValueError, match="Invalid year provided: invalid \(must be an integer greater than or equal to 1900\)."):
         create_song(artist="Artist Name", title="Song Title", year="invalid", genre="Pop", duration=180)
 
+def song_row(title, year=2022, duration=180):
+    return {"artist": "Artist Name", "title": title, "year": year, "genre": "Pop", "duration": duration}
+
+def test_create_songs(mock_cursor):
+    """Test bulk creating songs skips and reports invalid rows and repeated keys."""
+    rows = [
+        song_row("Song 1"),
+        song_row("Song 2", year="1999", duration="200"),
+        song_row("Song 3", year=1900),
+        song_row("Song 1"),
+        ValueError("Invalid JSON on line 5"),
+        song_row("Song 4", duration=True),
+    ]
+
+    report = create_songs(rows)
+
+    assert report["created"] == 2
+    assert report["duplicates"] == 1
+    assert report["invalid"] == 3
+    assert [(error["row"], error["reason"]) for error in report["errors"]] == [
+        (3, "invalid"), (4, "duplicate"), (5, "invalid"), (6, "invalid")
+    ]
+    assert report["errors"][0]["error"] == "Year must be greater than 1900, got 1900"
+
+    expected_query = "INSERT INTO songs (artist, title, year, genre, duration) VALUES (?, ?, ?, ?, ?)"
+    assert normalize_whitespace(mock_cursor.executemany.call_args[0][0]) == expected_query
+    assert mock_cursor.executemany.call_args[0][1] == [
+        ("Artist Name", "Song 1", 2022, "Pop", 180),
+        ("Artist Name", "Song 2", 1999, "Pop", 200),
+    ]
+
+def test_create_songs_existing_duplicate(mock_cursor):
+    """Test that songs already in the catalog are reported as duplicates and not inserted."""
+    mock_cursor.fetchall.return_value = [("Artist Name", "Song 1", 2022)]
+
+    report = create_songs([song_row("Song 1"), song_row("Song 2")])
+
+    assert report["created"] == 1
+    assert report["errors"] == [{
+        "row": 1,
+        "reason": "duplicate",
+        "error": "Song with artist 'Artist Name', title 'Song 1', and year 2022 already exists."
+    }]
+    assert mock_cursor.executemany.call_args[0][1] == [("Artist Name", "Song 2", 2022, "Pop", 180)]
+
+def test_create_songs_chunks(mock_cursor):
+    """Test that each chunk of songs is inserted and committed in its own transaction."""
+    report = create_songs((song_row(f"Song {i}") for i in range(5)), chunk_size=2)
+
+    assert report["created"] == 5
+    assert [len(call[0][1]) for call in mock_cursor.executemany.call_args_list] == [2, 2, 1]
+    assert mock_cursor.execute.call_count == 3  # one duplicate lookup per chunk
+
+def test_create_songs_concurrent_duplicate(mock_cursor):
+    """Test that a song created between the duplicate lookup and the insert is reported row by row."""
+    mock_cursor.executemany.side_effect = sqlite3.IntegrityError("UNIQUE constraint failed")
+
+    def execute(query, arguments=()):
+        if query.startswith("INSERT") and arguments[1] == "Song 1":
+            raise sqlite3.IntegrityError("UNIQUE constraint failed")
+    mock_cursor.execute.side_effect = execute
+
+    report = create_songs([song_row("Song 1"), song_row("Song 2")])
+
+    assert report["created"] == 1
+    assert report["duplicates"] == 1
+    assert report["errors"][0]["row"] == 1
+
+def test_create_songs_invalid_chunk_size(mock_cursor):
+    """Test that a chunk size below 1 is rejected before any row is read."""
+    with pytest.raises(ValueError, match="Invalid import chunk size: 0"):
+        create_songs([song_row("Song 1")], chunk_size=0)
+
 def test_delete_song(mock_cursor):
     """Test soft deleting a song from the catalog by song ID."""
 
@@ -118,7 +237,7 @@ def test_delete_song(mock_cursor):
 
     # Normalize the SQL for both queries (SELECT and UPDATE)
     expected_select_sql = normalize_whitespace("SELECT deleted FROM songs WHERE id = ?")
-    expected_update_sql = normalize_whitespace("UPDATE songs SET deleted = TRUE WHERE id = ?")
+    expected_update_sql = normalize_whitespace("UPDATE songs SET deleted = TRUE, deleted_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = ?")
 
     # Access both calls to `execute()` using `call_args_list`
     actual_select_sql = normalize_whitespace(mock_cursor.execute.call_args_list[0][0][0])
@@ -160,19 +279,57 @@ def test_delete_song_already_deleted(mock_cursor):
 
 def test_clear_catalog(mock_cursor, mocker):
     """Test clearing the entire song catalog (removes all songs)."""
-
-    # Mock the file reading
-    mocker.patch.dict('os.environ', {'SQL_CREATE_TABLE_PATH': 'sql/create_song_table.sql'})
     mock_open = mocker.patch('builtins.open', mocker.mock_open(read_data="The body of the create statement"))
 
     # Call the clear_database function
     clear_catalog()
 
-    # Ensure the file was opened using the environment variable's path
-    mock_open.assert_called_once_with('sql/create_song_table.sql', 'r')
+    # The songs are deleted in place, without reading or running the schema script
+    mock_open.assert_not_called()
+    mock_cursor.executescript.assert_not_called()
+
+    executed = [normalize_whitespace(call[0][0]) for call in mock_cursor.execute.call_args_list]
+    assert executed == [
+        "DELETE FROM songs;",
+        "DELETE FROM songs_archive;",
+        "DELETE FROM sqlite_sequence WHERE name = 'songs';",
+    ], "The songs and their ID sequence should be deleted"
+
+def test_clear_catalog_swap(catalog_db):
+    """Test that a swap leaves an empty catalog with the current schema and fresh IDs."""
+    create_song("Artist", "Song", 2000, "Pop", 180)
+    create_song("Artist", "Other", 2000, "Pop", 180)
+
+    clear_catalog(swap=True)
+
+    conn = sqlite3.connect(catalog_db)
+    assert conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 0
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(SONG_MIGRATIONS)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    create_song("Artist", "Song", 2000, "Pop", 180)
+    assert get_song_by_compound_key("Artist", "Song", 2000).id == 1
 
-    # Verify that the correct SQL script was executed
-    mock_cursor.executescript.assert_called_once()
+def test_clear_catalog_swap_keeps_reader_snapshot(catalog_db):
+    """Test that a query already running keeps seeing the songs until it ends."""
+    create_song("Artist", "Song", 2000, "Pop", 180)
+    reader = sqlite3.connect(catalog_db, isolation_level=None)
+    reader.execute("BEGIN")
+    assert reader.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 1
+
+    clear_catalog(swap=True)
+
+    assert reader.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 1
+    reader.execute("COMMIT")
+    assert reader.execute("SELECT COUNT(*) FROM songs").fetchone()[0] == 0
+    reader.close()
+
+def test_clear_catalog_swap_without_script(mock_cursor, mocker):
+    """Test that a swap fails if the schema script could not be read at import."""
+    mocker.patch("music_collection.models.song_model._create_table_script", None)
+
+    with pytest.raises(ValueError, match="could not be read"):
+        clear_catalog(swap=True)
 
 
 ######################################################
@@ -230,7 +387,7 @@ def test_get_song_by_compound_key(mock_cursor):
     assert result == expected_result, f"Expected {expected_result}, got {result}"
 
     # Ensure the SQL query was executed correctly
-    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration, deleted FROM songs WHERE artist = ? AND title = ? AND year = ?")
+    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration, deleted FROM songs INDEXED BY idx_songs_compound_key WHERE artist = ? AND title = ? AND year = ?")
     actual_query = normalize_whitespace(mock_cursor.execute.call_args[0][0])
 
     # Assert that the SQL query was correct
@@ -330,14 +487,169 @@ def test_get_all_songs_ordered_by_play_count(mock_cursor):
 
     assert actual_query == expected_query, "The SQL query did not match the expected structure."
 
-def test_get_random_song(mock_cursor, mocker):
-    """Test retrieving a random song from the catalog."""
-
-    # Simulate that there are multiple songs in the database
+def test_get_all_songs_page(mock_cursor):
+    """Test retrieving a page of the catalog after a song ID."""
     mock_cursor.fetchall.return_value = [
+        (4, "Artist D", "Song D", 2020, "Rock", 210, 0),
+        (6, "Artist F", "Song F", 2021, "Pop", 180, 3),
+    ]
+
+    songs = get_all_songs(after_id=3, limit=2)
+
+    assert [song["id"] for song in songs] == [4, 6]
+    expected_query = normalize_whitespace("""
+        SELECT id, artist, title, year, genre, duration, play_count
+        FROM songs
+        WHERE deleted = FALSE AND id > ?
+        ORDER BY id LIMIT ?
+    """)
+    assert normalize_whitespace(mock_cursor.execute.call_args[0][0]) == expected_query
+    assert mock_cursor.execute.call_args[0][1] == [3, 2]
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"limit": 0}, "Invalid catalog limit: 0"),
+    ({"limit": 1001}, "Invalid catalog limit: 1001"),
+    ({"after_id": 3, "sort_by_play_count": True}, "cannot be combined with sort_by_play_count"),
+])
+def test_get_all_songs_invalid_page(mock_cursor, kwargs, message):
+    """Test that out of range limits and sorted keyset pages are rejected."""
+    with pytest.raises(ValueError, match=message):
+        get_all_songs(**kwargs)
+
+def test_get_all_songs_columnar(mock_cursor):
+    """Test retrieving the catalog as columns, read from the cursor in batches."""
+    mock_cursor.fetchmany.side_effect = [
+        [(1, "Artist A", "Song A", 2020, "Rock", 210, 10), (2, "Artist A", "Song B", 2021, "Rock", 180, 20)],
+        [(3, "Artist C", "Song C", 2022, "Jazz", 200, 5)],
+        [],
+    ]
+
+    columns = get_all_songs_columnar()
+
+    assert columns.count() == 3
+    assert columns.to_dict() == {
+        "id": [1, 2, 3],
+        "artist": ["Artist A", "Artist A", "Artist C"],
+        "title": ["Song A", "Song B", "Song C"],
+        "year": [2020, 2021, 2022],
+        "genre": ["Rock", "Rock", "Jazz"],
+        "duration": [210, 180, 200],
+        "play_count": [10, 20, 5],
+    }
+
+def test_get_all_songs_columnar_include_pending(mock_cursor, play_count_buffer):
+    """Test that pending play counts are merged into the columns before sorting."""
+    mock_cursor.fetchmany.side_effect = [
+        [(2, "Artist B", "Song B", 2021, "Pop", 180, 20), (1, "Artist A", "Song A", 2020, "Rock", 210, 10)],
+        [],
+    ]
+    play_count_buffer.add({1: 15})
+
+    columns = get_all_songs_columnar(sort_by_play_count=True, include_pending=True)
+
+    assert list(columns.id) == [1, 2]
+    assert list(columns.play_count) == [25, 20]
+    assert columns.title == ["Song A", "Song B"]
+
+def test_song_columns_take():
+    """Test selecting and reordering songs keeps the columns aligned."""
+    columns = SongColumns.from_rows([
         (1, "Artist A", "Song A", 2020, "Rock", 210, 10),
         (2, "Artist B", "Song B", 2021, "Pop", 180, 20),
-        (3, "Artist C", "Song C", 2022, "Jazz", 200, 5)
+    ])
+
+    taken = columns.take([1, 0, 1])
+
+    assert taken.to_dict()["title"] == ["Song B", "Song A", "Song B"]
+    assert list(taken.id) == [2, 1, 2]
+
+def test_song_has_no_instance_dict():
+    """Test that songs are slotted, so each instance carries no __dict__."""
+    song = Song(1, "Artist", "Song", 2020, "Pop", 180)
+    assert not hasattr(song, "__dict__")
+    with pytest.raises(AttributeError):
+        song.rating = 5
+
+def test_iter_song_pages(mock_cursor):
+    """Test that pages are chained on the last song ID until a short page is read."""
+    def row(song_id):
+        return (song_id, "Artist", f"Song {song_id}", 2020, "Pop", 180, 0)
+    mock_cursor.fetchall.side_effect = [[row(1), row(2)], [row(4), row(5)], [row(7)]]
+
+    pages = list(iter_song_pages(page_size=2))
+
+    assert [[song["id"] for song in page] for page in pages] == [[1, 2], [4, 5], [7]]
+    assert [call[0][1] for call in mock_cursor.execute.call_args_list] == [[2], [2, 2], [5, 2]]
+
+def test_iter_song_pages_by_play_count(mock_cursor):
+    """Test that play count pages are chained on the leaderboard keyset."""
+    mock_cursor.fetchall.side_effect = [
+        [(2, "Artist", "Song 2", 2020, "Pop", 180, 9), (1, "Artist", "Song 1", 2020, "Pop", 180, 4)],
+        [],
+    ]
+
+    pages = list(iter_song_pages(sort_by_play_count=True, page_size=2))
+
+    assert [[song["id"] for song in page] for page in pages] == [[2, 1]]
+    assert mock_cursor.execute.call_args_list[1][0][1] == [4, 4, 1, 2]
+
+def test_iter_song_pages_invalid_page_size(mock_cursor):
+    """Test that an out of range page size is rejected when the pages are requested, before any query."""
+    with pytest.raises(ValueError, match="Invalid catalog page size: 0"):
+        iter_song_pages(page_size=0)
+
+    mock_cursor.execute.assert_not_called()
+
+def test_get_song_leaderboard(mock_cursor):
+    """Test retrieving the first page of the leaderboard."""
+    mock_cursor.fetchall.return_value = [
+        (2, "Artist B", "Song B", 2021, "Pop", 180, 20),
+        (1, "Artist A", "Song A", 2020, "Rock", 210, 10),
+    ]
+
+    songs = get_song_leaderboard(limit=2)
+
+    assert [(song["id"], song["play_count"]) for song in songs] == [(2, 20), (1, 10)]
+
+    expected_query = normalize_whitespace("""
+        SELECT id, artist, title, year, genre, duration, play_count
+        FROM songs
+        WHERE deleted = FALSE
+        ORDER BY play_count DESC, id LIMIT ?
+    """)
+    actual_query = normalize_whitespace(mock_cursor.execute.call_args[0][0])
+    assert actual_query == expected_query, "The SQL query did not match the expected structure."
+    assert mock_cursor.execute.call_args[0][1] == [2]
+
+def test_get_song_leaderboard_after_cursor(mock_cursor):
+    """Test that later pages continue after the (play_count, id) cursor instead of using an offset."""
+    get_song_leaderboard(limit=5, after=(10, 1))
+
+    expected_query = normalize_whitespace("""
+        SELECT id, artist, title, year, genre, duration, play_count
+        FROM songs
+        WHERE deleted = FALSE AND play_count <= ? AND (play_count < ? OR id > ?)
+        ORDER BY play_count DESC, id LIMIT ?
+    """)
+    actual_query = normalize_whitespace(mock_cursor.execute.call_args[0][0])
+    assert actual_query == expected_query, "The SQL query did not match the expected structure."
+    assert mock_cursor.execute.call_args[0][1] == [10, 10, 1, 5]
+
+@pytest.mark.parametrize("limit", [0, -1, 101])
+def test_get_song_leaderboard_invalid_limit(mock_cursor, limit):
+    """Test that a page size outside 1-100 is rejected without querying."""
+    with pytest.raises(ValueError, match=f"Invalid leaderboard limit: {limit}"):
+        get_song_leaderboard(limit=limit)
+
+    mock_cursor.execute.assert_not_called()
+
+def test_get_random_song(mock_cursor, mocker):
+    """Test retrieving a random song from the catalog by probing the id range."""
+
+    # Simulate an id range of 1-3 and a live song at the probed id
+    mock_cursor.fetchone.side_effect = [
+        (1, 3),
+        (2, "Artist B", "Song B", 2021, "Pop", 180)
     ]
 
     # Mock random number generation to return the 2nd song
@@ -346,41 +658,69 @@ def test_get_random_song(mock_cursor, mocker):
     # Call the get_random_song method
     result = get_random_song()
 
-    # Expected result based on the mock random number and fetchall return value
+    # Expected result based on the mock random number and fetchone return value
     expected_result = Song(2, "Artist B", "Song B", 2021, "Pop", 180)
 
     # Ensure the result matches the expected output
     assert result == expected_result, f"Expected {expected_result}, got {result}"
 
-    # Ensure that the random number was called with the correct number of songs
+    # Ensure that the random number was drawn over the whole id range
     mock_random.assert_called_once_with(3)
 
-    # Ensure the SQL query was executed correctly
-    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration, play_count FROM songs WHERE deleted = FALSE")
+    # Ensure the probe query was executed correctly without scanning the catalog
+    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration FROM songs WHERE id = ? AND deleted = FALSE")
     actual_query = normalize_whitespace(mock_cursor.execute.call_args[0][0])
 
     # Assert that the SQL query was correct
     assert actual_query == expected_query, "The SQL query did not match the expected structure."
+    assert mock_cursor.execute.call_args[0][1] == (2,)
+    mock_cursor.fetchall.assert_not_called()
+
+def test_get_random_song_skips_deleted(mock_cursor, mocker):
+    """Test that probes landing on deleted songs are retried."""
+
+    # Simulate an id range of 1-10 where the first probe hits a deleted song
+    mock_cursor.fetchone.side_effect = [
+        (1, 10),
+        None,
+        (7, "Artist G", "Song G", 2019, "Jazz", 240)
+    ]
+    mock_random = mocker.patch("music_collection.models.song_model.get_random", side_effect=[4, 7])
+
+    result = get_random_song()
+
+    assert result == Song(7, "Artist G", "Song G", 2019, "Jazz", 240)
+    assert mock_random.call_count == 2
+
+def test_get_random_song_falls_back_to_position(mock_cursor, mocker):
+    """Test that a sparse id range falls back to picking a live song by position."""
+
+    misses = [None] * RANDOM_SONG_MAX_PROBES
+    mock_cursor.fetchone.side_effect = [(1, 1000)] + misses + [(2,), (500, "Artist X", "Song X", 2001, "Rock", 200)]
+    mock_random = mocker.patch("music_collection.models.song_model.get_random", side_effect=[10] * RANDOM_SONG_MAX_PROBES + [2])
+
+    result = get_random_song()
+
+    assert result == Song(500, "Artist X", "Song X", 2001, "Rock", 200)
+    mock_random.assert_called_with(2)
+
+    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration FROM songs WHERE deleted = FALSE ORDER BY id LIMIT 1 OFFSET ?")
+    assert normalize_whitespace(mock_cursor.execute.call_args[0][0]) == expected_query
+    assert mock_cursor.execute.call_args[0][1] == (1,)
 
 def test_get_random_song_empty_catalog(mock_cursor, mocker):
     """Test retrieving a random song when the catalog is empty."""
 
     # Simulate that the catalog is empty
-    mock_cursor.fetchall.return_value = []
+    mock_cursor.fetchone.return_value = (None, None)
+    mock_random = mocker.patch("music_collection.models.song_model.get_random")
 
     # Expect a ValueError to be raised when calling get_random_song with an empty catalog
     with pytest.raises(ValueError, match="The song catalog is empty"):
         get_random_song()
 
     # Ensure that the random number was not called since there are no songs
-    mocker.patch("music_collection.models.song_model.get_random").assert_not_called()
-
-    # Ensure the SQL query was executed correctly
-    expected_query = normalize_whitespace("SELECT id, artist, title, year, genre, duration, play_count FROM songs WHERE deleted = FALSE")
-    actual_query = normalize_whitespace(mock_cursor.execute.call_args[0][0])
-
-    # Assert that the SQL query was correct
-    assert actual_query == expected_query, "The SQL query did not match the expected structure."
+    mock_random.assert_not_called()
 
 def test_update_play_count(mock_cursor):
     """Test updating the play count of a song."""
@@ -423,3 +763,241 @@ def test_update_play_count_deleted_song(mock_cursor):
 
     # Ensure that no SQL query for updating play count was executed
     mock_cursor.execute.assert_called_once_with("SELECT deleted FROM songs WHERE id = ?", (1,))
+
+def test_update_play_counts(mock_cursor):
+    """Test updating the play counts of several songs in one transaction."""
+
+    # Simulate that all three songs exist and are not deleted
+    mock_cursor.fetchall.return_value = [(1, False), (2, False), (3, False)]
+
+    update_play_counts([(1, 1), (2, 3), (1, 1), (3, 1)])
+
+    expected_select = normalize_whitespace("SELECT id, deleted FROM songs WHERE id IN (?, ?, ?)")
+    actual_select = normalize_whitespace(mock_cursor.execute.call_args[0][0])
+    assert actual_select == expected_select, "The SQL query did not match the expected structure."
+    assert mock_cursor.execute.call_args[0][1] == [1, 2, 3]
+
+    # Repeated IDs are summed into one increment per song
+    expected_update = normalize_whitespace("UPDATE songs SET play_count = play_count + ? WHERE id = ?")
+    actual_update = normalize_whitespace(mock_cursor.executemany.call_args[0][0])
+    assert actual_update == expected_update, "The SQL query did not match the expected structure."
+    assert mock_cursor.executemany.call_args[0][1] == [(2, 1), (3, 2), (1, 3)]
+
+def test_update_play_counts_chunks_lookups(mock_cursor, mocker):
+    """Test that the existence check is split into queries of at most MAX_SQL_VARIABLES ids."""
+    mocker.patch("music_collection.models.song_model.MAX_SQL_VARIABLES", 2)
+    mock_cursor.fetchall.side_effect = [[(1, False), (2, False)], [(3, False)]]
+
+    update_play_counts({1: 1, 2: 1, 3: 1})
+
+    assert [call[0][1] for call in mock_cursor.execute.call_args_list] == [[1, 2], [3]]
+    mock_cursor.executemany.assert_called_once()
+
+@pytest.mark.parametrize("rows, message", [
+    ([(1, False)], "Song with ID 2 not found"),
+    ([(1, False), (2, True)], "Song with ID 2 has been deleted"),
+])
+def test_update_play_counts_invalid_song(mock_cursor, rows, message):
+    """Test that no play count is written if any song is missing or deleted."""
+    mock_cursor.fetchall.return_value = rows
+
+    with pytest.raises(ValueError, match=message):
+        update_play_counts({1: 1, 2: 1})
+
+    mock_cursor.executemany.assert_not_called()
+
+def test_update_play_counts_empty(mock_cursor):
+    """Test that an empty batch does not touch the database."""
+    update_play_counts({})
+
+    mock_cursor.execute.assert_not_called()
+
+######################################################
+#
+#    Write-behind play counts
+#
+######################################################
+
+def test_update_play_count_write_behind(mock_cursor, play_count_buffer):
+    """Test that play counts are validated and queued instead of written when write-behind is enabled."""
+    mock_cursor.fetchone.return_value = [False]
+
+    update_play_count(1)
+    update_play_count(1)
+    mock_cursor.fetchall.return_value = [(1, False), (2, False)]
+    update_play_counts({1: 1, 2: 4})
+
+    # Only the validation queries ran
+    assert all(call[0][0].lstrip().startswith("SELECT") for call in mock_cursor.execute.call_args_list)
+    mock_cursor.executemany.assert_not_called()
+
+    assert play_count_buffer.pending_counts() == {1: 3, 2: 4}
+    assert play_count_buffer.get_stats()["pending_increments"] == 7
+
+def test_update_play_count_write_behind_deleted_song(mock_cursor, play_count_buffer):
+    """Test that a deleted song is still rejected when write-behind is enabled."""
+    mock_cursor.fetchone.return_value = [True]
+
+    with pytest.raises(ValueError, match="Song with ID 1 has been deleted"):
+        update_play_count(1)
+
+    assert play_count_buffer.pending_counts() == {}
+
+def test_flush_play_counts(mock_cursor, play_count_buffer):
+    """Test that a flush writes every pending increment in one batch and records its latency."""
+    play_count_buffer.add({1: 3, 2: 1})
+
+    assert play_count_buffer.flush() == 4
+
+    expected_query = normalize_whitespace("UPDATE songs SET play_count = play_count + ? WHERE id = ? AND deleted = FALSE")
+    actual_query = normalize_whitespace(mock_cursor.executemany.call_args[0][0])
+    assert actual_query == expected_query, "The SQL query did not match the expected structure."
+    assert mock_cursor.executemany.call_args[0][1] == [(3, 1), (1, 2)]
+
+    stats = play_count_buffer.get_stats()
+    assert stats["pending_increments"] == 0
+    assert stats["flushes"] == 1
+    assert stats["last_flush_size"] == 4
+    assert stats["last_flush_latency"] is not None
+
+    # Nothing left to write
+    assert play_count_buffer.flush() == 0
+
+def test_flush_play_counts_failure_keeps_pending(mock_cursor, play_count_buffer):
+    """Test that increments from a failed flush stay pending and are retried."""
+    play_count_buffer.add({1: 2})
+    mock_cursor.executemany.side_effect = sqlite3.Error("database is locked")
+
+    with pytest.raises(sqlite3.Error, match="database is locked"):
+        play_count_buffer.flush()
+
+    play_count_buffer.add({1: 1})
+    assert play_count_buffer.pending_counts() == {1: 3}
+    assert play_count_buffer.get_stats()["flush_failures"] == 1
+
+    mock_cursor.executemany.side_effect = None
+    assert play_count_buffer.flush() == 3
+
+def test_flush_play_counts_threshold(mock_cursor):
+    """Test that reaching the flush threshold triggers a background flush."""
+    buffer = PlayCountBuffer(flush_interval=3600, flush_threshold=5)
+    try:
+        buffer.add({1: 5})
+        deadline = time.monotonic() + 5
+        while buffer.get_stats()["flushes"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert buffer.get_stats()["flushed_increments"] == 5
+    finally:
+        buffer.close()
+
+def test_close_play_count_buffer_flushes(mock_cursor):
+    """Test that closing the buffer writes the increments still pending."""
+    buffer = PlayCountBuffer(flush_interval=3600, flush_threshold=1000000)
+    buffer.add({7: 2})
+
+    buffer.close()
+
+    assert mock_cursor.executemany.call_args[0][1] == [(2, 7)]
+    assert buffer.get_stats()["pending_increments"] == 0
+
+def test_get_all_songs_include_pending(mock_cursor, play_count_buffer):
+    """Test that pending play counts can be merged into the catalog and change the play count order."""
+    mock_cursor.fetchall.return_value = [
+        (2, "Artist B", "Song B", 2021, "Pop", 180, 20),
+        (1, "Artist A", "Song A", 2020, "Rock", 210, 10),
+    ]
+    play_count_buffer.add({1: 15})
+
+    flushed = get_all_songs(sort_by_play_count=True)
+    assert [(song["id"], song["play_count"]) for song in flushed] == [(2, 20), (1, 10)]
+
+    merged = get_all_songs(sort_by_play_count=True, include_pending=True)
+    assert [(song["id"], song["play_count"]) for song in merged] == [(1, 25), (2, 20)]
+
+def test_clear_catalog_discards_pending(mock_cursor, play_count_buffer):
+    """Test that clearing the catalog drops the play counts waiting to be written."""
+    play_count_buffer.add({1: 2})
+
+    clear_catalog()
+
+    assert play_count_buffer.pending_counts() == {}
+
+def test_clear_catalog_waits_for_flush(mock_cursor, play_count_buffer):
+    """Test that clearing the catalog waits for a flush in progress, so its increments are written before the delete."""
+    writing = threading.Event()
+    resume = threading.Event()
+    statements = []
+
+    def slow_executemany(query, params):
+        writing.set()
+        resume.wait(1)
+        statements.append(query)
+
+    mock_cursor.executemany.side_effect = slow_executemany
+    mock_cursor.execute.side_effect = lambda query, *args: statements.append(query)
+    play_count_buffer.add({1: 2})
+
+    flush = threading.Thread(target=play_count_buffer.flush)
+    flush.start()
+    assert writing.wait(1)
+    clear = threading.Thread(target=clear_catalog)
+    clear.start()
+    clear.join(0.05)
+    assert clear.is_alive(), "Expected the clear to wait for the flush"
+    play_count_buffer.add({1: 3})
+    resume.set()
+    flush.join()
+    clear.join()
+
+    assert statements[0].startswith("UPDATE songs SET play_count")
+    assert statements[1] == "DELETE FROM songs;"
+    assert play_count_buffer.pending_counts() == {}
+
+######################################################
+#
+#    Song cache
+#
+######################################################
+
+def test_get_song_by_id_cached(mock_cursor):
+    """Test that a second lookup by ID is served from the cache."""
+    mock_cursor.fetchone.return_value = (1, "Artist Name", "Song Title", 2022, "Pop", 180, False)
+
+    assert get_song_by_id(1) == get_song_by_id(1)
+
+    assert mock_cursor.execute.call_count == 1
+    assert song_cache.get_stats()["hits"] == 1
+
+def test_get_song_by_id_negative_cached(mock_cursor):
+    """Test that a missing song is cached and raises the same error again."""
+    mock_cursor.fetchone.return_value = None
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Song with ID 5 not found"):
+            get_song_by_id(5)
+
+    assert mock_cursor.execute.call_count == 1
+    assert song_cache.get_stats()["negative_hits"] == 1
+
+def test_delete_song_invalidates_cache(mock_cursor):
+    """Test that deleting a song drops it from the cache under both of its keys."""
+    mock_cursor.fetchone.return_value = (1, "Artist Name", "Song Title", 2022, "Pop", 180, False)
+    get_song_by_id(1)
+    get_song_by_compound_key("Artist Name", "Song Title", 2022)
+
+    mock_cursor.fetchone.return_value = [False]
+    delete_song(1)
+
+    assert len(song_cache) == 0
+
+def test_create_song_invalidates_cached_miss(mock_cursor):
+    """Test that creating a song drops a cached miss for its compound key."""
+    mock_cursor.fetchone.return_value = None
+    with pytest.raises(ValueError, match="not found"):
+        get_song_by_compound_key("Artist Name", "Song Title", 2022)
+
+    mock_cursor.lastrowid = 1
+    create_song(artist="Artist Name", title="Song Title", year=2022, genre="Pop", duration=180)
+
+    mock_cursor.fetchone.return_value = (1, "Artist Name", "Song Title", 2022, "Pop", 180, False)
+    assert get_song_by_compound_key("Artist Name", "Song Title", 2022).id == 1
@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+
+import pytest
+
+from music_collection.utils.sql_utils import ConnectionPool, get_pragma_settings
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """Fixture to provide a small connection pool over a temporary database."""
+    pool = ConnectionPool(str(tmp_path / "test.db"), max_size=2, max_age=300, timeout=0.5)
+    yield pool
+    pool.close()
+
+
+def test_acquire_reuses_idle_connection(pool):
+    """Test that a returned connection is handed out again instead of opening a new one."""
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert pool.acquire() is conn
+    stats = pool.get_stats()
+    assert stats["opens"] == 1
+    assert stats["hits"] == 1
+
+def test_nested_acquire_shares_connection(pool):
+    """Test that nested checkouts on the same thread share one connection."""
+    outer = pool.acquire()
+    inner = pool.acquire()
+    assert inner is outer
+
+    pool.release(inner)
+    assert pool.get_stats()["idle"] == 0, "Connection should stay checked out until the outer release"
+    pool.release(outer)
+    assert pool.get_stats()["idle"] == 1
+
+def test_release_rolls_back_open_transaction(pool):
+    """Test that uncommitted work is rolled back when a connection is returned."""
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release(conn)
+
+def test_recycle_after_max_age(pool):
+    """Test that connections older than max_age are replaced on checkout."""
+    pool.max_age = 0
+    conn = pool.acquire()
+    pool.release(conn)
+
+    new_conn = pool.acquire()
+    assert new_conn is not conn
+    assert pool.get_stats()["recycles"] == 1
+    pool.release(new_conn)
+
+def test_unhealthy_connection_is_replaced(pool):
+    """Test that an idle connection failing the health check is replaced."""
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()
+
+    new_conn = pool.acquire()
+    assert new_conn is not conn
+    assert pool.get_stats()["health_check_failures"] == 1
+    pool.release(new_conn)
+
+def test_pool_is_bounded(pool):
+    """Test that a thread waits for a free connection and times out when none is returned."""
+    held = pool.acquire()
+    errors = []
+
+    def checkout():
+        try:
+            conn = pool.acquire()
+            pool.release(conn)
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    # The second thread gets the second slot, the third has to wait and time out
+    second = threading.Event()
+    release_second = threading.Event()
+
+    def hold_second():
+        conn = pool.acquire()
+        second.set()
+        release_second.wait()
+        pool.release(conn)
+
+    holder = threading.Thread(target=hold_second)
+    holder.start()
+    second.wait()
+
+    waiter = threading.Thread(target=checkout)
+    waiter.start()
+    waiter.join()
+    release_second.set()
+    holder.join()
+    pool.release(held)
+
+    assert len(errors) == 1, "Expected the third checkout to time out"
+    assert pool.get_stats()["waits"] == 1
+    assert pool.get_stats()["opens"] == 2
+
+def test_pragmas_applied_to_new_connections(tmp_path):
+    """Test that the pragma profile is applied to every connection the pool opens."""
+    pool = ConnectionPool(str(tmp_path / "test.db"), pragmas=get_pragma_settings("balanced"))
+    conn = pool.acquire()
+
+    assert conn.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous;").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout;").fetchone()[0] == 5000
+    assert conn.execute("PRAGMA temp_store;").fetchone()[0] == 2  # MEMORY
+
+    pool.release(conn)
+    pool.close()
+
+def test_pragma_env_overrides(mocker):
+    """Test that individual pragmas can be overridden through the environment."""
+    mocker.patch.dict('os.environ', {'DB_SYNCHRONOUS': 'full', 'DB_CACHE_SIZE': '-2000'})
+
+    settings = get_pragma_settings("balanced")
+    assert settings["synchronous"] == "FULL"
+    assert settings["cache_size"] == -2000
+    assert settings["journal_mode"] == "WAL"
+
+def test_pragma_invalid_values(mocker):
+    """Test that unknown profiles and invalid pragma values are rejected."""
+    with pytest.raises(ValueError, match="Invalid pragma profile: turbo"):
+        get_pragma_settings("turbo")
+
+    mocker.patch.dict('os.environ', {'DB_JOURNAL_MODE': 'WAL; DROP TABLE songs'})
+    with pytest.raises(ValueError, match="Invalid value for journal_mode"):
+        get_pragma_settings("balanced")
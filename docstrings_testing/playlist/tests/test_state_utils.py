@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+
+import pytest
+
+from music_collection.models.playlist_model import PlaylistModel
+from music_collection.models.song_model import Song
+from music_collection.utils.state_utils import SynchronizedModel, connect_state_server, on_state_server_exit, start_state_server
+
+
+class Job:
+    """A model with a close() method that records when it is closed."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def close(self):
+        with open(self.path, "a") as f:
+            f.write("job\n")
+
+
+@pytest.fixture
+def address(tmp_path):
+    """Fixture providing the socket path of a state server."""
+    return str(tmp_path / "state.sock")
+
+@pytest.fixture
+def state_server(address):
+    """Fixture providing a state server that shares a playlist."""
+    manager = start_state_server(address, {"playlist_model": PlaylistModel})
+    yield manager
+    manager.shutdown()
+
+def make_song(song_id):
+    return Song(song_id, "Artist", f"Song {song_id}", 2000, "Pop", 180)
+
+
+def test_playlist_shared_between_processes(state_server, address):
+    """Test that a song added by a forked worker is in the playlist seen by another process."""
+    pid = os.fork()
+    if pid == 0:
+        playlist_model = connect_state_server(address, ["playlist_model"]).playlist_model()
+        playlist_model.add_song_to_playlist(make_song(1))
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    playlist_model = connect_state_server(address, ["playlist_model"]).playlist_model()
+
+    assert playlist_model.get_all_songs() == [make_song(1)]
+    assert playlist_model.get_playlist_length() == 1
+
+def test_model_errors_raised_in_worker(state_server, address):
+    """Test that a ValueError raised by the shared model is raised again by the proxy."""
+    playlist_model = connect_state_server(address, ["playlist_model"]).playlist_model()
+    playlist_model.add_song_to_playlist(make_song(1))
+
+    with pytest.raises(ValueError, match="already exists"):
+        playlist_model.add_song_to_playlist(make_song(1))
+
+def test_connect_state_server_not_running(address):
+    """Test that connecting without a running state server raises a ConnectionError."""
+    with pytest.raises(ConnectionError, match="State server is not running"):
+        connect_state_server(address, ["playlist_model"])
+
+def test_state_server_closes_models(address, tmp_path):
+    """Test that models and exit callbacks are closed in reverse order when the server shuts down."""
+    log_path = tmp_path / "closed.log"
+
+    def close():
+        with log_path.open("a") as f:
+            f.write("initializer\n")
+
+    def initializer():
+        on_state_server_exit(close)
+
+    manager = start_state_server(address, {"job": lambda: Job(str(log_path))}, initializer=initializer)
+    manager.shutdown()
+
+    assert log_path.read_text() == "job\ninitializer\n"
+
+def test_state_server_not_a_multiprocessing_child(state_server):
+    """Test that the server is not tracked as a multiprocessing child, which forked workers would try to join on exit."""
+    assert multiprocessing.active_children() == []
+
+def test_state_server_shutdown(address):
+    """Test that shutting down stops the server, removes its socket and can be repeated."""
+    manager = start_state_server(address, {"playlist_model": PlaylistModel})
+
+    manager.shutdown()
+    manager.shutdown()
+
+    assert manager.pid is None
+    assert not os.path.exists(address)
+
+def test_start_state_server_failure(address):
+    """Test that a server whose models cannot be created is reported instead of left for workers to find."""
+    def broken_model():
+        raise ValueError("broken model")
+
+    with pytest.raises(RuntimeError, match="exited before it was listening"):
+        start_state_server(address, {"playlist_model": broken_model})
+
+def test_start_state_server_removes_stale_socket(address):
+    """Test that a socket left behind by a server that was killed does not stop a new one."""
+    open(address, "w").close()
+
+    manager = start_state_server(address, {"playlist_model": PlaylistModel})
+
+    assert connect_state_server(address, ["playlist_model"]).playlist_model().get_playlist_length() == 0
+    manager.shutdown()
+
+def test_synchronized_model_exposes_model_methods():
+    """Test that the wrapper lists and forwards the methods of the model it wraps."""
+    model = SynchronizedModel(PlaylistModel())
+
+    assert "add_song_to_playlist" in dir(model)
+    model.add_song_to_playlist(make_song(1))
+    assert model.get_playlist_length() == 1
+    assert model.current_track_number == 1